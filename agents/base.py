@@ -14,30 +14,38 @@ class Agent:
         self.role = role
         self.goal = goal
         self.objetivo_original = goal  # Guardar el objetivo original
+        self.objetivo_base = goal  # Objetivo de la definición del agente; nunca se refina
         self.backstory = backstory
         self.llm = llm
         self.memoria = None  # Se asignará después
     
-    def execute_task(self, task_description, context=None):
-        """Ejecutar una tarea con contexto opcional.
+    def _prompt_sistema(self):
+        """Mensaje de sistema estable del agente.
         
-        Args:
-            task_description (str): La tarea a realizar
-            context (str, opcional): Contexto adicional
-            
-        Returns:
-            str: Resultado de la ejecución de la tarea
+        Solo depende de la definición del agente, de modo que el prefijo del prompt
+        es idéntico en todas las llamadas y el proveedor puede reutilizar su caché de
+        contexto. Todo lo que varía (objetivo refinado, tarea, contexto) va en el
+        mensaje de usuario.
         """
-        # Construir las partes del prompt por separado
-        base_prompt = f"""
+        return f"""
         # Agente: {self.name} ({self.role})
         
-        ## Tu objetivo
-        {self.goal}
-        
         ## Tu historia
         {self.backstory}
         
+        ## Tu objetivo general
+        {self.objetivo_base}
+        
+        Cumple con tu tarea de manera profesional.
+        """
+    
+    def _construir_prompt_tarea(self, task_description, context=None):
+        """Construir el mensaje de usuario de una tarea con contexto opcional."""
+        # Construir las partes del prompt por separado
+        base_prompt = f"""
+        ## Tu objetivo para esta tarea
+        {self.goal}
+        
         ## Tu tarea actual
         {task_description}
         """
@@ -51,29 +59,56 @@ class Agent:
             prompt = base_prompt + context_part
         else:
             prompt = base_prompt
-            
-        # Añadir instrucción final
-        prompt += """
         
-        Cumple con tu tarea de manera profesional.
+        return prompt
+    
+    def execute_task(self, task_description, context=None, on_chunk=None):
+        """Ejecutar una tarea con contexto opcional.
+        
+        Args:
+            task_description (str): La tarea a realizar
+            context (str, opcional): Contexto adicional
+            on_chunk (callable, opcional): Función que recibe el texto acumulado
+                mientras se genera la respuesta en streaming
+            
+        Returns:
+            str: Resultado de la ejecución de la tarea
         """
+        prompt = self._construir_prompt_tarea(task_description, context)
         
         print(f"🔄 {self.name} está trabajando...")
-        response = self.llm.generate(prompt)
+        if on_chunk:
+            response = ""
+            for fragmento in self.llm.stream(prompt, system=self._prompt_sistema(), tag=self.name):
+                response += fragmento
+                on_chunk(response)
+        else:
+            response = self.llm.generate(prompt, system=self._prompt_sistema(), tag=self.name)
         print(f"✅ {self.name} ha completado su tarea.")
         
         return response
     
-    def refinar_objetivo(self, tema, contexto=None):
-        """Refinar dinámicamente el objetivo del agente basado en el tema y contexto.
+    async def aexecute_task(self, task_description, context=None, on_chunk=None):
+        """Versión asíncrona de execute_task que no bloquea el event loop.
         
-        Args:
-            tema (str): Tema de trabajo
-            contexto (str, opcional): Contexto adicional
-            
-        Returns:
-            str: Objetivo refinado
+        Si se indica on_chunk, se espera con el texto acumulado tras cada fragmento.
         """
+        prompt = self._construir_prompt_tarea(task_description, context)
+        
+        print(f"🔄 {self.name} está trabajando...")
+        if on_chunk:
+            response = ""
+            async for fragmento in self.llm.astream(prompt, system=self._prompt_sistema(), tag=self.name):
+                response += fragmento
+                await on_chunk(response)
+        else:
+            response = await self.llm.agenerate(prompt, system=self._prompt_sistema(), tag=self.name)
+        print(f"✅ {self.name} ha completado su tarea.")
+        
+        return response
+    
+    def _construir_prompt_refinamiento(self, tema, contexto=None):
+        """Construir el prompt para refinar el objetivo del agente."""
         prompt_refinamiento = f"""
         Tu objetivo actual es: {self.goal}
         
@@ -86,46 +121,138 @@ class Agent:
         
         if contexto:
             prompt_refinamiento += f"\nContexto adicional:\n{contexto}"
-        
-        objetivo_refinado = self.llm.generate(prompt_refinamiento)
+        return prompt_refinamiento
+    
+    def _aplicar_objetivo_refinado(self, objetivo_refinado):
+        """Actualizar el objetivo del agente con el objetivo refinado."""
         self.objetivo_original = self.goal  # Guardar objetivo original
         self.goal = objetivo_refinado
         
         print(f"🔄 {self.name} refinó su objetivo: {objetivo_refinado[:100]}...")
         return objetivo_refinado
     
-    def necesita_mas_informacion(self, resultado):
-        """Verificar si el agente necesita más información para completar la tarea.
+    def refinar_objetivo(self, tema, contexto=None):
+        """Refinar dinámicamente el objetivo del agente basado en el tema y contexto.
         
         Args:
-            resultado (str): Resultado actual
+            tema (str): Tema de trabajo
+            contexto (str, opcional): Contexto adicional
             
         Returns:
-            str o None: Solicitud de información adicional o None si tiene suficiente
+            str: Objetivo refinado
+        """
+        prompt_refinamiento = self._construir_prompt_refinamiento(tema, contexto)
+        objetivo_refinado = self.llm.generate(
+            prompt_refinamiento, use_cache=True, profile="short", system=self._prompt_sistema(), tag=self.name
+        )
+        return self._aplicar_objetivo_refinado(objetivo_refinado)
+    
+    async def arefinar_objetivo(self, tema, contexto=None):
+        """Versión asíncrona de refinar_objetivo."""
+        prompt_refinamiento = self._construir_prompt_refinamiento(tema, contexto)
+        objetivo_refinado = await self.llm.agenerate(
+            prompt_refinamiento, use_cache=True, profile="short", system=self._prompt_sistema(), tag=self.name
+        )
+        return self._aplicar_objetivo_refinado(objetivo_refinado)
+    
+    @staticmethod
+    def _agrupar_por_llm(agentes):
+        """Agrupar agentes que comparten el mismo LLM para enviarlos en un solo lote."""
+        grupos = {}
+        for agente in agentes:
+            grupos.setdefault(id(agente.llm), []).append(agente)
+        return grupos.values()
+    
+    @staticmethod
+    def refinar_objetivos(agentes, tema, contexto=None):
+        """Refinar en lote los objetivos de varios agentes con peticiones concurrentes.
+        
+        Args:
+            agentes (list): Agentes a refinar
+            tema (str): Tema de trabajo
+            contexto (str, opcional): Contexto adicional
+            
+        Returns:
+            list: Objetivos refinados en el mismo orden que los agentes
         """
-        prompt_verificacion = f"""
+        refinados = {}
+        for grupo in Agent._agrupar_por_llm(agentes):
+            prompts = [agente._construir_prompt_refinamiento(tema, contexto) for agente in grupo]
+            respuestas = grupo[0].llm.generate_many(
+                prompts, use_cache=True, profile="short",
+                systems=[agente._prompt_sistema() for agente in grupo],
+                tags=[agente.name for agente in grupo]
+            )
+            for agente, objetivo in zip(grupo, respuestas):
+                refinados[id(agente)] = agente._aplicar_objetivo_refinado(objetivo)
+        return [refinados[id(agente)] for agente in agentes]
+    
+    @staticmethod
+    async def arefinar_objetivos(agentes, tema, contexto=None):
+        """Versión asíncrona de refinar_objetivos."""
+        refinados = {}
+        for grupo in Agent._agrupar_por_llm(agentes):
+            prompts = [agente._construir_prompt_refinamiento(tema, contexto) for agente in grupo]
+            respuestas = await grupo[0].llm.agenerate_many(
+                prompts, use_cache=True, profile="short",
+                systems=[agente._prompt_sistema() for agente in grupo],
+                tags=[agente.name for agente in grupo]
+            )
+            for agente, objetivo in zip(grupo, respuestas):
+                refinados[id(agente)] = agente._aplicar_objetivo_refinado(objetivo)
+        return [refinados[id(agente)] for agente in agentes]
+    
+    def _construir_prompt_verificacion(self, resultado):
+        """Construir el prompt que verifica si falta información."""
+        return f"""
         Analiza este resultado y determina si necesitas información adicional:
         {resultado}
         
-        Si necesitas más información, describe exactamente qué necesitas.
-        Si tienes información suficiente, responde con "SUFICIENTE".
+        Responde en la primera línea únicamente con una de estas dos opciones:
+        SUFICIENTE
+        INSUFICIENTE: <describe exactamente qué información necesitas>
+        """
+    
+    @staticmethod
+    def _interpretar_verificacion(respuesta):
+        """Interpretar la respuesta estructurada de la verificación.
+        
+        Solo una respuesta que empiece por INSUFICIENTE cuenta como petición; una respuesta
+        ambigua se trata como suficiente para no provocar reejecuciones espurias. Un
+        INSUFICIENTE sin descripción produce una petición genérica.
         """
-        respuesta = self.llm.generate(prompt_verificacion)
-        if "SUFICIENTE" in respuesta:
+        texto = respuesta.strip().lstrip("*#>- ").strip()
+        if not texto.upper().startswith("INSUFICIENTE"):
             return None
-        return respuesta
+        peticion = texto[len("INSUFICIENTE"):].lstrip(" :*-\n").strip()
+        return peticion or "Aporta más datos y detalles concretos sobre el tema."
     
-    def solicitar_informacion_adicional(self, peticion, contexto):
-        """Solicitar información adicional basada en una petición.
+    def necesita_mas_informacion(self, resultado):
+        """Verificar si el agente necesita más información para completar la tarea.
         
         Args:
-            peticion (str): La información solicitada
-            contexto (str): Contexto actual
+            resultado (str): Resultado actual
             
         Returns:
-            str: Información adicional proporcionada
+            str o None: Solicitud de información adicional o None si tiene suficiente
         """
-        prompt_info_adicional = f"""
+        respuesta = self.llm.generate(
+            self._construir_prompt_verificacion(resultado), profile="short",
+            system=self._prompt_sistema(), tag=self.name
+        )
+        return self._interpretar_verificacion(respuesta)
+    
+    async def anecesita_mas_informacion(self, resultado):
+        """Versión asíncrona de necesita_mas_informacion."""
+        respuesta = await self.llm.agenerate(
+            self._construir_prompt_verificacion(resultado), profile="short",
+            system=self._prompt_sistema(), tag=self.name
+        )
+        return self._interpretar_verificacion(respuesta)
+    
+    def _construir_prompt_info_adicional(self, peticion, contexto):
+        """Construir el prompt para solicitar información adicional."""
+        return f"""
         Basado en tu trabajo previo:
         {contexto}
         
@@ -134,4 +261,19 @@ class Agent:
         
         Proporciona solo la información solicitada de manera concisa.
         """
-        return self.execute_task(prompt_info_adicional)
\ No newline at end of file
+    
+    def solicitar_informacion_adicional(self, peticion, contexto):
+        """Solicitar información adicional basada en una petición.
+        
+        Args:
+            peticion (str): La información solicitada
+            contexto (str): Contexto actual
+            
+        Returns:
+            str: Información adicional proporcionada
+        """
+        return self.execute_task(self._construir_prompt_info_adicional(peticion, contexto))
+    
+    async def asolicitar_informacion_adicional(self, peticion, contexto):
+        """Versión asíncrona de solicitar_informacion_adicional."""
+        return await self.aexecute_task(self._construir_prompt_info_adicional(peticion, contexto))
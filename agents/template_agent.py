@@ -1,5 +1,7 @@
 # agents/template_agent.py
 from agents.base import Agent
+from utils.tracing import trazar
+import asyncio
 import re
 import json
 import os
@@ -93,9 +95,9 @@ class TemplateAgent(Agent):
             
         return default_library
         
-    def select_template_for_content(self, topic, content, subject=None):
-        """Seleccionar el template más adecuado basado en el contenido."""
-        template_selection_prompt = f"""
+    def _build_template_selection_prompt(self, topic, content, subject=None):
+        """Construir el prompt de clasificación del template."""
+        return f"""
         Analiza este tema y contenido de correo electrónico, y determina qué tipo de template sería más adecuado.
         
         TEMA: {topic}
@@ -113,8 +115,20 @@ class TemplateAgent(Agent):
         Responde SOLO con la categoría (ej: "technical") sin explicaciones.
         """
         
-        template_type = self.llm.generate(template_selection_prompt).strip().lower()
-        
+    def select_template_for_content(self, topic, content, subject=None):
+        """Seleccionar el template más adecuado basado en el contenido."""
+        template_selection_prompt = self._build_template_selection_prompt(topic, content, subject)
+        template_type = self.llm.generate(template_selection_prompt, use_cache=True, profile="classification", tag=self.name).strip().lower()
+        return self._apply_template_selection(template_type)
+        
+    async def aselect_template_for_content(self, topic, content, subject=None):
+        """Versión asíncrona de select_template_for_content."""
+        template_selection_prompt = self._build_template_selection_prompt(topic, content, subject)
+        template_type = (await self.llm.agenerate(template_selection_prompt, use_cache=True, profile="classification", tag=self.name)).strip().lower()
+        return self._apply_template_selection(template_type)
+        
+    def _apply_template_selection(self, template_type):
+        """Resolver la categoría devuelta por el LLM y registrar su uso."""
         # Validar respuesta
         valid_types = ["business", "academic", "creative", "technical", "newsletter"]
         if template_type not in valid_types:
@@ -148,9 +162,9 @@ class TemplateAgent(Agent):
         
         return selected_template
         
-    def analyze_content_structure(self, content):
-        """Analizar la estructura del contenido para adaptarla al template."""
-        analysis_prompt = f"""
+    def _build_analysis_prompt(self, content):
+        """Construir el prompt de extracción de estructura del contenido."""
+        return f"""
         Analiza este contenido de correo electrónico y extrae su estructura:
         
         {content}
@@ -166,8 +180,18 @@ class TemplateAgent(Agent):
         Responde solo con el JSON, sin explicaciones adicionales.
         """
         
-        analysis_result = self.llm.generate(analysis_prompt).strip()
+    def analyze_content_structure(self, content):
+        """Analizar la estructura del contenido para adaptarla al template."""
+        analysis_result = self.llm.generate(self._build_analysis_prompt(content), profile="extraction", tag=self.name).strip()
+        return self._parse_content_structure(analysis_result, content)
         
+    async def aanalyze_content_structure(self, content):
+        """Versión asíncrona de analyze_content_structure."""
+        analysis_result = (await self.llm.agenerate(self._build_analysis_prompt(content), profile="extraction", tag=self.name)).strip()
+        return self._parse_content_structure(analysis_result, content)
+        
+    def _parse_content_structure(self, analysis_result, content):
+        """Extraer la estructura JSON de la respuesta o construir una básica."""
         # Intentar extraer el JSON
         try:
             # Buscar el primer { y el último }
@@ -236,6 +260,7 @@ class TemplateAgent(Agent):
         
         return structure
     
+    @trazar("plantilla")
     def generate_html_template(self, template_config, content_structure, subject):
         """Generar HTML basado en el template seleccionado y la estructura del contenido."""
         template_id = template_config["id"]
@@ -420,6 +445,12 @@ class TemplateAgent(Agent):
         
         return html
 
+    def _save_template(self, topic, html_content):
+        """Guardar el template usado para el tema."""
+        template_file = os.path.join(self.templates_folder, f"{topic.replace(' ', '_').lower()}_template.html")
+        with open(template_file, 'w', encoding='utf-8') as f:
+            f.write(html_content)
+
     def execute_template_task(self, topic, content, subject):
         """Ejecutar tarea completa de generación de template."""
         print(f"🎨 {self.name} está analizando el contenido y seleccionando un template...")
@@ -435,8 +466,25 @@ class TemplateAgent(Agent):
         html_content = self.generate_html_template(selected_template, content_structure, subject)
         
         # Guardar el template usado
-        template_file = os.path.join(self.templates_folder, f"{topic.replace(' ', '_').lower()}_template.html")
-        with open(template_file, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+        self._save_template(topic, html_content)
+            
+        return html_content
+
+    async def aexecute_template_task(self, topic, content, subject):
+        """Versión asíncrona de execute_template_task."""
+        print(f"🎨 {self.name} está analizando el contenido y seleccionando un template...")
+        
+        # 1 y 2. Seleccionar template y analizar la estructura son independientes: en paralelo
+        selected_template, content_structure = await asyncio.gather(
+            self.aselect_template_for_content(topic, content, subject),
+            self.aanalyze_content_structure(content)
+        )
+        print(f"✅ Template seleccionado: {selected_template['name']}")
+        
+        # 3. Generar HTML
+        html_content = self.generate_html_template(selected_template, content_structure, subject)
+        
+        # Guardar el template usado
+        self._save_template(topic, html_content)
             
         return html_content
\ No newline at end of file
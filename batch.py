@@ -0,0 +1,152 @@
+# batch.py
+import argparse
+import asyncio
+import logging
+import sys
+import time
+
+from llm.deepseek import DeepSeekAPI
+from llm.errors import LLMError
+from llm.transport import aclose_transport
+from pipeline import crear_memorias, generar_correo
+from workflow.cancellation import PlazoExcedido
+from workflow.journal import DiarioEjecucion
+from utils.estadisticas import percentil
+from config.settings import BATCH_CONCURRENCY
+
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+# Nombre de cada etapa del pipeline en el informe
+ETAPAS = {
+    "preparacion": "asunto, objetivos y memoria",
+    "task_1": "investigación",
+    "task_2": "análisis",
+    "task_3": "redacción",
+    "task_4": "plantilla",
+    "html": "HTML de respaldo",
+    "total": "correo completo"
+}
+
+
+def leer_temas(ruta):
+    """Leer un tema por línea, ignorando líneas vacías, comentarios (#) y duplicados."""
+    temas = []
+    with open(ruta, encoding="utf-8") as f:
+        for linea in f:
+            tema = linea.strip()
+            if tema and not tema.startswith("#") and tema not in temas:
+                temas.append(tema)
+    return temas
+
+
+async def ejecutar_lote(temas, llm, concurrencia=BATCH_CONCURRENCY, directorio_salida="salida_lote",
+                        regenerar=False):
+    """Generar un correo por tema con como máximo `concurrencia` correos a la vez.
+    
+    Los temas generados recientemente se sirven desde el almacén de artefactos salvo
+    que se pida regenerar.
+    
+    Returns:
+        list: (tema, correo o None, error o None) en el orden de los temas
+    """
+    memorias = crear_memorias()
+    semaforo = asyncio.Semaphore(concurrencia)
+    
+    async def _generar(tema):
+        async with semaforo:
+            inicio = time.monotonic()
+            try:
+                correo = await generar_correo(
+                    tema, llm, memorias,
+                    run_id=f"lote_{DiarioEjecucion.huella(tema.strip().lower())}",
+                    directorio_salida=directorio_salida,
+                    regenerar=regenerar
+                )
+            except (LLMError, PlazoExcedido) as e:
+                logger.error(f"❌ '{tema}': {str(e)}")
+                return tema, None, e
+            except Exception as e:
+                # Cualquier otro fallo (SMTP, almacén, formato...) tampoco detiene el lote
+                logger.exception(f"❌ '{tema}': error inesperado: {str(e)}")
+                return tema, None, e
+            logger.info(f"✅ '{tema}' en {time.monotonic() - inicio:.1f} s -> {correo['filename_html']}")
+            return tema, correo, None
+    
+    return await asyncio.gather(*[_generar(tema) for tema in temas])
+
+
+def informe(resultados, segundos, metricas):
+    """Construir el informe de rendimiento del lote."""
+    correctos = [correo for _, correo, error in resultados if correo is not None]
+    fallidos = [tema for tema, correo, error in resultados if correo is None]
+    lineas = [
+        "",
+        f"Correos generados: {len(correctos)}/{len(resultados)} en {segundos:.1f} s",
+        f"Rendimiento: {len(correctos) / (segundos / 60):.2f} correos/min" if segundos else "Rendimiento: -",
+    ]
+    if fallidos:
+        lineas.append(f"Fallidos: {', '.join(fallidos)}")
+    reutilizados = sum(1 for correo in correctos if correo["desde_cache"])
+    if reutilizados:
+        lineas.append(f"Reutilizados del almacén de artefactos: {reutilizados}")
+    
+    lineas.append("")
+    lineas.append(f"{'etapa':<28} {'n':>4} {'p50 s':>8} {'p95 s':>8}")
+    for clave, nombre in ETAPAS.items():
+        duraciones = sorted(correo["duraciones"][clave] for correo in correctos if clave in correo["duraciones"])
+        if duraciones:
+            lineas.append(
+                f"{nombre:<28} {len(duraciones):>4} {percentil(duraciones, 0.5):>8.2f} {percentil(duraciones, 0.95):>8.2f}"
+            )
+    
+    uso = metricas.get("usage") or {}
+    prompt_tokens = sum(datos["prompt_tokens"] for datos in uso.values())
+    completion_tokens = sum(datos["completion_tokens"] for datos in uso.values())
+    cache_tokens = sum(datos["cache_hit_tokens"] for datos in uso.values())
+    lineas.append("")
+    lineas.append(
+        f"Tokens: {prompt_tokens} de entrada ({cache_tokens} desde la caché del proveedor), "
+        f"{completion_tokens} de salida"
+    )
+    # Los correos reutilizados no consumen tokens: solo cuentan los generados ahora
+    generados = len(correctos) - reutilizados
+    if generados:
+        lineas.append(f"Tokens por correo generado: {(prompt_tokens + completion_tokens) / generados:.0f}")
+    return "\n".join(lineas)
+
+
+def main():
+    """CLI: python batch.py temas.txt [--salida DIR] [--concurrencia N]"""
+    parser = argparse.ArgumentParser(description="Genera correos para una lista de temas sin Telegram")
+    parser.add_argument("temas", help="Archivo de texto con un tema por línea")
+    parser.add_argument("--salida", default="salida_lote", help="Carpeta para los archivos .txt y .html")
+    parser.add_argument("--concurrencia", type=int, default=BATCH_CONCURRENCY,
+                        help="Número máximo de correos generándose a la vez")
+    parser.add_argument("--regenerar", action="store_true",
+                        help="Generar de nuevo aunque haya un correo reciente del mismo tema")
+    args = parser.parse_args()
+    
+    temas = leer_temas(args.temas)
+    if not temas:
+        print("No hay temas que procesar.")
+        return 0
+    
+    llm = DeepSeekAPI(model="deepseek-chat", temperature=0.7)
+    
+    async def _ejecutar():
+        try:
+            return await ejecutar_lote(temas, llm, args.concurrencia, args.salida, args.regenerar)
+        finally:
+            await aclose_transport()
+    
+    inicio = time.monotonic()
+    resultados = asyncio.run(_ejecutar())
+    print(informe(resultados, time.monotonic() - inicio, llm.metrics()))
+    return 1 if any(correo is None for _, correo, _ in resultados) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -25,4 +25,98 @@ DEEPSEEK_TEMPERATURE = float(os.getenv("DEEPSEEK_TEMPERATURE", "0.7"))
 DEEPSEEK_BASE_URL = os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com")
 
 #telegram
-TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
\ No newline at end of file
+TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
+
+# LLM response cache
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "cache/llm_cache.sqlite3")
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "256"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+
+
+# DeepSeek client resilience
+DEEPSEEK_RATE_LIMIT = float(os.getenv("DEEPSEEK_RATE_LIMIT", "5"))  # requests per second
+DEEPSEEK_RATE_BURST = int(os.getenv("DEEPSEEK_RATE_BURST", "10"))
+DEEPSEEK_MAX_CONCURRENCY = int(os.getenv("DEEPSEEK_MAX_CONCURRENCY", "8"))
+DEEPSEEK_MAX_RETRIES = int(os.getenv("DEEPSEEK_MAX_RETRIES", "3"))
+DEEPSEEK_BACKOFF_BASE = float(os.getenv("DEEPSEEK_BACKOFF_BASE", "0.5"))
+DEEPSEEK_BACKOFF_MAX = float(os.getenv("DEEPSEEK_BACKOFF_MAX", "20"))
+DEEPSEEK_BREAKER_THRESHOLD = int(os.getenv("DEEPSEEK_BREAKER_THRESHOLD", "5"))
+DEEPSEEK_BREAKER_RESET = float(os.getenv("DEEPSEEK_BREAKER_RESET", "30"))
+
+
+# LLM backend ("deepseek" or "mock" for offline load testing)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "deepseek")
+MOCK_LLM_LATENCY = os.getenv("MOCK_LLM_LATENCY", "lognormal")  # fixed, uniform, lognormal or exponential
+MOCK_LLM_LATENCY_MEAN = float(os.getenv("MOCK_LLM_LATENCY_MEAN", "1.5"))  # seconds
+MOCK_LLM_LATENCY_SPREAD = float(os.getenv("MOCK_LLM_LATENCY_SPREAD", "0.5"))
+MOCK_LLM_ERROR_RATE = float(os.getenv("MOCK_LLM_ERROR_RATE", "0"))
+MOCK_LLM_COMPLETION_TOKENS = int(os.getenv("MOCK_LLM_COMPLETION_TOKENS", "300"))
+MOCK_LLM_SEED = os.getenv("MOCK_LLM_SEED")
+MOCK_LLM_TOKENS_PER_SECOND = float(os.getenv("MOCK_LLM_TOKENS_PER_SECOND", "0"))  # 0 = length-independent
+
+# Record/replay of LLM calls ("off", "record" or "replay")
+LLM_CASSETTE_MODE = os.getenv("LLM_CASSETTE_MODE", "off")
+LLM_CASSETTE_PATH = os.getenv("LLM_CASSETTE_PATH", "cassettes/llm_cassette.jsonl.gz")
+
+# Model routing profiles for short classification/extraction prompts
+LLM_FAST_MODEL = os.getenv("LLM_FAST_MODEL", DEEPSEEK_MODEL)
+LLM_DEFAULT_TIMEOUT = float(os.getenv("LLM_DEFAULT_TIMEOUT", "120"))
+LLM_FAST_TIMEOUT = float(os.getenv("LLM_FAST_TIMEOUT", "20"))
+
+# HTTP transport shared by every LLM client
+LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "20"))
+LLM_HTTP_MAX_KEEPALIVE = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", "10"))
+LLM_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", "60"))
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "false").lower() == "true"
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "10"))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "120"))
+LLM_WRITE_TIMEOUT = float(os.getenv("LLM_WRITE_TIMEOUT", "30"))
+LLM_POOL_TIMEOUT = float(os.getenv("LLM_POOL_TIMEOUT", "30"))
+
+# Run journals used to resume interrupted workflows
+WORKFLOW_JOURNAL_DIR = os.getenv("WORKFLOW_JOURNAL_DIR", "runs")
+
+# Feedback policy: local checks before asking the LLM whether a result needs more info
+FEEDBACK_LLM_BUDGET = int(os.getenv("FEEDBACK_LLM_BUDGET", "2"))  # LLM verifications per run
+FEEDBACK_MIN_TOKENS = int(os.getenv("FEEDBACK_MIN_TOKENS", "40"))
+FEEDBACK_SUFFICIENT_TOKENS = int(os.getenv("FEEDBACK_SUFFICIENT_TOKENS", "150"))
+
+# Workflow deadlines in seconds (0 disables them)
+WORKFLOW_TASK_TIMEOUT = float(os.getenv("WORKFLOW_TASK_TIMEOUT", "300"))
+WORKFLOW_RUN_TIMEOUT = float(os.getenv("WORKFLOW_RUN_TIMEOUT", "900"))
+
+# Tracing of workflow runs, tasks, LLM calls, memory, templates and SMTP (JSONL export)
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+TRACING_PATH = os.getenv("TRACING_PATH", "trazas/trazas.jsonl")
+
+# Headless batch runner (batch.py)
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+
+# Whole-pipeline memoization per normalized topic (content-addressed artifact store)
+ARTIFACT_CACHE_ENABLED = os.getenv("ARTIFACT_CACHE_ENABLED", "true").lower() == "true"
+ARTIFACT_DIR = os.getenv("ARTIFACT_DIR", "cache/artefactos")
+ARTIFACT_TTL = float(os.getenv("ARTIFACT_TTL", "86400"))  # seconds; 0 disables expiry
+ARTIFACT_MAX_ENTRIES = int(os.getenv("ARTIFACT_MAX_ENTRIES", "200"))
+ARTIFACT_MAX_BYTES = int(os.getenv("ARTIFACT_MAX_BYTES", str(50 * 1024 * 1024)))
+
+# Pipelined workflow: stages start on upstream paragraphs as they stream
+WORKFLOW_PIPELINED = os.getenv("WORKFLOW_PIPELINED", "false").lower() == "true"
+WORKFLOW_SEGMENT_MIN_TOKENS = int(os.getenv("WORKFLOW_SEGMENT_MIN_TOKENS", "120"))
+
+# Dependency-graph workflow: tasks run as soon as their dependencies finish, with feedback
+WORKFLOW_DAG = os.getenv("WORKFLOW_DAG", "false").lower() == "true"
+WORKFLOW_DAG_MAX_PARALLEL = int(os.getenv("WORKFLOW_DAG_MAX_PARALLEL", "4"))
+
+# Optional TF-IDF similarity over agent memory (needs numpy) and diversity of few-shot examples
+MEMORY_SIMILARITY_ENABLED = os.getenv("MEMORY_SIMILARITY_ENABLED", "false").lower() == "true"
+MEMORY_SIMILARITY_FEATURES = int(os.getenv("MEMORY_SIMILARITY_FEATURES", str(2 ** 18)))  # hashed n-gram columns
+MEMORY_FEWSHOT_DIVERSITY = float(os.getenv("MEMORY_FEWSHOT_DIVERSITY", "0.3"))  # 0 = relevance only
+
+# Retention of agent memory (0 disables a limit), enforced on open and every N added tasks
+MEMORY_MAX_TASKS = int(os.getenv("MEMORY_MAX_TASKS", "2000"))
+MEMORY_MAX_RESULTS = int(os.getenv("MEMORY_MAX_RESULTS", "500"))
+MEMORY_MAX_AGE_DAYS = float(os.getenv("MEMORY_MAX_AGE_DAYS", "0"))
+MEMORY_MAX_PER_TOPIC = int(os.getenv("MEMORY_MAX_PER_TOPIC", "5"))
+MEMORY_COMPACT_EVERY = int(os.getenv("MEMORY_COMPACT_EVERY", "50"))
\ No newline at end of file
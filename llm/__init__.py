@@ -1,3 +1,19 @@
 from llm.deepseek import DeepSeekAPI
+from llm.cache import LLMCache
+from llm.singleflight import SingleFlight
+from llm.resilience import ResiliencePolicy
+from llm.routing import LLMProfile, PROFILES, get_profile
+from llm.usage import UsageStats
+from llm.backends import LLMBackend, OpenAIBackend, MockBackend, CassetteBackend
+from llm.errors import (
+    LLMError, LLMRateLimitError, LLMTimeoutError, LLMConnectionError,
+    LLMServerError, LLMUnavailableError, LLMResponseError
+)
 
-__all__ = ['DeepSeekAPI']
\ No newline at end of file
+__all__ = [
+    'DeepSeekAPI', 'LLMCache', 'SingleFlight', 'ResiliencePolicy',
+    'LLMProfile', 'PROFILES', 'get_profile', 'UsageStats',
+    'LLMBackend', 'OpenAIBackend', 'MockBackend', 'CassetteBackend',
+    'LLMError', 'LLMRateLimitError', 'LLMTimeoutError', 'LLMConnectionError',
+    'LLMServerError', 'LLMUnavailableError', 'LLMResponseError'
+]
\ No newline at end of file
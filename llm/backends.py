@@ -0,0 +1,392 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from types import SimpleNamespace
+from config.settings import (
+    DEEPSEEK_API_KEY, DEEPSEEK_BASE_URL, LLM_BACKEND, LLM_CASSETTE_MODE, LLM_CASSETTE_PATH,
+    MOCK_LLM_LATENCY, MOCK_LLM_LATENCY_MEAN, MOCK_LLM_LATENCY_SPREAD,
+    MOCK_LLM_ERROR_RATE, MOCK_LLM_COMPLETION_TOKENS, MOCK_LLM_SEED, MOCK_LLM_TOKENS_PER_SECOND
+)
+from llm.errors import LLMError, LLMRateLimitError, LLMServerError
+
+class LLMBackend(ABC):
+    """Transport used by DeepSeekAPI to run OpenAI-style chat completions.
+
+    create/acreate take the keyword arguments of chat.completions.create and
+    return an object shaped like the OpenAI response (or an iterator of chunks
+    when stream=True). A subclass missing either method cannot be instantiated.
+    """
+    
+    @abstractmethod
+    def create(self, **kwargs):
+        """Run a chat completion."""
+    
+    @abstractmethod
+    async def acreate(self, **kwargs):
+        """Asynchronous counterpart of create."""
+
+class OpenAIBackend(LLMBackend):
+    """Backend talking to the DeepSeek OpenAI-compatible API.
+    
+    Both SDK clients run on the process-wide keep-alive HTTP transport, so
+    every backend instance reuses the same warm connection pool. The clients
+    are resolved on each call and rebuilt whenever the transport was replaced
+    (closed, or a new event loop), so a shared backend outlives aclose_transport
+    and successive asyncio.run calls.
+    """
+    
+    def __init__(self, api_key=DEEPSEEK_API_KEY, base_url=DEEPSEEK_BASE_URL):
+        if not api_key:
+            raise ValueError("DEEPSEEK_API_KEY not found in environment variables")
+        self.api_key = api_key
+        self.base_url = base_url
+        self._lock = threading.Lock()
+        self._clients = {}
+    
+    def _sdk_client(self, asynchronous):
+        """Return the SDK client bound to the current shared HTTP client."""
+        from openai import OpenAI, AsyncOpenAI
+        from llm.transport import get_http_client, get_async_http_client
+        
+        http_client = get_async_http_client() if asynchronous else get_http_client()
+        with self._lock:
+            bound_to, client = self._clients.get(asynchronous, (None, None))
+            if bound_to is not http_client:
+                factory = AsyncOpenAI if asynchronous else OpenAI
+                client = factory(api_key=self.api_key, base_url=self.base_url, http_client=http_client)
+                self._clients[asynchronous] = (http_client, client)
+            return client
+    
+    def create(self, **kwargs):
+        return self._sdk_client(False).chat.completions.create(**kwargs)
+    
+    async def acreate(self, **kwargs):
+        return await self._sdk_client(True).chat.completions.create(**kwargs)
+
+def _default_responder(prompt):
+    """Return a plausible canned answer for the prompts used by the bot."""
+    tema = re.search(r'"([^"]+)"', prompt)
+    tema = tema.group(1) if tema else "el tema solicitado"
+    if "SUFICIENTE" in prompt:
+        return "SUFICIENTE"
+    if "Which task should be executed next" in prompt:
+        return "1"
+    if "categoría" in prompt and "business" in prompt:
+        return "business"
+    if "formato JSON" in prompt:
+        return json.dumps({
+            "greeting": "Estimado/a:",
+            "paragraphs": [f"Este es un resumen sobre {tema}."],
+            "bullet_points": ["Punto clave uno", "Punto clave dos"],
+            "important_phrases": [],
+            "closing": "Atentamente,",
+            "signature": "Equipo de Investigación"
+        }, ensure_ascii=False)
+    if "asunto de correo" in prompt:
+        return f"Novedades sobre {tema}"
+    if "refina tu objetivo" in prompt:
+        return f"Producir contenido preciso y relevante sobre {tema}"
+    return None
+
+class MockBackend(LLMBackend):
+    """In-process stand-in for the API with configurable latency, errors and token counts."""
+    
+    def __init__(self, latency=MOCK_LLM_LATENCY, latency_mean=MOCK_LLM_LATENCY_MEAN,
+                 latency_spread=MOCK_LLM_LATENCY_SPREAD, error_rate=MOCK_LLM_ERROR_RATE,
+                 completion_tokens=MOCK_LLM_COMPLETION_TOKENS, seed=MOCK_LLM_SEED,
+                 responder=_default_responder, tokens_per_second=MOCK_LLM_TOKENS_PER_SECOND):
+        """
+        Args:
+            latency (str): Latency distribution: fixed, uniform, lognormal or exponential
+            latency_mean (float): Mean latency in seconds
+            latency_spread (float): Half-width for uniform, sigma for lognormal
+            error_rate (float): Probability (0-1) that a call fails with a retryable error
+            completion_tokens (int): Approximate length of generated answers
+            seed (int, optional): Seed for reproducible latencies and errors
+            responder (callable): Maps a prompt to a canned answer, or None for
+                the generic long-form answer
+            tokens_per_second (float): Decoding speed added on top of the latency
+                (0 makes the duration independent of the answer length)
+        """
+        if latency not in ("fixed", "uniform", "lognormal", "exponential"):
+            raise ValueError(f"Unknown mock latency distribution: {latency}")
+        self.latency = latency
+        self.latency_mean = latency_mean
+        self.latency_spread = latency_spread
+        self.error_rate = error_rate
+        self.completion_tokens = completion_tokens
+        self.responder = responder
+        self.tokens_per_second = tokens_per_second
+        self._random = random.Random(int(seed) if seed is not None else None)
+        self._lock = threading.Lock()
+        self.calls = 0
+    
+    def _sample_latency(self):
+        with self._lock:
+            self.calls += 1
+            if self.latency == "fixed":
+                return self.latency_mean
+            if self.latency == "uniform":
+                return max(0.0, self._random.uniform(self.latency_mean - self.latency_spread,
+                                                     self.latency_mean + self.latency_spread))
+            if self.latency == "exponential":
+                return self._random.expovariate(1 / self.latency_mean) if self.latency_mean else 0.0
+            # lognormal parametrised so that its mean is latency_mean
+            sigma = self.latency_spread
+            mu = math.log(self.latency_mean) - sigma ** 2 / 2 if self.latency_mean else 0.0
+            return self._random.lognormvariate(mu, sigma) if self.latency_mean else 0.0
+    
+    def _maybe_fail(self):
+        with self._lock:
+            failed = self._random.random() < self.error_rate
+            rate_limited = self._random.random() < 0.5
+        if failed:
+            if rate_limited:
+                raise LLMRateLimitError("Mock backend: simulated 429")
+            raise LLMServerError("Mock backend: simulated 503")
+    
+    def _answer(self, kwargs):
+        prompt = kwargs["messages"][-1]["content"]
+        answer = self.responder(prompt)
+        if answer is None:
+            tema = re.search(r'"([^"]+)"', prompt)
+            tema = tema.group(1) if tema else "el tema"
+            frase = f"Información relevante sobre {tema} con datos y ejemplos. "
+            words = ["Estimado/a:\n\n"]
+            while len(" ".join(words)) // 4 < self.completion_tokens:
+                words.append(frase)
+                if len(words) % 4 == 0:
+                    words.append("\n\n- Punto destacado. ")
+            words.append("\n\nAtentamente,\nEquipo de Investigación")
+            answer = "".join(words)
+        if kwargs.get("max_tokens"):
+            answer = answer[:kwargs["max_tokens"] * 4]
+        return prompt, answer
+    
+    @staticmethod
+    def _usage(prompt, answer):
+        prompt_tokens = max(1, len(prompt) // 4)
+        completion_tokens = max(1, len(answer) // 4)
+        return SimpleNamespace(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            total_tokens=prompt_tokens + completion_tokens
+        )
+    
+    def _response(self, prompt, answer):
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=answer), finish_reason="stop")],
+            usage=self._usage(prompt, answer)
+        )
+    
+    def _decode_time(self, answer):
+        """Seconds spent producing the answer at tokens_per_second."""
+        if not self.tokens_per_second:
+            return 0.0
+        return max(1, len(answer) // 4) / self.tokens_per_second
+    
+    @staticmethod
+    def _chunks(answer, size=16):
+        for start in range(0, len(answer), size):
+            yield SimpleNamespace(
+                choices=[SimpleNamespace(delta=SimpleNamespace(content=answer[start:start + size]))]
+            )
+    
+    def create(self, **kwargs):
+        latency = self._sample_latency()
+        prompt, answer = self._answer(kwargs)
+        if not kwargs.get("stream"):
+            time.sleep(latency + self._decode_time(answer))
+            self._maybe_fail()
+            return self._response(prompt, answer)
+        
+        chunks = list(self._chunks(answer))
+        # A fifth of the latency goes to the first token, the rest is spread over the stream
+        per_chunk = (latency * 4 / 5 + self._decode_time(answer)) / len(chunks)
+        time.sleep(latency / 5)
+        self._maybe_fail()
+        
+        def _stream():
+            for chunk in chunks:
+                time.sleep(per_chunk)
+                yield chunk
+        return _stream()
+    
+    async def acreate(self, **kwargs):
+        latency = self._sample_latency()
+        prompt, answer = self._answer(kwargs)
+        if not kwargs.get("stream"):
+            await asyncio.sleep(latency + self._decode_time(answer))
+            self._maybe_fail()
+            return self._response(prompt, answer)
+        
+        chunks = list(self._chunks(answer))
+        per_chunk = (latency * 4 / 5 + self._decode_time(answer)) / len(chunks)
+        await asyncio.sleep(latency / 5)
+        self._maybe_fail()
+        
+        async def _stream():
+            for chunk in chunks:
+                await asyncio.sleep(per_chunk)
+                yield chunk
+        return _stream()
+
+class CassetteBackend(LLMBackend):
+    """Record real request/response pairs to a gzipped JSONL cassette, or replay them offline.
+    
+    Entries are indexed by a hash of the request (model, temperature, messages,
+    max_tokens). When the same request was recorded several times, replay
+    returns the recorded responses in order.
+    """
+    
+    def __init__(self, path=LLM_CASSETTE_PATH, mode="replay", inner=None):
+        """
+        Args:
+            path (str): Cassette file
+            mode (str): "record" forwards to inner and appends each response;
+                "replay" answers only from the cassette
+            inner (LLMBackend, optional): Backend used when recording
+        """
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        if mode == "record" and inner is None:
+            raise ValueError("Recording a cassette requires an inner backend")
+        self.path = path
+        self.mode = mode
+        self.inner = inner
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._positions = {}
+        if os.path.exists(path):
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries.setdefault(entry["key"], []).append(entry)
+        elif mode == "replay":
+            raise FileNotFoundError(f"Cassette not found: {path}")
+    
+    @staticmethod
+    def request_key(kwargs):
+        """Hash the parts of the request that determine the response."""
+        relevant = {name: kwargs.get(name) for name in ("model", "temperature", "messages", "max_tokens")}
+        payload = json.dumps(relevant, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    def _append(self, key, content, usage):
+        entry = {
+            "key": key,
+            "content": content,
+            "usage": {
+                "prompt_tokens": getattr(usage, "prompt_tokens", 0),
+                "completion_tokens": getattr(usage, "completion_tokens", 0)
+            } if usage is not None else None
+        }
+        with self._lock:
+            self._entries.setdefault(key, []).append(entry)
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Each append adds a gzip member; gzip readers concatenate them transparently
+            with gzip.open(self.path, "at", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    
+    def _replay(self, kwargs):
+        key = self.request_key(kwargs)
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                raise LLMError(f"No recorded response in {self.path} for request {key[:12]}")
+            position = self._positions.get(key, 0)
+            self._positions[key] = position + 1
+            entry = entries[position % len(entries)]
+        usage = entry.get("usage") or {}
+        prompt_tokens = usage.get("prompt_tokens", 0)
+        completion_tokens = usage.get("completion_tokens", 0)
+        response = SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=entry["content"]), finish_reason="stop")],
+            usage=SimpleNamespace(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=prompt_tokens + completion_tokens
+            )
+        )
+        if kwargs.get("stream"):
+            return MockBackend._chunks(entry["content"])
+        return response
+    
+    def create(self, **kwargs):
+        if self.mode == "replay":
+            return self._replay(kwargs)
+        key = self.request_key(kwargs)
+        response = self.inner.create(**kwargs)
+        if not kwargs.get("stream"):
+            self._append(key, response.choices[0].message.content, getattr(response, "usage", None))
+            return response
+        
+        def _recording():
+            parts = []
+            for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                yield chunk
+            self._append(key, "".join(parts), None)
+        return _recording()
+    
+    async def acreate(self, **kwargs):
+        if self.mode == "replay":
+            result = self._replay(kwargs)
+            if not kwargs.get("stream"):
+                return result
+            
+            async def _replaying():
+                for chunk in result:
+                    yield chunk
+            return _replaying()
+        key = self.request_key(kwargs)
+        response = await self.inner.acreate(**kwargs)
+        if not kwargs.get("stream"):
+            self._append(key, response.choices[0].message.content, getattr(response, "usage", None))
+            return response
+        
+        async def _recording():
+            parts = []
+            async for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                yield chunk
+            self._append(key, "".join(parts), None)
+        return _recording()
+
+_shared_backends = {}
+_shared_lock = threading.Lock()
+
+def create_backend(name=LLM_BACKEND, cassette_mode=LLM_CASSETTE_MODE):
+    """Return the process-wide backend selected in settings."""
+    with _shared_lock:
+        key = (name, cassette_mode)
+        if key not in _shared_backends:
+            _shared_backends[key] = _build_backend(name, cassette_mode)
+        return _shared_backends[key]
+
+def _build_backend(name, cassette_mode):
+    """Build a backend, wrapped in a cassette when enabled."""
+    if cassette_mode == "replay":
+        return CassetteBackend(mode="replay")
+    if name == "mock":
+        backend = MockBackend()
+    elif name == "deepseek":
+        backend = OpenAIBackend()
+    else:
+        raise ValueError(f"Unknown LLM backend: {name}")
+    if cassette_mode == "record":
+        return CassetteBackend(mode="record", inner=backend)
+    return backend
\ No newline at end of file
@@ -0,0 +1,130 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from config.settings import (
+    LLM_CACHE_PATH, LLM_CACHE_TTL, LLM_CACHE_MEMORY_ENTRIES, LLM_CACHE_MAX_ENTRIES
+)
+
+class LLMCache:
+    """Two-tier (in-memory LRU + SQLite) cache for LLM responses."""
+    
+    def __init__(self, path=LLM_CACHE_PATH, ttl=LLM_CACHE_TTL,
+                 memory_entries=LLM_CACHE_MEMORY_ENTRIES, max_entries=LLM_CACHE_MAX_ENTRIES):
+        """Initialize the cache.
+
+        Args:
+            path (str): SQLite file for the disk tier, or None for memory only
+            ttl (float): Seconds an entry stays valid (0 disables expiry)
+            memory_entries (int): Capacity of the in-memory LRU tier
+            max_entries (int): Capacity of the disk tier
+        """
+        self.path = path
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self._db = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON responses(accessed_at)")
+            self._db.commit()
+    
+    @staticmethod
+    def make_key(model, temperature, prompt):
+        """Build the cache key from model, temperature and a hash of the prompt."""
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        return f"{model}:{temperature}:{prompt_hash}"
+    
+    def _expired(self, created_at, now):
+        return bool(self.ttl) and now - created_at > self.ttl
+    
+    def get(self, key):
+        """Return the cached response for key, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                response, created_at = entry
+                if not self._expired(created_at, now):
+                    self._memory.move_to_end(key)
+                    self.hits_memory += 1
+                    return response
+                del self._memory[key]
+            
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    response, created_at = row
+                    if not self._expired(created_at, now):
+                        self._db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                        self._db.commit()
+                        self._remember(key, response, created_at)
+                        self.hits_disk += 1
+                        return response
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._db.commit()
+            
+            self.misses += 1
+            return None
+    
+    def set(self, key, response):
+        """Store a response in both tiers, evicting the least recently used entries."""
+        now = time.time()
+        with self._lock:
+            self._remember(key, response, now)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, response, now, now)
+                )
+                self._db.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    "SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+                self._db.commit()
+    
+    def _remember(self, key, response, created_at):
+        self._memory[key] = (response, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+    
+    def clear(self):
+        """Remove every cached response."""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+    
+    def stats(self):
+        """Return hit/miss counters for both tiers."""
+        hits = self.hits_memory + self.hits_disk
+        total = hits + self.misses
+        return {
+            "hits_memory": self.hits_memory,
+            "hits_disk": self.hits_disk,
+            "misses": self.misses,
+            "hit_ratio": hits / total if total else 0.0,
+            "memory_entries": len(self._memory)
+        }
@@ -1,30 +1,302 @@
-import os
-from openai import OpenAI
-from config.settings import DEEPSEEK_API_KEY, DEEPSEEK_BASE_URL
+import asyncio
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config.settings import LLM_CACHE_ENABLED, DEEPSEEK_MAX_CONCURRENCY
+from llm.backends import create_backend
+from llm.cache import LLMCache
+from llm.errors import LLMResponseError, classify_error
+from llm.resilience import ResiliencePolicy, check_abort
+from llm.routing import LatencyStats, get_profile
+from llm.usage import UsageStats
+from llm.singleflight import SingleFlight
+from utils.tracing import span, span_actual
+
+# Marks an omitted cache argument, so that None can mean "no cache"
+_DEFAULT_CACHE = object()
 
 class DeepSeekAPI:
-    def __init__(self, model="deepseek-chat", temperature=0.7):
-        """Initialize DeepSeek API wrapper."""
-        if not DEEPSEEK_API_KEY:
-            raise ValueError("DEEPSEEK_API_KEY not found in environment variables")
+    def __init__(self, model="deepseek-chat", temperature=0.7, cache=_DEFAULT_CACHE, coalesce=True,
+                 resilience=None, backend=None):
+        """Initialize DeepSeek API wrapper.
+
+        Args:
+            model (str): Model name
+            temperature (float): Sampling temperature
+            cache (LLMCache, optional): Response cache; None or False disables
+                caching, and when omitted a shared cache built from settings is
+                used if LLM_CACHE_ENABLED is set
+            coalesce (bool): Share one upstream call among concurrent
+                identical requests
+            resilience (ResiliencePolicy, optional): Rate limiting, retry and
+                circuit-breaker policy; defaults to one shared by all instances
+            backend (LLMBackend, optional): Transport for the completions;
+                defaults to the one selected by LLM_BACKEND in settings
         
+        Methods raise LLMError subclasses when the API call fails.
+        """
         self.model = model
         self.temperature = temperature
-        self.client = OpenAI(
-            api_key=DEEPSEEK_API_KEY,
-            base_url=DEEPSEEK_BASE_URL
-        )
-        
-    def generate(self, prompt):
-        """Generate a response using the DeepSeek API."""
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=self.temperature,
-                stream=False
+        self.backend = backend or create_backend()
+        if cache is _DEFAULT_CACHE:
+            cache = _default_cache() if LLM_CACHE_ENABLED else None
+        self.cache = None if cache is False else cache
+        self.singleflight = SingleFlight() if coalesce else None
+        self.resilience = resilience or _default_resilience()
+        self.latency = LatencyStats()
+        self.usage = UsageStats()
+    
+    def _resolve(self, profile):
+        """Return (profile, model, temperature) for a call tagged with profile."""
+        profile = get_profile(profile)
+        model = profile.model or self.model
+        temperature = self.temperature if profile.temperature is None else profile.temperature
+        return profile, model, temperature
+    
+    def _request_kwargs(self, prompt, stream=False, profile=None, system=None):
+        """Build the chat completion arguments shared by sync and async calls.
+        
+        The stable system message goes first so the provider can reuse its
+        cached prefix across calls; only the user message varies.
+        """
+        profile, model, temperature = self._resolve(profile)
+        messages = [{"role": "user", "content": prompt}]
+        if system:
+            messages.insert(0, {"role": "system", "content": system})
+        kwargs = {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "stream": stream,
+            "timeout": profile.timeout
+        }
+        if stream:
+            kwargs["stream_options"] = {"include_usage": True}
+        if profile.max_tokens:
+            kwargs["max_tokens"] = profile.max_tokens
+        return kwargs
+    
+    def _cache_key(self, prompt, use_cache, profile=None, system=None):
+        """Return the cache key for prompt, or None when caching is off."""
+        if not use_cache or self.cache is None:
+            return None
+        return self._flight_key(prompt, profile, system)
+    
+    def _store(self, key, response):
+        if key is not None:
+            self.cache.set(key, response)
+    
+    def _flight_key(self, prompt, profile=None, system=None):
+        profile, model, temperature = self._resolve(profile)
+        if system:
+            prompt = f"{system}\x00{prompt}"
+        return LLMCache.make_key(f"{model}/{profile.max_tokens}", temperature, prompt)
+    
+    def _record_usage(self, tag, usage):
+        """Aggregate a usage block per tag and attach its token counts to the active span."""
+        self.usage.record(tag, usage)
+        if usage is not None:
+            hit, _ = UsageStats.cache_tokens(usage)
+            span_actual().sumar(
+                prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+                completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+                cache_hit_tokens=hit
             )
-            return response.choices[0].message.content
-        except Exception as e:
-            print(f"Error calling DeepSeek API: {str(e)}")
-            return f"Error: {str(e)}"
\ No newline at end of file
+    
+    @staticmethod
+    def _content(response):
+        content = response.choices[0].message.content
+        if not content:
+            raise LLMResponseError("DeepSeek returned an empty response")
+        return content
+    
+    def _call(self, prompt, key, profile=None, system=None, tag=None):
+        kwargs = self._request_kwargs(prompt, profile=profile, system=system)
+        start = time.monotonic()
+        response = self.resilience.call(lambda: self.backend.create(**kwargs))
+        self.latency.record(profile or "default", time.monotonic() - start)
+        self._record_usage(tag, getattr(response, "usage", None))
+        content = self._content(response)
+        self._store(key, content)
+        return content
+    
+    async def _acall(self, prompt, key, profile=None, system=None, tag=None):
+        kwargs = self._request_kwargs(prompt, profile=profile, system=system)
+        start = time.monotonic()
+        response = await self.resilience.acall(lambda: self.backend.acreate(**kwargs))
+        self.latency.record(profile or "default", time.monotonic() - start)
+        self._record_usage(tag, getattr(response, "usage", None))
+        content = self._content(response)
+        self._store(key, content)
+        return content
+    
+    def generate(self, prompt, use_cache=False, profile=None, system=None, tag=None):
+        """Generate a response using the DeepSeek API.
+        
+        Args:
+            prompt (str): Prompt to send
+            use_cache (bool): Serve and store the response through the cache
+            profile (str, optional): Routing profile tagging the call site
+                (see llm.routing.PROFILES); None uses "default"
+            system (str, optional): Stable system message sent before the prompt
+            tag (str, optional): Label (e.g. agent name) for token usage reporting
+        """
+        with span("llm", profile or "default", etiqueta=tag) as llm_span:
+            key = self._cache_key(prompt, use_cache, profile, system)
+            if key is not None:
+                cached = self.cache.get(key)
+                llm_span.registrar(cache="hit" if cached is not None else "miss")
+                if cached is not None:
+                    return cached
+            call = lambda: self._call(prompt, key, profile, system, tag)
+            if self.singleflight is None:
+                return call()
+            return self.singleflight.do(self._flight_key(prompt, profile, system), call)
+    
+    async def agenerate(self, prompt, use_cache=False, profile=None, system=None, tag=None):
+        """Generate a response without blocking the running event loop."""
+        with span("llm", profile or "default", etiqueta=tag) as llm_span:
+            key = self._cache_key(prompt, use_cache, profile, system)
+            if key is not None:
+                cached = self.cache.get(key)
+                llm_span.registrar(cache="hit" if cached is not None else "miss")
+                if cached is not None:
+                    return cached
+            call = lambda: self._acall(prompt, key, profile, system, tag)
+            if self.singleflight is None:
+                return await call()
+            return await self.singleflight.ado(self._flight_key(prompt, profile, system), call)
+    
+    def generate_many(self, prompts, max_concurrency=DEEPSEEK_MAX_CONCURRENCY, use_cache=False, profile=None,
+                      systems=None, tags=None):
+        """Generate responses for a batch of prompts concurrently.
+        
+        Args:
+            prompts (list): Prompts to send
+            max_concurrency (int): Maximum number of requests in flight for this batch
+            use_cache (bool): Serve and store the responses through the cache
+            profile (str, optional): Routing profile for every prompt in the batch
+            systems (list, optional): System message for each prompt
+            tags (list, optional): Usage tag for each prompt
+        
+        Returns:
+            list: Responses in the same order as prompts
+        """
+        if not prompts:
+            return []
+        systems = systems or [None] * len(prompts)
+        tags = tags or [None] * len(prompts)
+        # One copy of the caller's context per prompt keeps the spans under the caller's span
+        contexts = [contextvars.copy_context() for _ in prompts]
+        with ThreadPoolExecutor(max_workers=min(max_concurrency, len(prompts))) as executor:
+            return list(executor.map(
+                lambda args: args[3].run(self.generate, args[0], use_cache=use_cache, profile=profile,
+                                         system=args[1], tag=args[2]),
+                zip(prompts, systems, tags, contexts)
+            ))
+    
+    async def agenerate_many(self, prompts, max_concurrency=DEEPSEEK_MAX_CONCURRENCY, use_cache=False, profile=None,
+                             systems=None, tags=None):
+        """Asynchronous counterpart of generate_many."""
+        semaphore = asyncio.Semaphore(max_concurrency)
+        systems = systems or [None] * len(prompts)
+        tags = tags or [None] * len(prompts)
+        
+        async def _one(prompt, system, tag):
+            async with semaphore:
+                return await self.agenerate(prompt, use_cache=use_cache, profile=profile, system=system, tag=tag)
+        
+        return list(await asyncio.gather(*[_one(*args) for args in zip(prompts, systems, tags)]))
+    
+    def stream(self, prompt, system=None, tag=None):
+        """Yield the response text in chunks as the API produces them.
+        
+        The request is retried only while nothing has been yielded yet.
+        """
+        with span("llm", "stream", etiqueta=tag):
+            attempt = 0
+            while True:
+                started = False
+                with self.resilience.slot():
+                    try:
+                        response = self.backend.create(**self._request_kwargs(prompt, stream=True, system=system))
+                        try:
+                            for chunk in response:
+                                # Stop reading (and close the connection) once the caller gave up
+                                check_abort()
+                                if getattr(chunk, "usage", None):
+                                    self._record_usage(tag, chunk.usage)
+                                if chunk.choices and chunk.choices[0].delta.content:
+                                    started = True
+                                    yield chunk.choices[0].delta.content
+                        finally:
+                            close = getattr(response, "close", None)
+                            if close is not None:
+                                close()
+                    except Exception as e:
+                        if started:
+                            raise classify_error(e) from e
+                        delay = self.resilience.retry_delay(attempt, e)
+                    else:
+                        self.resilience.breaker.record_success()
+                        return
+                time.sleep(delay)
+                attempt += 1
+    
+    async def astream(self, prompt, system=None, tag=None):
+        """Asynchronously yield the response text in chunks as the API produces them."""
+        with span("llm", "stream", etiqueta=tag):
+            attempt = 0
+            while True:
+                started = False
+                async with self.resilience.aslot():
+                    try:
+                        response = await self.backend.acreate(**self._request_kwargs(prompt, stream=True, system=system))
+                        async for chunk in response:
+                            if getattr(chunk, "usage", None):
+                                self._record_usage(tag, chunk.usage)
+                            if chunk.choices and chunk.choices[0].delta.content:
+                                started = True
+                                yield chunk.choices[0].delta.content
+                    except Exception as e:
+                        if started:
+                            raise classify_error(e) from e
+                        delay = self.resilience.retry_delay(attempt, e)
+                    else:
+                        self.resilience.breaker.record_success()
+                        return
+                await asyncio.sleep(delay)
+                attempt += 1
+    
+    def cache_stats(self):
+        """Return cache hit/miss counters, or None when caching is disabled."""
+        return self.cache.stats() if self.cache is not None else None
+    
+    def metrics(self):
+        """Return cache, coalescing, resilience, per-profile latency and per-tag token usage."""
+        return {
+            "cache": self.cache_stats(),
+            "coalescing": self.singleflight.stats() if self.singleflight is not None else None,
+            "resilience": self.resilience.stats(),
+            "latency": self.latency.stats(),
+            "usage": self.usage.stats()
+        }
+
+
+_shared_cache = None
+
+def _default_cache():
+    """Return the process-wide cache configured in settings."""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = LLMCache()
+    return _shared_cache
+
+_shared_resilience = None
+
+def _default_resilience():
+    """Return the process-wide resilience policy configured in settings."""
+    global _shared_resilience
+    if _shared_resilience is None:
+        _shared_resilience = ResiliencePolicy()
+    return _shared_resilience
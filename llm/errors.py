@@ -0,0 +1,59 @@
+class LLMError(Exception):
+    """Base error raised by the LLM client instead of returning sentinel strings."""
+    retryable = False
+    
+    def __init__(self, message="", retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class LLMRateLimitError(LLMError):
+    """The provider rejected the request with HTTP 429."""
+    retryable = True
+
+class LLMTimeoutError(LLMError):
+    """The request did not complete within the configured timeout."""
+    retryable = True
+
+class LLMConnectionError(LLMError):
+    """The provider could not be reached."""
+    retryable = True
+
+class LLMServerError(LLMError):
+    """The provider answered with a 5xx status."""
+    retryable = True
+
+class LLMUnavailableError(LLMError):
+    """The circuit breaker is open and requests are failing fast."""
+
+class LLMResponseError(LLMError):
+    """The provider answered but the response has no usable content."""
+
+def _retry_after(error):
+    """Read the Retry-After header (in seconds) from an SDK error, if present."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+def classify_error(error):
+    """Translate an OpenAI SDK exception into the matching LLMError."""
+    if isinstance(error, LLMError):
+        return error
+    message = str(error)
+    # The SDK is only needed by the deepseek backend; mock and cassette runs work without it
+    try:
+        import openai
+    except ImportError:
+        openai = None
+    if openai is not None:
+        if isinstance(error, openai.APITimeoutError):
+            return LLMTimeoutError(message)
+        if isinstance(error, openai.APIConnectionError):
+            return LLMConnectionError(message)
+        if isinstance(error, openai.RateLimitError):
+            return LLMRateLimitError(message, retry_after=_retry_after(error))
+    status_code = getattr(error, "status_code", None)
+    if status_code is not None and (status_code >= 500 or status_code in (408, 409)):
+        return LLMServerError(message, retry_after=_retry_after(error))
+    return LLMError(message)
\ No newline at end of file
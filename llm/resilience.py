@@ -0,0 +1,251 @@
+import asyncio
+import contextvars
+import random
+import threading
+import time
+from contextlib import contextmanager, asynccontextmanager
+from config.settings import (
+    DEEPSEEK_RATE_LIMIT, DEEPSEEK_RATE_BURST, DEEPSEEK_MAX_CONCURRENCY,
+    DEEPSEEK_MAX_RETRIES, DEEPSEEK_BACKOFF_BASE, DEEPSEEK_BACKOFF_MAX,
+    DEEPSEEK_BREAKER_THRESHOLD, DEEPSEEK_BREAKER_RESET
+)
+from llm.errors import LLMUnavailableError, classify_error
+
+# Installed by callers that may stop waiting for a synchronous call (a thread
+# cannot be interrupted), so that an abandoned call stops issuing requests
+_abort_check = contextvars.ContextVar("llm_abort_check", default=None)
+
+@contextmanager
+def abort_when(check):
+    """Run the block with check() consulted before every upstream attempt.
+    
+    check raises to abandon the synchronous LLM calls made inside the block:
+    before each attempt or retry, and between the chunks of a stream.
+    """
+    token = _abort_check.set(check)
+    try:
+        yield
+    finally:
+        _abort_check.reset(token)
+
+def check_abort():
+    """Raise if the current caller abandoned its synchronous LLM calls."""
+    check = _abort_check.get()
+    if check is not None:
+        check()
+
+class TokenBucket:
+    """Token-bucket rate limiter shared by sync and async callers."""
+    
+    def __init__(self, rate=DEEPSEEK_RATE_LIMIT, capacity=DEEPSEEK_RATE_BURST):
+        """
+        Args:
+            rate (float): Tokens added per second (0 disables limiting)
+            capacity (int): Maximum burst size
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _reserve(self):
+        """Take a token and return how long the caller must wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+    
+    def acquire(self):
+        if self.rate > 0:
+            wait = self._reserve()
+            if wait:
+                time.sleep(wait)
+    
+    async def aacquire(self):
+        if self.rate > 0:
+            wait = self._reserve()
+            if wait:
+                await asyncio.sleep(wait)
+
+class InFlightLimiter:
+    """Process-wide cap on concurrent upstream requests."""
+    
+    def __init__(self, limit=DEEPSEEK_MAX_CONCURRENCY):
+        self.limit = limit
+        self._semaphore = threading.BoundedSemaphore(limit)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+    
+    def _entered(self):
+        with self._lock:
+            self.in_flight += 1
+    
+    def acquire(self):
+        self._semaphore.acquire()
+        self._entered()
+    
+    async def aacquire(self):
+        # The semaphore is shared with threads, so poll instead of blocking the loop
+        while not self._semaphore.acquire(blocking=False):
+            await asyncio.sleep(0.01)
+        self._entered()
+    
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+        self._semaphore.release()
+
+class CircuitBreaker:
+    """Fail fast after repeated upstream failures, probing again after a cool-down.
+    
+    Once the cool-down ends (half-open) a single caller is let through as a probe
+    and the rest keep failing fast; the probe's outcome closes or reopens the
+    circuit. A probe that never reports back (cancelled, aborted, or failed with a
+    non-retryable error, which is not counted as a failure) is replaced after
+    another reset_timeout.
+    """
+    
+    def __init__(self, failure_threshold=DEEPSEEK_BREAKER_THRESHOLD, reset_timeout=DEEPSEEK_BREAKER_RESET):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.probe_started_at = None
+        self._lock = threading.Lock()
+    
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+    
+    def before_call(self):
+        """Raise LLMUnavailableError while the circuit is open or a half-open probe is in flight."""
+        with self._lock:
+            state = self.state
+            if state == "open":
+                raise LLMUnavailableError("DeepSeek circuit breaker is open; failing fast")
+            if state == "half_open":
+                now = time.monotonic()
+                if self.probe_started_at is not None and now - self.probe_started_at < self.reset_timeout:
+                    raise LLMUnavailableError("DeepSeek circuit breaker is half-open and probing; failing fast")
+                self.probe_started_at = now
+    
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probe_started_at = None
+    
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.probe_started_at is not None or self.failures >= self.failure_threshold:
+                # A failed probe reopens the circuit for another cool-down
+                self.opened_at = time.monotonic()
+                self.probe_started_at = None
+
+class ResiliencePolicy:
+    """Rate limiting, concurrency cap, retries with jittered backoff and a circuit breaker."""
+    
+    def __init__(self, bucket=None, limiter=None, breaker=None,
+                 max_retries=DEEPSEEK_MAX_RETRIES, backoff_base=DEEPSEEK_BACKOFF_BASE,
+                 backoff_max=DEEPSEEK_BACKOFF_MAX):
+        self.bucket = bucket or TokenBucket()
+        self.limiter = limiter or InFlightLimiter()
+        self.breaker = breaker or CircuitBreaker()
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retries = 0
+    
+    def _backoff(self, attempt, error):
+        """Exponential backoff with full jitter, honouring Retry-After when given."""
+        if error.retry_after is not None:
+            return min(error.retry_after, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+    
+    def retry_delay(self, attempt, exc):
+        """Classify exc and return the delay before retrying it, or raise it as an LLMError."""
+        error = classify_error(exc)
+        if error.retryable:
+            self.breaker.record_failure()
+        if not error.retryable or attempt >= self.max_retries:
+            raise error from exc
+        self.retries += 1
+        delay = self._backoff(attempt, error)
+        print(f"Retrying DeepSeek call in {delay:.1f}s after: {error}")
+        return delay
+    
+    @contextmanager
+    def slot(self):
+        """Hold a rate-limited, concurrency-capped slot for one upstream request."""
+        check_abort()
+        self.breaker.before_call()
+        self.bucket.acquire()
+        self.limiter.acquire()
+        try:
+            # Waiting for the slot may have outlasted the caller
+            check_abort()
+            yield
+        finally:
+            self.limiter.release()
+    
+    @asynccontextmanager
+    async def aslot(self):
+        """Asynchronous counterpart of slot."""
+        self.breaker.before_call()
+        await self.bucket.aacquire()
+        await self.limiter.aacquire()
+        try:
+            yield
+        finally:
+            self.limiter.release()
+    
+    def call(self, fn):
+        """Run fn() under the policy and return its result.
+        
+        Raises:
+            LLMError: When the call fails permanently or the circuit is open
+        """
+        attempt = 0
+        while True:
+            with self.slot():
+                try:
+                    result = fn()
+                except Exception as e:
+                    delay = self.retry_delay(attempt, e)
+                else:
+                    self.breaker.record_success()
+                    return result
+            time.sleep(delay)
+            attempt += 1
+    
+    async def acall(self, coro_fn):
+        """Asynchronous counterpart of call; coro_fn returns an awaitable."""
+        attempt = 0
+        while True:
+            async with self.aslot():
+                try:
+                    result = await coro_fn()
+                except Exception as e:
+                    delay = self.retry_delay(attempt, e)
+                else:
+                    self.breaker.record_success()
+                    return result
+            await asyncio.sleep(delay)
+            attempt += 1
+    
+    def stats(self):
+        return {
+            "in_flight": self.limiter.in_flight,
+            "retries": self.retries,
+            "circuit": self.breaker.state
+        }
\ No newline at end of file
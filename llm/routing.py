@@ -0,0 +1,71 @@
+import threading
+from collections import deque
+from config.settings import LLM_FAST_MODEL, LLM_DEFAULT_TIMEOUT, LLM_FAST_TIMEOUT
+from utils.estadisticas import percentil
+
+class LLMProfile:
+    """Request settings for a family of call sites."""
+    
+    def __init__(self, name, model=None, temperature=None, max_tokens=None, timeout=LLM_DEFAULT_TIMEOUT):
+        """
+        Args:
+            name (str): Profile name used to tag call sites
+            model (str, optional): Model override; None keeps the client's model
+            temperature (float, optional): Temperature override; None keeps the client's
+            max_tokens (int, optional): Cap on completion tokens
+            timeout (float): Request timeout in seconds
+        """
+        self.name = name
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.timeout = timeout
+
+PROFILES = {
+    # Long-form generation: research, analysis, email writing
+    "default": LLMProfile("default"),
+    # Pick one label or number out of a closed list
+    "classification": LLMProfile("classification", model=LLM_FAST_MODEL, temperature=0.0,
+                                 max_tokens=16, timeout=LLM_FAST_TIMEOUT),
+    # One line or a short paragraph: subject lines, refined goals, sufficiency checks
+    "short": LLMProfile("short", model=LLM_FAST_MODEL, temperature=0.3,
+                        max_tokens=200, timeout=LLM_FAST_TIMEOUT),
+    # Structured extraction (JSON) from existing text
+    "extraction": LLMProfile("extraction", model=LLM_FAST_MODEL, temperature=0.0,
+                             max_tokens=1200, timeout=LLM_DEFAULT_TIMEOUT),
+}
+
+def get_profile(name):
+    """Return the profile registered under name (None means "default")."""
+    name = name or "default"
+    if name not in PROFILES:
+        raise ValueError(f"Unknown LLM profile: {name}")
+    return PROFILES[name]
+
+class LatencyStats:
+    """Per-profile call counts and latency percentiles over a sliding window."""
+    
+    def __init__(self, window=500):
+        self.window = window
+        self._samples = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+    
+    def record(self, profile_name, seconds):
+        with self._lock:
+            self._samples.setdefault(profile_name, deque(maxlen=self.window)).append(seconds)
+            self._counts[profile_name] = self._counts.get(profile_name, 0) + 1
+    
+    def stats(self):
+        """Return {profile: {"calls", "p50", "p95", "mean"}} in seconds."""
+        with self._lock:
+            result = {}
+            for name, samples in self._samples.items():
+                ordered = sorted(samples)
+                result[name] = {
+                    "calls": self._counts[name],
+                    "p50": percentil(ordered, 0.5),
+                    "p95": percentil(ordered, 0.95),
+                    "mean": sum(ordered) / len(ordered)
+                }
+            return result
\ No newline at end of file
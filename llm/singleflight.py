@@ -0,0 +1,118 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+
+class SingleFlight:
+    """Coalesce concurrent identical calls so only one reaches the upstream API."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._async_calls = {}
+        self.requests = 0
+        self.upstream_calls = 0
+        self.coalesced = 0
+    
+    def _register(self, leader):
+        with self._lock:
+            self.requests += 1
+            if leader:
+                self.upstream_calls += 1
+            else:
+                self.coalesced += 1
+    
+    def do(self, key, fn):
+        """Run fn() once per key among concurrent callers and share its result.
+
+        Args:
+            key (str): Identity of the request
+            fn (callable): Function performing the upstream call
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+        self._register(leader)
+        
+        if not leader:
+            return future.result()
+        
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+    
+    async def ado(self, key, coro_fn):
+        """Asynchronous counterpart of do; coro_fn returns an awaitable.
+        
+        If the leader is cancelled, its cancellation is not shared: the waiters
+        retry, and one of them becomes the new leader.
+        """
+        loop = asyncio.get_running_loop()
+        loop_key = (id(loop), key)
+        first = True
+        while True:
+            future = self._async_calls.get(loop_key)
+            leader = future is None
+            if leader:
+                future = loop.create_future()
+                self._async_calls[loop_key] = future
+            if first:
+                self._register(leader)
+                first = False
+            elif leader:
+                with self._lock:
+                    self.upstream_calls += 1
+            
+            if not leader:
+                try:
+                    # shield: a cancelled waiter must not cancel the shared call
+                    return await asyncio.shield(future)
+                except _LeaderCancelled:
+                    continue
+            
+            try:
+                result = await coro_fn()
+            except asyncio.CancelledError:
+                self._release(loop_key, future)
+                future.set_exception(_LeaderCancelled())
+                future.exception()
+                raise
+            except BaseException as e:
+                future.set_exception(e)
+                # Mark the exception as retrieved when nobody else was waiting
+                future.exception()
+                raise
+            else:
+                future.set_result(result)
+                return result
+            finally:
+                self._release(loop_key, future)
+    
+    def _release(self, loop_key, future):
+        # A waiter promoted after a cancellation may already own the key
+        if self._async_calls.get(loop_key) is future:
+            del self._async_calls[loop_key]
+    
+    def stats(self):
+        """Return request counters and the fraction of requests that were coalesced."""
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "upstream_calls": self.upstream_calls,
+                "coalesced": self.coalesced,
+                "coalescing_ratio": self.coalesced / self.requests if self.requests else 0.0
+            }
+
+
+class _LeaderCancelled(Exception):
+    """Raised to the waiters of a call whose leader was cancelled, so they retry."""
@@ -0,0 +1,78 @@
+import asyncio
+import threading
+import httpx
+from config.settings import (
+    LLM_HTTP_MAX_CONNECTIONS, LLM_HTTP_MAX_KEEPALIVE, LLM_HTTP_KEEPALIVE_EXPIRY, LLM_HTTP2,
+    LLM_CONNECT_TIMEOUT, LLM_READ_TIMEOUT, LLM_WRITE_TIMEOUT, LLM_POOL_TIMEOUT
+)
+
+_lock = threading.Lock()
+_client = None
+_async_client = None
+_async_loop = None
+
+def _http2_available():
+    """HTTP/2 needs the optional h2 package."""
+    if not LLM_HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        print("LLM_HTTP2 is enabled but the 'h2' package is not installed; using HTTP/1.1")
+        return False
+    return True
+
+def _client_options():
+    return {
+        "limits": httpx.Limits(
+            max_connections=LLM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=LLM_HTTP_KEEPALIVE_EXPIRY
+        ),
+        "timeout": httpx.Timeout(
+            connect=LLM_CONNECT_TIMEOUT,
+            read=LLM_READ_TIMEOUT,
+            write=LLM_WRITE_TIMEOUT,
+            pool=LLM_POOL_TIMEOUT
+        ),
+        "http2": _http2_available()
+    }
+
+def get_http_client():
+    """Return the process-wide keep-alive HTTP client for synchronous LLM calls."""
+    global _client
+    with _lock:
+        if _client is None or _client.is_closed:
+            _client = httpx.Client(**_client_options())
+        return _client
+
+def get_async_http_client():
+    """Return the keep-alive HTTP client for asynchronous LLM calls on the running loop.
+    
+    An httpx.AsyncClient only works on the event loop that first used it, so a
+    new loop (a second asyncio.run in batch or a benchmark) gets a new client.
+    """
+    global _async_client, _async_loop
+    loop = asyncio.get_running_loop()
+    with _lock:
+        if _async_client is None or _async_client.is_closed or _async_loop is not loop:
+            _async_client = httpx.AsyncClient(**_client_options())
+            _async_loop = loop
+        return _async_client
+
+def close_transport():
+    """Close the shared sync client; the async one is closed with aclose_transport."""
+    global _client
+    with _lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+async def aclose_transport():
+    """Close both shared clients from inside the event loop that used them."""
+    global _async_client, _async_loop
+    close_transport()
+    with _lock:
+        client, _async_client, _async_loop = _async_client, None, None
+    if client is not None:
+        await client.aclose()
\ No newline at end of file
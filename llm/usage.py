@@ -0,0 +1,47 @@
+import threading
+
+class UsageStats:
+    """Token usage per tag (usually the agent name), including provider prefix-cache hits."""
+    
+    FIELDS = ("calls", "prompt_tokens", "completion_tokens", "cache_hit_tokens", "cache_miss_tokens")
+    
+    def __init__(self):
+        self._totals = {}
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def cache_tokens(usage):
+        """Read cache hit/miss tokens from DeepSeek or OpenAI style usage objects."""
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        hit = getattr(usage, "prompt_cache_hit_tokens", None)
+        miss = getattr(usage, "prompt_cache_miss_tokens", None)
+        if hit is None:
+            details = getattr(usage, "prompt_tokens_details", None)
+            hit = getattr(details, "cached_tokens", 0) or 0
+        if miss is None:
+            miss = max(0, prompt_tokens - hit)
+        return hit, miss
+    
+    def record(self, tag, usage):
+        """Add the usage block of one response under tag."""
+        if usage is None:
+            return
+        hit, miss = self.cache_tokens(usage)
+        with self._lock:
+            totals = self._totals.setdefault(tag or "default", dict.fromkeys(self.FIELDS, 0))
+            totals["calls"] += 1
+            totals["prompt_tokens"] += getattr(usage, "prompt_tokens", 0) or 0
+            totals["completion_tokens"] += getattr(usage, "completion_tokens", 0) or 0
+            totals["cache_hit_tokens"] += hit
+            totals["cache_miss_tokens"] += miss
+    
+    def stats(self):
+        """Return totals per tag with the share of prompt tokens served from the provider cache."""
+        with self._lock:
+            result = {}
+            for tag, totals in self._totals.items():
+                entry = dict(totals)
+                cached = entry["cache_hit_tokens"] + entry["cache_miss_tokens"]
+                entry["cache_hit_ratio"] = entry["cache_hit_tokens"] / cached if cached else 0.0
+                result[tag] = entry
+            return result
\ No newline at end of file
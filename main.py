@@ -1,20 +1,18 @@
 import os
 import re
+import time
 import logging
 from telegram import Update, ForceReply
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes, ConversationHandler
 
 from llm.deepseek import DeepSeekAPI
-from agents.researcher import ResearcherAgent
-from agents.analyst import AnalystAgent
-from agents.communicator import CommunicatorAgent
-from agents.template_agent import TemplateAgent
-from workflow.task import Task
-from workflow.workflow import MultiAgentWorkflow
+from llm.errors import LLMError
+from llm.transport import aclose_transport
+from pipeline import crear_memorias, aprecargar_memorias, generar_correo
+from workflow.journal import DiarioEjecucion
+from workflow.cancellation import TokenCancelacion, EjecucionCancelada, PlazoExcedido
 from utils.email_utils import send_email
-from utils.text_processing import clean_email_content
 from config.settings import DEFAULT_EMAIL_RECIPIENTS
-from memory.agente_memory import AgenteMemoria
 
 # Configurar logging
 logging.basicConfig(
@@ -32,18 +30,48 @@ conversation_data = {}
 # Inicializar recursos compartidos
 deepseek = DeepSeekAPI(model="deepseek-chat", temperature=0.7)
 
-# Inicializar agentes
-investigador = ResearcherAgent(deepseek)
-investigador.memoria = AgenteMemoria("Investigador")
+# Memoria de los agentes, compartida por todas las conversaciones
+memorias = crear_memorias()
 
-analista = AnalystAgent(deepseek)
-analista.memoria = AgenteMemoria("Analista")
+# Intervalo mínimo entre ediciones del mensaje de vista previa (segundos)
+INTERVALO_STREAMING = 1.0
 
-comunicador = CommunicatorAgent(deepseek)
-comunicador.memoria = AgenteMemoria("Comunicador")
 
-disenador = TemplateAgent(deepseek)
-disenador.memoria = AgenteMemoria("Disenador")
+class VistaPreviaStreaming:
+    """Muestra en un único mensaje de Telegram el texto que se va generando."""
+    
+    def __init__(self, update: Update, encabezado: str, intervalo: float = INTERVALO_STREAMING):
+        self.update = update
+        self.encabezado = encabezado
+        self.intervalo = intervalo
+        self.mensaje = None
+        self.ultimo_envio = 0.0
+        self.ultimo_texto = ""
+    
+    def _formatear(self, texto: str) -> str:
+        # Telegram limita los mensajes a 4096 caracteres; mostrar el final del texto
+        max_length = 4000 - len(self.encabezado)
+        if len(texto) > max_length:
+            texto = "..." + texto[-max_length:]
+        return f"{self.encabezado}\n\n{texto}"
+    
+    async def actualizar(self, texto: str, forzar: bool = False) -> None:
+        """Editar el mensaje con el texto acumulado, como máximo una vez por intervalo."""
+        ahora = time.monotonic()
+        if not forzar and ahora - self.ultimo_envio < self.intervalo:
+            return
+        if not texto.strip() or texto == self.ultimo_texto:
+            return
+        self.ultimo_envio = ahora
+        self.ultimo_texto = texto
+        try:
+            if self.mensaje is None:
+                self.mensaje = await self.update.message.reply_text(self._formatear(texto))
+            else:
+                await self.mensaje.edit_text(self._formatear(texto))
+        except Exception as e:
+            logger.warning(f"No se pudo actualizar la vista previa: {str(e)}")
+
 
 # Token de Telegram (agregar a settings.py y .env)
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
@@ -60,18 +88,53 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     return CHOOSING_TOPIC
 
 
+async def regenerar(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Como /start, pero genera el correo de nuevo aunque haya uno reciente sobre el mismo tema."""
+    context.user_data["regenerar"] = True
+    await update.message.reply_text(
+        "Se generará un correo nuevo aunque exista uno reciente sobre el mismo tema.\n\n"
+        "¿Sobre qué tema deseas crear un correo?",
+        reply_markup=ForceReply(selective=True),
+    )
+    return CHOOSING_TOPIC
+
+
 async def topic_received(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Procesa el tema y comienza el sistema multiagente."""
     tema = update.message.text
     chat_id = update.effective_chat.id
+    regenerar_correo = context.user_data.pop("regenerar", False)
     
-    # Almacenar tema en datos de conversación
-    conversation_data[chat_id] = {"tema": tema}
+    # Almacenar tema en datos de conversación; /cancel usa el token para abortar la generación
+    cancelacion = TokenCancelacion()
+    conversation_data[chat_id] = {"tema": tema, "cancelacion": cancelacion}
     
     await update.message.reply_text(f"Procesando correo sobre: '{tema}'\n\nEsto puede tomar un momento...")
     
     # Ejecutar procesamiento asíncrono
-    await generate_email(update, context, tema, chat_id)
+    try:
+        await cancelacion.ejecutar(generate_email(update, context, tema, chat_id, cancelacion, regenerar_correo))
+    except EjecucionCancelada:
+        # /cancel ya respondió al usuario y limpió la conversación
+        logger.info(f"Generación cancelada para el chat {chat_id}")
+        return ConversationHandler.END
+    except PlazoExcedido as e:
+        logger.error(f"Plazo excedido generando el correo: {str(e)}")
+        conversation_data.pop(chat_id, None)
+        await update.message.reply_text(
+            "⏱️ La generación del correo tardó demasiado y se detuvo.\n"
+            "Inténtalo de nuevo con /start y el mismo tema: las etapas ya completadas no se repetirán."
+        )
+        return ConversationHandler.END
+    except LLMError as e:
+        logger.error(f"Error del servicio LLM generando el correo: {str(e)}")
+        conversation_data.pop(chat_id, None)
+        await update.message.reply_text(
+            "❌ El servicio de IA no está disponible en este momento y no se pudo generar el correo.\n"
+            "Inténtalo de nuevo en unos minutos con /start y el mismo tema: "
+            "las etapas ya completadas no se repetirán."
+        )
+        return ConversationHandler.END
     
     await update.message.reply_text(
         f"Correo generado sobre '{tema}'.\n\n"
@@ -81,225 +144,37 @@ async def topic_received(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     return CONFIRMING_SEND
 
 
-async def generate_email(update: Update, context: ContextTypes.DEFAULT_TYPE, tema: str, chat_id: int) -> None:
+async def generate_email(update: Update, context: ContextTypes.DEFAULT_TYPE, tema: str, chat_id: int,
+                         cancelacion: TokenCancelacion = None, regenerar_correo: bool = False) -> None:
     """Genera el correo usando el sistema multiagente."""
-    # Generar asunto
-    await update.message.reply_text("Generando asunto...")
-    
-    prompt_asunto = f"""
-    Genera un asunto de correo electrónico corto, profesional y atractivo para un correo sobre:
-    {tema}
-    
-    El asunto debe ser muy breve (máximo 8 palabras) y conciso, pero informativo.
-    Responde ÚNICAMENTE con el asunto, sin explicaciones ni texto adicional.
-    """
-    
-    asunto_email = deepseek.generate(prompt_asunto).strip()
-    
-    # Limpiar asunto
-    if len(asunto_email.split('\n')) > 1:
-        asunto_email = asunto_email.split('\n')[0]
-    
-    await update.message.reply_text(f"Asunto generado: {asunto_email}")
-    
-    # Refinar objetivos de agentes
-    await update.message.reply_text("Refinando objetivos de los agentes...")
-    
-    investigador.refinar_objetivo(tema)
-    analista.refinar_objetivo(tema)
-    comunicador.refinar_objetivo(tema)
-    disenador.refinar_objetivo(tema)
-    
-    # Buscar tareas similares en memoria
-    tareas_similares = investigador.memoria.obtener_tareas_exitosas_similares(
-        f"Investigación sobre {tema}", tema=tema
+    # Mostrar el correo mientras el comunicador lo redacta
+    vista_previa = VistaPreviaStreaming(update, "✍️ Redactando correo...")
+    
+    correo = await generar_correo(
+        tema, deepseek, memorias,
+        run_id=f"{chat_id}_{DiarioEjecucion.huella(tema.strip().lower())}",
+        notificar=update.message.reply_text,
+        on_chunk=vista_previa.actualizar,
+        cancelacion=cancelacion,
+        regenerar=regenerar_correo
     )
     
-    # Crear contexto de memoria
-    contexto_memoria_texto = ""
-    if tareas_similares:
-        await update.message.reply_text(f"Se encontraron {len(tareas_similares)} tareas similares previas para aprender.")
-        ejemplos_lista = []
-        for i, tarea in enumerate(tareas_similares):
-            ejemplos_lista.append(f"Ejemplo {i+1}:\n{tarea['resultado'][:300]}...")
-        
-        ejemplos = "\n\n".join(ejemplos_lista)
-        contexto_de_memoria = f"Ejemplos de investigaciones exitosas en temas similares:\n{ejemplos}"
-        contexto_memoria_texto = "CONTEXTO DE MEMORIA:\n" + contexto_de_memoria
-    
-    # Crear tareas
-    descripcion_investigacion = f"""
-        Investiga el tema "{tema}" y recopila información relevante.
-        
-        INSTRUCCIONES:
-        1. Busca datos importantes sobre el tema
-        2. Incluye definiciones, historia y aplicaciones
-        3. Menciona 3-5 puntos interesantes
-        4. Organiza la información de forma clara
-        5. NO incluyas opiniones personales
-        6. NO menciones frases como "Como investigador..."
-        
-        {contexto_memoria_texto}
-        """
-    
-    tarea_investigacion = Task(
-        description=descripcion_investigacion,
-        agent=investigador
-    )
-    
-    descripcion_analisis = f"""
-        Analiza la siguiente información sobre "{tema}".
-        
-        INSTRUCCIONES:
-        1. Identifica los 3-4 aspectos más importantes del tema
-        2. Sintetiza la información de forma concisa
-        3. Destaca los datos más interesantes
-        4. Organiza el análisis de forma lógica
-        5. NO añadas información nueva
-        6. NO incluyas frases como "Como analista..."
-        
-        {{task_1}}
-        """
-    
-    tarea_analisis = Task(
-        description=descripcion_analisis,
-        agent=analista
-    )
-    
-    descripcion_comunicacion = f"""
-        Crea un correo electrónico profesional sobre "{tema}" con el asunto "{asunto_email}".
-        
-        INSTRUCCIONES:
-        1. Crea un correo electrónico profesional y bien estructurado
-        2. Comienza con "Estimado/a:"
-        3. Termina con "Atentamente, Equipo de Investigación"
-        4. Usa viñetas para listar puntos importantes (precedidos por - o •)
-        5. Separa cada párrafo con una línea en blanco
-        6. Asegúrate de organizar la información en secciones claras
-        7. Destaca 3-4 puntos clave sobre el tema
-        8. NO incluyas metadatos ni explicaciones del proceso
-        9. NO uses placeholders como [nombre]
-        
-        {{task_2}}
-        """
-    
-    tarea_comunicacion = Task(
-        description=descripcion_comunicacion,
-        agent=comunicador
-    )
-    
-    descripcion_template = f"""
-        Genera un template HTML personalizado para el correo sobre "{tema}".
-        Analiza el contenido y selecciona el formato visual más adecuado.
-        
-        INSTRUCCIONES:
-        1. Analiza el tipo de contenido (académico, técnico, corporativo, etc.)
-        2. Selecciona colores y estilos apropiados para el tema
-        3. Estructura el contenido para máxima legibilidad
-        4. Asegura que el diseño sea responsive y profesional
-        5. Destaca elementos clave del contenido
-        
-        {{task_3}}
-        """
-    
-    tarea_template = Task(
-        description=descripcion_template,
-        agent=disenador
-    )
-    
-    # Crear flujo de trabajo
-    flujo_trabajo = MultiAgentWorkflow(
-        agents=[investigador, analista, comunicador, disenador],
-        tasks=[tarea_investigacion, tarea_analisis, tarea_comunicacion, tarea_template]
-    )
-    
-    await update.message.reply_text("Ejecutando flujo de trabajo con retroalimentación entre agentes...")
-    
-    # Ejecutar flujo
-    resultados = flujo_trabajo.ejecutar_con_retroalimentacion()
-    
-    # Obtener contenido del correo
-    cuerpo_email = resultados.get("task_3", "No se pudo generar el contenido del correo.")
-    cuerpo_email = clean_email_content(cuerpo_email)
-    
-    # Obtener HTML
-    html_email = resultados.get("task_4", None)
-    
-    # Si no se generó HTML correctamente, usar método especializado
-    if not html_email or "<html" not in html_email.lower():
-        await update.message.reply_text("Generando HTML personalizado para el correo...")
-        try:
-            html_email = flujo_trabajo.ejecutar_tarea_personalizada(
-                3,  # Índice del agente diseñador (0-based)
-                tema,
-                cuerpo_email,
-                asunto_email,
-                method_name='execute_template_task'
-            )
-        except Exception as e:
-            logger.error(f"Error al generar HTML: {str(e)}")
-            # Crear HTML básico como respaldo
-            content_formatted = cuerpo_email.replace('\n\n', '</p><p>').replace('\n', '<br>')
-            html_email = f"""
-            <!DOCTYPE html>
-            <html><head><meta charset="UTF-8"><title>{asunto_email}</title>
-            <style>
-                body {{ font-family: Arial, sans-serif; margin: 0; padding: 20px; }}
-                .container {{ max-width: 600px; margin: 0 auto; }}
-                .header {{ border-bottom: 2px solid #3498db; padding-bottom: 10px; }}
-                .content {{ padding: 20px 0; }}
-                .footer {{ border-top: 1px solid #ddd; padding-top: 10px; font-size: 12px; }}
-            </style></head>
-            <body><div class="container">
-                <div class="header"><h2>{asunto_email}</h2></div>
-                <div class="content">{content_formatted}</div>
-                <div class="footer"><p>Correo generado por Sistema Multiagente</p></div>
-            </div></body></html>
-            """
-    
-    # Guardar en memoria
-    investigador.memoria.agregar_tarea(
-        tarea_investigacion.description, 
-        resultados.get("task_1", ""), 
-        9,
-        tema=tema
-    )
-    
-    analista.memoria.agregar_tarea(
-        tarea_analisis.description, 
-        resultados.get("task_2", ""), 
-        9,
-        tema=tema
-    )
-    
-    comunicador.memoria.agregar_tarea(
-        tarea_comunicacion.description, 
-        cuerpo_email, 
-        9,
-        tema=tema
-    )
-    
-    # Guardar muestra de HTML
-    html_sample = html_email[:500] + "..." if html_email and len(html_email) > 500 else html_email
-    
-    disenador.memoria.agregar_tarea(
-        tarea_template.description,
-        html_sample,
-        9,
-        tema=tema
-    )
-    
-    # Guardar archivos
-    filename_text = f"{tema.replace(' ', '_').lower()}_email.txt"
-    filename_html = f"{tema.replace(' ', '_').lower()}_email.html"
-    
-    with open(filename_text, 'w', encoding='utf-8') as f:
-        f.write(cuerpo_email)
-    
-    with open(filename_html, 'w', encoding='utf-8') as f:
-        f.write(html_email)
-    
-    # Almacenar datos para envío posterior
+    if correo["desde_cache"]:
+        await update.message.reply_text("Usa /regenerar si prefieres una versión nueva.")
+    else:
+        await vista_previa.actualizar(correo["cuerpo"], forzar=True)
+        logger.info(f"Métricas LLM: {deepseek.metrics()}")
+        logger.info(f"Retroalimentación: {correo['flujo'].politica.estadisticas()}")
+    
+    asunto_email = correo["asunto"]
+    cuerpo_email = correo["cuerpo"]
+    html_email = correo["html"]
+    filename_text = correo["filename_text"]
+    filename_html = correo["filename_html"]
+    
+    # Almacenar datos para envío posterior (salvo que la conversación se haya cancelado)
+    if cancelacion is not None:
+        cancelacion.comprobar()
     conversation_data[chat_id].update({
         "asunto": asunto_email,
         "cuerpo": cuerpo_email,
@@ -390,9 +265,10 @@ async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Cancelar y finalizar la conversación."""
     chat_id = update.effective_chat.id
     
-    # Limpiar datos
-    if chat_id in conversation_data:
-        del conversation_data[chat_id]
+    # Limpiar datos y abortar la generación en curso, si la hay
+    data = conversation_data.pop(chat_id, None)
+    if data and data.get("cancelacion"):
+        data["cancelacion"].cancelar()
     
     await update.message.reply_text(
         "Operación cancelada. Puedes iniciar de nuevo cuando quieras con /start"
@@ -401,17 +277,36 @@ async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     return ConversationHandler.END
 
 
+async def precargar_recursos(application: Application) -> None:
+    """Construir los índices de memoria al arrancar, antes de atender la primera conversación."""
+    await aprecargar_memorias(memorias)
+
+
+async def cerrar_recursos(application: Application) -> None:
+    """Cerrar las conexiones HTTP compartidas del LLM al apagar el bot."""
+    await aclose_transport()
+
+
 def main() -> None:
     """Iniciar el bot."""
     # Crear la aplicación con el token del bot
-    application = Application.builder().token(TELEGRAM_TOKEN).build()
+    application = (
+        Application.builder().token(TELEGRAM_TOKEN)
+        .post_init(precargar_recursos)
+        .post_shutdown(cerrar_recursos)
+        .build()
+    )
     
     # Añadir manejador de conversación
     conv_handler = ConversationHandler(
-        entry_points=[CommandHandler("start", start)],
+        entry_points=[CommandHandler("start", start), CommandHandler("regenerar", regenerar)],
         states={
-            CHOOSING_TOPIC: [MessageHandler(filters.TEXT & ~filters.COMMAND, topic_received)],
+            # No bloqueante: /cancel debe poder procesarse mientras se genera el correo
+            CHOOSING_TOPIC: [MessageHandler(filters.TEXT & ~filters.COMMAND, topic_received, block=False)],
             CONFIRMING_SEND: [MessageHandler(filters.TEXT & ~filters.COMMAND, handle_confirmation)],
+            # Mientras topic_received sigue en curso la conversación está pendiente y
+            # solo se consultan estos manejadores (no los fallbacks)
+            ConversationHandler.WAITING: [CommandHandler("cancel", cancel)],
         },
         fallbacks=[CommandHandler("cancel", cancel)],
     )
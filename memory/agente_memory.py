@@ -1,45 +1,151 @@
 
-import json
+import asyncio
 import os
+import threading
 from datetime import datetime
+from memory.almacen import AlmacenMemoria
+from memory.indice import IndiceBM25
+from memory.retencion import PoliticaRetencion
+from utils.tracing import trazar
+from config.settings import MEMORY_SIMILARITY_ENABLED
 
 class AgenteMemoria:
     """Sistema de memoria para agentes que permite almacenar y aprender de interacciones pasadas."""
     
-    def __init__(self, nombre_agente, archivo_memoria=None):
+    def __init__(self, nombre_agente, archivo_memoria=None, similitud=MEMORY_SIMILARITY_ENABLED, retencion=None):
         """Inicializar sistema de memoria para un agente.
         
+        La memoria se guarda en una base de datos SQLite junto al archivo JSON del
+        formato anterior; si ese archivo existe, su contenido se importa la primera vez.
+        Crear la memoria no lee nada: la base de datos se abre en el primer uso, las
+        búsquedas indexan solo descripciones y temas, y el diccionario completo
+        (self.memoria) solo se carga si se accede a él.
+        
         Args:
             nombre_agente (str): Nombre del agente
-            archivo_memoria (str, opcional): Ruta al archivo de memoria
+            archivo_memoria (str, opcional): Ruta al archivo de memoria (.sqlite3, o el .json anterior)
+            similitud (bool): Buscar tareas similares por coseno TF-IDF (requiere numpy) en lugar de BM25
+            retencion (PoliticaRetencion, opcional): Límites de lo que se conserva; por defecto los de settings
         """
         self.nombre_agente = nombre_agente
-        self.archivo_memoria = archivo_memoria or f"memory/{nombre_agente.lower()}_memoria.json"
-        self.asegurar_directorio_memoria()
-        self.memoria = self.cargar_memoria()
+        self.usar_similitud = similitud
+        self.retencion = retencion or PoliticaRetencion()
+        self.tareas_desde_compactacion = 0
+        archivo_memoria = archivo_memoria or f"memory/{nombre_agente.lower()}_memoria.json"
+        base, extension = os.path.splitext(archivo_memoria)
+        self.archivo_json = base + ".json"
+        self.archivo_memoria = archivo_memoria if extension == ".sqlite3" else base + ".sqlite3"
+        self._almacen = None
+        self._memoria = None
+        self.indice = None
+        self.similitud = None
+        # Los índices pueden construirse en un hilo (aobtener_tareas_exitosas_similares)
+        self._lock = threading.RLock()
+    
+    @property
+    def almacen(self):
+        """Base de datos de la memoria; se abre, migra y compacta en el primer uso."""
+        with self._lock:
+            if self._almacen is None:
+                self.asegurar_directorio_memoria()
+                self._almacen = AlmacenMemoria(self.archivo_memoria)
+                if self._almacen.migrar_json(self.archivo_json):
+                    print(f"📦 Memoria de {self.nombre_agente} migrada desde {self.archivo_json}")
+                self.compactar()
+            return self._almacen
+    
+    @property
+    def memoria(self):
+        """Memoria completa con la estructura del antiguo JSON; se carga al primer acceso."""
+        if self._memoria is None:
+            self._memoria = self.cargar_memoria()
+        return self._memoria
+    
+    @memoria.setter
+    def memoria(self, memoria):
+        self._memoria = memoria
+    
+    def resumen(self):
+        """Número de tareas, resultados exitosos y temas guardados, sin cargar la memoria."""
+        return self.almacen.resumen()
     
     def asegurar_directorio_memoria(self):
         """Asegurar que el directorio de memoria exista."""
-        os.makedirs(os.path.dirname(self.archivo_memoria), exist_ok=True)
+        os.makedirs(os.path.dirname(self.archivo_memoria) or ".", exist_ok=True)
     
+    @trazar("memoria")
     def cargar_memoria(self):
-        """Cargar memoria desde archivo o inicializar memoria vacía."""
-        try:
-            with open(self.archivo_memoria, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return {
-                "tareas_previas": [],
-                "resultados_exitosos": [],
-                "temas": {},
-                "metricas_rendimiento": {}
-            }
+        """Cargar memoria desde la base de datos (vacía si aún no hay nada guardado)."""
+        return self.almacen.cargar()
+    
+    @trazar("memoria")
+    def indexar(self):
+        """Construir los índices de búsqueda a partir de la base de datos.
+        
+        Solo se leen descripción, tema y (con similitud) el inicio de cada resultado;
+        los resultados completos se leen al devolverlos.
+        """
+        with self._lock:
+            self.indice = IndiceBM25()
+            self.similitud = None
+            if self.usar_similitud:
+                # numpy solo se importa si la similitud está activa
+                from memory.similitud import IndiceSimilitud, numpy_disponible
+                self.usar_similitud = numpy_disponible()
+                if self.usar_similitud:
+                    self.similitud = IndiceSimilitud()
+            longitud = self.similitud.longitud_resultado if self.similitud is not None else 0
+            for doc_id, descripcion, tema, inicio_resultado in self.almacen.documentos(longitud):
+                self.indice.agregar(doc_id, descripcion, tema)
+                if self.similitud is not None:
+                    self.similitud.agregar(doc_id, descripcion, inicio_resultado, tema)
+    
+    def precargar(self):
+        """Abrir la base de datos y construir los índices antes de la primera búsqueda.
+        
+        Con memorias grandes indexar lleva segundos; el bot lo hace al arrancar, fuera
+        del event loop, para que ninguna conversación espere por ello.
+        """
+        with self._lock:
+            if self.indice is None:
+                self.indexar()
     
+    def _invalidar(self):
+        """Descartar la memoria cargada y los índices; se reconstruyen en el próximo uso."""
+        with self._lock:
+            self._memoria = None
+            self.indice = None
+            self.similitud = None
+    
+    @trazar("memoria")
+    def compactar(self):
+        """Aplicar la política de retención.
+        
+        Returns:
+            dict: Filas eliminadas de cada tabla
+        """
+        eliminadas = self.almacen.compactar(self.retencion)
+        if any(eliminadas.values()):
+            print(f"🧹 Memoria de {self.nombre_agente} compactada: {eliminadas}")
+        self.tareas_desde_compactacion = 0
+        if any(eliminadas.values()):
+            self._invalidar()
+        return eliminadas
+    
+    @trazar("memoria")
     def guardar_memoria(self):
-        """Guardar memoria en archivo."""
-        with open(self.archivo_memoria, 'w', encoding='utf-8') as f:
-            json.dump(self.memoria, f, ensure_ascii=False, indent=2)
+        """Reescribir toda la memoria a partir del diccionario en RAM.
+        
+        agregar_tarea ya guarda cada tarea al añadirla; esto solo es necesario tras
+        modificar self.memoria directamente.
+        """
+        self.almacen.reemplazar(self.memoria)
+        # Los identificadores de los resultados cambian al reescribirlos
+        memoria = self._memoria
+        self._invalidar()
+        self._memoria = memoria
     
+    @trazar("memoria")
     def agregar_tarea(self, descripcion_tarea, resultado, calificacion_exito, tema=None):
         """Añadir una tarea completada a la memoria.
         
@@ -57,49 +163,82 @@ class AgenteMemoria:
             "tema": tema
         }
         
-        self.memoria["tareas_previas"].append(entrada_tarea)
-        
         # Si la tarea fue exitosa, almacenarla como ejemplo
-        if calificacion_exito >= 8:  # Considerar 8+ como exitoso
-            self.memoria["resultados_exitosos"].append({
-                "descripcion": descripcion_tarea,
-                "resultado": resultado,
-                "tema": tema
-            })
+        exitosa = calificacion_exito >= 8  # Considerar 8+ como exitoso
         
         # Actualizar información del tema
+        datos_tema = None
         if tema:
-            if tema not in self.memoria["temas"]:
-                self.memoria["temas"][tema] = {"contador": 0, "exito_promedio": 0}
-            
-            datos_tema = self.memoria["temas"][tema]
+            anterior = self._memoria["temas"].get(tema) if self._memoria is not None else self.almacen.obtener_tema(tema)
+            datos_tema = dict(anterior or {"contador": 0, "exito_promedio": 0})
             datos_tema["contador"] += 1
             datos_tema["exito_promedio"] = ((datos_tema["exito_promedio"] * (datos_tema["contador"] - 1)) 
                                          + calificacion_exito) / datos_tema["contador"]
         
-        self.guardar_memoria()
+        # Solo se escribe la tarea nueva, no la memoria completa
+        id_resultado = self.almacen.agregar(entrada_tarea, resultado, exitosa, datos_tema)
+        
+        # Mantener al día lo que ya esté cargado
+        if self._memoria is not None:
+            self._memoria["tareas_previas"].append(entrada_tarea)
+            if exitosa:
+                self._memoria["resultados_exitosos"].append({
+                    "descripcion": descripcion_tarea,
+                    "resultado": resultado,
+                    "tema": tema
+                })
+            if datos_tema is not None:
+                self._memoria["temas"][tema] = datos_tema
+        with self._lock:
+            if exitosa and self.indice is not None:
+                self.indice.agregar(id_resultado, descripcion_tarea, tema)
+                if self.similitud is not None:
+                    self.similitud.agregar(id_resultado, descripcion_tarea, resultado, tema)
+        
+        self.tareas_desde_compactacion += 1
+        if self.retencion.compactar_cada and self.tareas_desde_compactacion >= self.retencion.compactar_cada:
+            self.compactar()
     
-    def obtener_tareas_exitosas_similares(self, descripcion_tarea, tema=None, limite=3):
+    @trazar("memoria")
+    def obtener_tareas_exitosas_similares(self, descripcion_tarea, tema=None, limite=3, diversidad=0.0):
         """Encontrar tareas exitosas similares en la memoria.
         
+        Con el índice de similitud activo se ordenan por coseno TF-IDF sobre descripción,
+        tema y resultado; si no, por BM25 sobre descripción y tema.
+        
         Args:
             descripcion_tarea (str): Descripción de la tarea actual
             tema (str, opcional): Tema de la tarea
             limite (int, opcional): Número máximo de resultados
+            diversidad (float, opcional): Entre 0 y 1; evita devolver ejemplos casi iguales
+                entre sí (con BM25 solo descarta resultados idénticos)
             
         Returns:
-            list: Tareas similares encontradas
+            list: Tareas similares encontradas, de más a menos relevante
+        """
+        consulta = f"{descripcion_tarea} {tema}" if tema else descripcion_tarea
+        with self._lock:
+            self.precargar()
+            if self.similitud is not None:
+                ids = [doc_id for doc_id, _ in self.similitud.buscar(consulta, limite, diversidad)]
+            else:
+                ids = [doc_id for doc_id, _ in self.indice.buscar(consulta, limite * 3 if diversidad else limite)]
+        
+        resultados = self.almacen.obtener_resultados(ids)
+        similares = []
+        for doc_id in ids:
+            tarea = resultados.get(doc_id)
+            if tarea is None or (diversidad and any(tarea["resultado"] == previa["resultado"] for previa in similares)):
+                continue
+            similares.append(tarea)
+        return similares[:limite]
+    
+    async def aobtener_tareas_exitosas_similares(self, descripcion_tarea, tema=None, limite=3, diversidad=0.0):
+        """Versión asíncrona de obtener_tareas_exitosas_similares.
+        
+        La búsqueda corre en un hilo: si los índices aún no están construidos, la primera
+        puede tardar segundos y no debe bloquear el event loop.
         """
-        # Esta es una versión simplificada. En un sistema real, usarías
-        # similitud semántica o correspondencia de palabras clave
-        coincidencias = []
-        
-        for tarea in self.memoria["resultados_exitosos"]:
-            # Coincidencia por tema si se proporciona
-            if tema and tarea.get("tema") == tema:
-                coincidencias.append(tarea)
-            # Correspondencia básica de palabras clave
-            elif any(palabra in tarea["descripcion"].lower() for palabra in descripcion_tarea.lower().split()):
-                coincidencias.append(tarea)
-        
-        return coincidencias[:limite]
\ No newline at end of file
+        return await asyncio.to_thread(
+            self.obtener_tareas_exitosas_similares, descripcion_tarea, tema, limite, diversidad
+        )
\ No newline at end of file
@@ -0,0 +1,264 @@
+# memory/almacen.py
+import json
+import os
+import sqlite3
+import threading
+
+
+class AlmacenMemoria:
+    """Almacenamiento de la memoria de un agente en SQLite (modo WAL).
+    
+    Cada tarea se añade con un INSERT dentro de una transacción, así que el coste de
+    escribir no crece con el historial y un fallo a mitad de escritura nunca deja la
+    memoria corrupta: o la tarea queda registrada entera o no queda.
+    """
+    
+    def __init__(self, ruta):
+        """Abrir (o crear) la base de datos de memoria.
+        
+        Args:
+            ruta (str): Archivo SQLite
+        """
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        self._db = sqlite3.connect(ruta, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # FULL: cada tarea confirmada sobrevive también a un corte de luz
+        self._db.execute("PRAGMA synchronous=FULL")
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS tareas_previas ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT NOT NULL, descripcion TEXT NOT NULL, "
+            "muestra_resultado TEXT NOT NULL, calificacion_exito INTEGER NOT NULL, tema TEXT);"
+            "CREATE TABLE IF NOT EXISTS resultados_exitosos ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT, descripcion TEXT NOT NULL, "
+            "resultado TEXT NOT NULL, calificacion_exito INTEGER, tema TEXT);"
+            "CREATE TABLE IF NOT EXISTS temas ("
+            "tema TEXT PRIMARY KEY, contador INTEGER NOT NULL, exito_promedio REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS metadatos (clave TEXT PRIMARY KEY, valor TEXT NOT NULL);"
+        )
+        self._db.commit()
+    
+    def _insertar(self, entrada_tarea, resultado, exitosa):
+        """Insertar una tarea (y su resultado si fue exitosa) sin confirmar.
+        
+        Returns:
+            int: Identificador del resultado insertado, o None si no era exitosa
+        """
+        self._db.execute(
+            "INSERT INTO tareas_previas (timestamp, descripcion, muestra_resultado, calificacion_exito, tema) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (entrada_tarea["timestamp"], entrada_tarea["descripcion"], entrada_tarea["muestra_resultado"],
+             entrada_tarea["calificacion_exito"], entrada_tarea.get("tema"))
+        )
+        if exitosa:
+            return self._db.execute(
+                "INSERT INTO resultados_exitosos (timestamp, descripcion, resultado, calificacion_exito, tema) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (entrada_tarea["timestamp"], entrada_tarea["descripcion"], resultado,
+                 entrada_tarea["calificacion_exito"], entrada_tarea.get("tema"))
+            ).lastrowid
+        return None
+    
+    def agregar(self, entrada_tarea, resultado, exitosa, datos_tema=None):
+        """Registrar una tarea completada en una sola transacción.
+        
+        Args:
+            entrada_tarea (dict): Entrada de tareas_previas
+            resultado (str): Resultado completo de la tarea
+            exitosa (bool): Guardar también el resultado como ejemplo
+            datos_tema (dict, opcional): Agregados actualizados del tema de la tarea
+            
+        Returns:
+            int: Identificador del resultado guardado, o None si no era exitosa
+        """
+        with self._lock, self._db:
+            id_resultado = self._insertar(entrada_tarea, resultado, exitosa)
+            if datos_tema is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO temas (tema, contador, exito_promedio) VALUES (?, ?, ?)",
+                    (entrada_tarea["tema"], datos_tema["contador"], datos_tema["exito_promedio"])
+                )
+        return id_resultado
+    
+    def obtener_tema(self, tema):
+        """Devolver los agregados de un tema, o None si no tiene tareas."""
+        with self._lock:
+            fila = self._db.execute("SELECT contador, exito_promedio FROM temas WHERE tema = ?", (tema,)).fetchone()
+        return {"contador": fila[0], "exito_promedio": fila[1]} if fila else None
+    
+    def documentos(self, longitud_resultado=0):
+        """Recorrer los resultados exitosos sin cargar su texto completo.
+        
+        Args:
+            longitud_resultado (int): Caracteres iniciales del resultado a incluir (0 ninguno)
+            
+        Returns:
+            list: (id, descripción, tema, inicio del resultado) en orden de inserción
+        """
+        with self._lock:
+            return self._db.execute(
+                "SELECT id, descripcion, tema, substr(resultado, 1, ?) FROM resultados_exitosos ORDER BY id",
+                (longitud_resultado,)
+            ).fetchall()
+    
+    def obtener_resultados(self, ids):
+        """Devolver {id: resultado exitoso} para los identificadores indicados."""
+        if not ids:
+            return {}
+        with self._lock:
+            filas = self._db.execute(
+                f"SELECT id, descripcion, resultado, tema FROM resultados_exitosos "
+                f"WHERE id IN ({', '.join('?' * len(ids))})",
+                list(ids)
+            ).fetchall()
+        return {fila[0]: {"descripcion": fila[1], "resultado": fila[2], "tema": fila[3]} for fila in filas}
+    
+    def resumen(self):
+        """Número de tareas, resultados exitosos y temas guardados."""
+        with self._lock:
+            return {
+                tabla: self._db.execute(f"SELECT COUNT(*) FROM {tabla}").fetchone()[0]
+                for tabla in ("tareas_previas", "resultados_exitosos", "temas")
+            }
+    
+    def cargar(self):
+        """Devolver la memoria completa con la estructura del antiguo archivo JSON."""
+        with self._lock:
+            tareas = [
+                {"timestamp": fila[0], "descripcion": fila[1], "muestra_resultado": fila[2],
+                 "calificacion_exito": fila[3], "tema": fila[4]}
+                for fila in self._db.execute(
+                    "SELECT timestamp, descripcion, muestra_resultado, calificacion_exito, tema "
+                    "FROM tareas_previas ORDER BY id"
+                )
+            ]
+            resultados = [
+                {"descripcion": fila[0], "resultado": fila[1], "tema": fila[2]}
+                for fila in self._db.execute("SELECT descripcion, resultado, tema FROM resultados_exitosos ORDER BY id")
+            ]
+            temas = {
+                fila[0]: {"contador": fila[1], "exito_promedio": fila[2]}
+                for fila in self._db.execute("SELECT tema, contador, exito_promedio FROM temas")
+            }
+            fila = self._db.execute("SELECT valor FROM metadatos WHERE clave = 'metricas_rendimiento'").fetchone()
+        return {
+            "tareas_previas": tareas,
+            "resultados_exitosos": resultados,
+            "temas": temas,
+            "metricas_rendimiento": json.loads(fila[0]) if fila else {}
+        }
+    
+    def reemplazar(self, memoria):
+        """Sustituir todo el contenido por un diccionario de memoria, de forma atómica.
+        
+        Solo hace falta cuando se modifica el diccionario de memoria directamente; las
+        tareas nuevas se añaden con agregar.
+        """
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM tareas_previas")
+            self._db.execute("DELETE FROM resultados_exitosos")
+            self._db.execute("DELETE FROM temas")
+            self._importar(memoria)
+    
+    def _importar(self, memoria):
+        for tarea in memoria.get("tareas_previas", []):
+            self._insertar(tarea, None, False)
+        for resultado in memoria.get("resultados_exitosos", []):
+            self._db.execute(
+                "INSERT INTO resultados_exitosos (descripcion, resultado, tema) VALUES (?, ?, ?)",
+                (resultado["descripcion"], resultado["resultado"], resultado.get("tema"))
+            )
+        self._db.executemany(
+            "INSERT OR REPLACE INTO temas (tema, contador, exito_promedio) VALUES (?, ?, ?)",
+            [(tema, datos["contador"], datos["exito_promedio"]) for tema, datos in memoria.get("temas", {}).items()]
+        )
+        self._db.execute(
+            "INSERT OR REPLACE INTO metadatos (clave, valor) VALUES ('metricas_rendimiento', ?)",
+            (json.dumps(memoria.get("metricas_rendimiento", {}), ensure_ascii=False),)
+        )
+    
+    def migrar_json(self, archivo_json):
+        """Importar un archivo de memoria JSON del formato anterior, una sola vez.
+        
+        El archivo original no se modifica; la migración queda anotada en la base de datos
+        para no repetirla.
+        
+        Returns:
+            bool: True si se importó el archivo
+        """
+        if not os.path.exists(archivo_json):
+            return False
+        with self._lock:
+            if self._db.execute("SELECT 1 FROM metadatos WHERE clave = 'migrado_desde'").fetchone():
+                return False
+        try:
+            with open(archivo_json, 'r', encoding='utf-8') as f:
+                memoria = json.load(f)
+        except json.JSONDecodeError:
+            return False
+        with self._lock, self._db:
+            self._importar(memoria)
+            self._db.execute(
+                "INSERT INTO metadatos (clave, valor) VALUES ('migrado_desde', ?)", (archivo_json,)
+            )
+        return True
+    
+    def compactar(self, politica):
+        """Eliminar lo que excede la política de retención, en una sola transacción.
+        
+        Los agregados de `temas` se conservan mientras quede alguna tarea de ese tema
+        (siguen resumiendo todo su historial); los de temas sin tareas se eliminan.
+        El espacio liberado se reutiliza en las inserciones siguientes.
+        
+        Args:
+            politica (PoliticaRetencion): Límites a aplicar
+            
+        Returns:
+            dict: Filas eliminadas de cada tabla
+        """
+        eliminadas = {"tareas_previas": 0, "resultados_exitosos": 0, "temas": 0}
+        limite = politica.fecha_limite()
+        with self._lock, self._db:
+            if limite is not None:
+                for tabla in ("tareas_previas", "resultados_exitosos"):
+                    # Los resultados migrados del JSON no tienen fecha ni calificación: solo les
+                    # afectan los demás límites, como si tuvieran la calificación mínima de éxito (8)
+                    eliminadas[tabla] += self._db.execute(
+                        f"DELETE FROM {tabla} WHERE timestamp < ?", (limite,)
+                    ).rowcount
+            if politica.max_por_tema:
+                eliminadas["resultados_exitosos"] += self._db.execute(
+                    "DELETE FROM resultados_exitosos WHERE id IN ("
+                    "SELECT id FROM (SELECT id, ROW_NUMBER() OVER ("
+                    "PARTITION BY tema ORDER BY COALESCE(calificacion_exito, 8) DESC, id DESC) AS puesto "
+                    "FROM resultados_exitosos WHERE tema IS NOT NULL) WHERE puesto > ?)",
+                    (politica.max_por_tema,)
+                ).rowcount
+            if politica.max_resultados:
+                eliminadas["resultados_exitosos"] += self._db.execute(
+                    "DELETE FROM resultados_exitosos WHERE id NOT IN ("
+                    "SELECT id FROM resultados_exitosos ORDER BY COALESCE(calificacion_exito, 8) DESC, id DESC LIMIT ?)",
+                    (politica.max_resultados,)
+                ).rowcount
+            if politica.max_tareas:
+                eliminadas["tareas_previas"] += self._db.execute(
+                    "DELETE FROM tareas_previas WHERE id NOT IN ("
+                    "SELECT id FROM tareas_previas ORDER BY id DESC LIMIT ?)",
+                    (politica.max_tareas,)
+                ).rowcount
+            eliminadas["temas"] = self._db.execute(
+                "DELETE FROM temas WHERE tema NOT IN ("
+                "SELECT tema FROM tareas_previas WHERE tema IS NOT NULL "
+                "UNION SELECT tema FROM resultados_exitosos WHERE tema IS NOT NULL)"
+            ).rowcount
+        if any(eliminadas.values()):
+            with self._lock:
+                self._db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return eliminadas
+    
+    def cerrar(self):
+        with self._lock:
+            self._db.close()
\ No newline at end of file
@@ -0,0 +1,141 @@
+# memory/bench_memoria.py
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from memory.agente_memory import AgenteMemoria
+from memory.almacen import AlmacenMemoria
+from memory.retencion import PoliticaRetencion
+
+# Agentes del pipeline, uno por archivo de memoria
+AGENTES = ("Investigador", "Analista", "Comunicador", "Disenador")
+
+
+def _memoria_sintetica(entradas, longitud_resultado):
+    """Memoria con `entradas` tareas exitosas repartidas entre 100 temas."""
+    resultado = ("Resultado de ejemplo con datos y análisis. " * (longitud_resultado // 43 + 1))[:longitud_resultado]
+    memoria = {"tareas_previas": [], "resultados_exitosos": [], "temas": {}, "metricas_rendimiento": {}}
+    for i in range(entradas):
+        tema = f"tema {i % 100}"
+        descripcion = f"Investiga el tema \"{tema}\" y recopila información relevante ({i})."
+        memoria["tareas_previas"].append({
+            "timestamp": datetime.now().isoformat(), "descripcion": descripcion,
+            "muestra_resultado": resultado[:500], "calificacion_exito": 9, "tema": tema
+        })
+        memoria["resultados_exitosos"].append({"descripcion": descripcion, "resultado": resultado, "tema": tema})
+        datos_tema = memoria["temas"].setdefault(tema, {"contador": 0, "exito_promedio": 9})
+        datos_tema["contador"] += 1
+    return memoria
+
+
+def medir(entradas, longitud_resultado=1000, escrituras=50, escrituras_json=3):
+    """Comparar el coste de añadir una tarea con el JSON anterior y con SQLite.
+    
+    Returns:
+        dict: Milisegundos por tarea añadida con cada formato y segundos de carga completa
+    """
+    memoria = _memoria_sintetica(entradas, longitud_resultado)
+    entrada = dict(memoria["tareas_previas"][0])
+    resultado = memoria["resultados_exitosos"][0]["resultado"]
+    
+    with tempfile.TemporaryDirectory() as directorio:
+        # Formato anterior: cada tarea reescribe el archivo completo
+        archivo_json = os.path.join(directorio, "memoria.json")
+        inicio = time.perf_counter()
+        for _ in range(escrituras_json):
+            memoria["tareas_previas"].append(entrada)
+            with open(archivo_json, 'w', encoding='utf-8') as f:
+                json.dump(memoria, f, ensure_ascii=False, indent=2)
+        ms_json = (time.perf_counter() - inicio) * 1000 / escrituras_json
+        
+        inicio = time.perf_counter()
+        with open(archivo_json, 'r', encoding='utf-8') as f:
+            json.load(f)
+        carga_json = time.perf_counter() - inicio
+        
+        # SQLite: la migración importa el mismo historial; después cada tarea es un INSERT
+        almacen = AlmacenMemoria(os.path.join(directorio, "memoria.sqlite3"))
+        almacen.migrar_json(archivo_json)
+        inicio = time.perf_counter()
+        for _ in range(escrituras):
+            almacen.agregar(entrada, resultado, True, {"contador": 1, "exito_promedio": 9})
+        ms_sqlite = (time.perf_counter() - inicio) * 1000 / escrituras
+        
+        inicio = time.perf_counter()
+        almacen.cargar()
+        carga_sqlite = time.perf_counter() - inicio
+        almacen.cerrar()
+    
+    return {"ms_json": ms_json, "ms_sqlite": ms_sqlite, "carga_json": carga_json, "carga_sqlite": carga_sqlite}
+
+
+def medir_arranque(entradas, longitud_resultado=1000):
+    """Medir el arranque en frío de las memorias de los cuatro agentes con `entradas` tareas cada una.
+    
+    Crear un AgenteMemoria no lee nada: el coste en frío está en abrir la base de datos
+    e indexarla, que ocurre en la primera búsqueda (o en precargar, al arrancar el bot).
+    
+    Returns:
+        dict: Segundos del arranque anterior (json.load de los cuatro archivos), de la
+            primera búsqueda en frío de una memoria (apertura, índices y búsqueda), de
+            precargar las cuatro memorias y de una búsqueda con los índices ya construidos
+    """
+    memoria = _memoria_sintetica(entradas, longitud_resultado)
+    sin_limites = PoliticaRetencion(max_tareas=0, max_resultados=0, max_dias=0, max_por_tema=0)
+    
+    with tempfile.TemporaryDirectory() as directorio:
+        archivos = [os.path.join(directorio, f"{nombre.lower()}_memoria.json") for nombre in AGENTES]
+        for archivo in archivos:
+            with open(archivo, 'w', encoding='utf-8') as f:
+                json.dump(memoria, f, ensure_ascii=False)
+            AgenteMemoria("Preparacion", archivo, retencion=sin_limites).resumen()  # migración previa
+        
+        inicio = time.perf_counter()
+        for archivo in archivos:
+            with open(archivo, 'r', encoding='utf-8') as f:
+                json.load(f)
+        arranque_json = time.perf_counter() - inicio
+        
+        memorias = [AgenteMemoria(nombre, archivo, retencion=sin_limites) for nombre, archivo in zip(AGENTES, archivos)]
+        inicio = time.perf_counter()
+        memorias[0].obtener_tareas_exitosas_similares("Investigación sobre tema 7", tema="tema 7")
+        primera_busqueda = time.perf_counter() - inicio
+        
+        inicio = time.perf_counter()
+        for memoria in memorias[1:]:
+            memoria.precargar()
+        precarga = primera_busqueda + time.perf_counter() - inicio
+        
+        inicio = time.perf_counter()
+        memorias[0].obtener_tareas_exitosas_similares("Investigación sobre tema 8", tema="tema 8")
+        busqueda = time.perf_counter() - inicio
+    
+    return {"arranque_json": arranque_json, "primera_busqueda": primera_busqueda, "precarga": precarga, "busqueda": busqueda}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Coste de añadir tareas a la memoria: JSON completo frente a SQLite")
+    parser.add_argument("entradas", nargs="*", type=int, default=[10000, 100000])
+    parser.add_argument("--longitud-resultado", type=int, default=1000, help="Caracteres de cada resultado")
+    parser.add_argument("--arranque", action="store_true", help="Medir el arranque en frío en lugar de las escrituras")
+    args = parser.parse_args()
+    
+    if args.arranque:
+        print(f"{'entradas':>9} {'JSON s':>8} {'1ª búsqueda s':>14} {'precarga s':>11} {'búsqueda ms':>12}")
+        for entradas in args.entradas:
+            r = medir_arranque(entradas, args.longitud_resultado)
+            print(f"{entradas:>9} {r['arranque_json']:>8.2f} {r['primera_busqueda']:>14.2f} {r['precarga']:>11.2f} "
+                  f"{r['busqueda'] * 1000:>12.1f}")
+        return
+    
+    print(f"{'entradas':>9} {'JSON ms/tarea':>14} {'SQLite ms/tarea':>16} {'carga JSON s':>13} {'carga SQLite s':>15}")
+    for entradas in args.entradas:
+        r = medir(entradas, args.longitud_resultado)
+        print(f"{entradas:>9} {r['ms_json']:>14.1f} {r['ms_sqlite']:>16.2f} {r['carga_json']:>13.2f} {r['carga_sqlite']:>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,90 @@
+# memory/indice.py
+import heapq
+import math
+from collections import Counter
+from utils.text_processing import normalize_text
+
+# Palabras vacías del español, ya normalizadas (sin tildes)
+STOPWORDS = frozenset("""
+a al algo algun alguna algunas alguno algunos ante antes aqui asi aun cada como con contra cual cuales
+cuando de del desde donde dos durante e el ella ellas ellos en entre era es esa esas ese eso esos esta
+estan estas este esto estos fue fueron ha han hasta hay la las le les lo los mas me mi mientras muy nada
+ni no nos nosotros o otra otras otro otros para pero poco por porque que quien se sea segun ser si sido
+sin sobre son su sus tambien tan te tiene tienen todo todos tu tus u un una unas uno unos y ya yo
+""".split())
+
+# Veces que cuentan los términos del tema frente a los de la descripción
+PESO_TEMA = 2
+
+
+def tokenizar(texto):
+    """Términos de un texto: en minúsculas, sin tildes, sin puntuación ni palabras vacías."""
+    if not texto:
+        return []
+    return [termino for termino in normalize_text(texto).split() if len(termino) > 1 and termino not in STOPWORDS]
+
+
+class IndiceBM25:
+    """Índice invertido en memoria con ranking BM25, actualizado documento a documento.
+    
+    Una consulta solo recorre las listas de los términos que contiene, no todos los
+    documentos, y devuelve los más relevantes en lugar de los primeros que coinciden.
+    """
+    
+    def __init__(self, k1=1.5, b=0.75, max_df=0.5):
+        """
+        Args:
+            k1 (float): Saturación de la frecuencia de un término
+            b (float): Peso de la normalización por longitud del documento
+            max_df (float): Los términos presentes en más de esta fracción de documentos
+                se ignoran si la consulta tiene otros más específicos
+        """
+        self.k1 = k1
+        self.b = b
+        self.max_df = max_df
+        self._listas = {}  # término -> {doc_id: frecuencia}
+        self._longitudes = {}
+        self._longitud_total = 0
+    
+    def __len__(self):
+        return len(self._longitudes)
+    
+    def agregar(self, doc_id, texto, tema=None):
+        """Indexar un documento a partir de su descripción y su tema."""
+        terminos = Counter(tokenizar(texto))
+        for termino in tokenizar(tema):
+            terminos[termino] += PESO_TEMA
+        for termino, frecuencia in terminos.items():
+            self._listas.setdefault(termino, {})[doc_id] = frecuencia
+        longitud = sum(terminos.values())
+        self._longitudes[doc_id] = longitud
+        self._longitud_total += longitud
+    
+    def buscar(self, consulta, limite=3):
+        """Devolver los `limite` documentos más relevantes para la consulta.
+        
+        Returns:
+            list: (doc_id, puntuación) de mayor a menor puntuación
+        """
+        total = len(self._longitudes)
+        if not total:
+            return []
+        
+        listas = sorted(
+            (self._listas[termino] for termino in set(tokenizar(consulta)) if termino in self._listas),
+            key=len
+        )
+        # Los términos casi universales (p. ej. la plantilla de la tarea) apenas puntúan
+        # y recorrer sus listas haría la búsqueda lineal
+        especificas = [lista for lista in listas if len(lista) <= self.max_df * total]
+        listas = especificas or listas[:1]
+        
+        longitud_media = self._longitud_total / total
+        puntuaciones = Counter()
+        for lista in listas:
+            idf = math.log(1 + (total - len(lista) + 0.5) / (len(lista) + 0.5))
+            for doc_id, frecuencia in lista.items():
+                normalizacion = self.k1 * (1 - self.b + self.b * self._longitudes[doc_id] / longitud_media)
+                puntuaciones[doc_id] += idf * frecuencia * (self.k1 + 1) / (frecuencia + normalizacion)
+        
+        return heapq.nlargest(limite, puntuaciones.items(), key=lambda item: item[1])
\ No newline at end of file
@@ -0,0 +1,39 @@
+# memory/retencion.py
+from datetime import datetime, timedelta
+from config.settings import (
+    MEMORY_MAX_TASKS, MEMORY_MAX_RESULTS, MEMORY_MAX_AGE_DAYS, MEMORY_MAX_PER_TOPIC, MEMORY_COMPACT_EVERY
+)
+
+
+class PoliticaRetencion:
+    """Límites de lo que conserva la memoria de un agente.
+    
+    Se aplican al abrir la memoria y cada `compactar_cada` tareas añadidas, de modo que
+    el tamaño de la base de datos, el tiempo de arranque y la RAM no crecen con la
+    antigüedad del despliegue. Un límite a 0 queda desactivado.
+    """
+    
+    def __init__(self, max_tareas=MEMORY_MAX_TASKS, max_resultados=MEMORY_MAX_RESULTS,
+                 max_dias=MEMORY_MAX_AGE_DAYS, max_por_tema=MEMORY_MAX_PER_TOPIC,
+                 compactar_cada=MEMORY_COMPACT_EVERY):
+        """Inicializar la política.
+        
+        Args:
+            max_tareas (int): Entradas de tareas_previas que se conservan (las más recientes)
+            max_resultados (int): Resultados exitosos que se conservan (los de mejor
+                calificación y, a igualdad, los más recientes)
+            max_dias (float): Antigüedad máxima de tareas y resultados
+            max_por_tema (int): Resultados exitosos por tema (los mejores de cada tema)
+            compactar_cada (int): Tareas añadidas entre dos compactaciones
+        """
+        self.max_tareas = max_tareas
+        self.max_resultados = max_resultados
+        self.max_dias = max_dias
+        self.max_por_tema = max_por_tema
+        self.compactar_cada = compactar_cada
+    
+    def fecha_limite(self):
+        """Timestamp ISO anterior al cual las entradas caducan, o None sin límite de antigüedad."""
+        if not self.max_dias:
+            return None
+        return (datetime.now() - timedelta(days=self.max_dias)).isoformat()
\ No newline at end of file
@@ -0,0 +1,152 @@
+# memory/similitud.py
+import math
+import zlib
+from collections import Counter
+from config.settings import MEMORY_SIMILARITY_FEATURES
+from memory.indice import tokenizar
+
+try:
+    import numpy as np
+except ImportError:  # dependencia opcional
+    np = None
+
+
+def numpy_disponible():
+    """El índice de similitud necesita el paquete opcional numpy."""
+    if np is None:
+        print("MEMORY_SIMILARITY_ENABLED está activo pero 'numpy' no está instalado; se usa BM25")
+        return False
+    return True
+
+
+class IndiceSimilitud:
+    """Similitud TF-IDF sin servicios externos sobre unigramas y bigramas de palabras con hashing.
+    
+    Los documentos se guardan como una matriz dispersa (filas, columnas, pesos) en
+    arrays de NumPy que crecen al añadir cada tarea; una consulta calcula el coseno con
+    todos los documentos en una sola operación vectorizada.
+    """
+    
+    def __init__(self, dimensiones=MEMORY_SIMILARITY_FEATURES, longitud_resultado=2000):
+        """
+        Args:
+            dimensiones (int): Número de columnas a las que se reducen los n-gramas por hashing
+            longitud_resultado (int): Caracteres del resultado que se indexan junto a la descripción
+        """
+        self.dimensiones = dimensiones
+        self.longitud_resultado = longitud_resultado
+        self.total = 0
+        self._nnz = 0
+        self._filas = np.zeros(1024, dtype=np.int32)
+        self._columnas = np.zeros(1024, dtype=np.int32)
+        self._frecuencias = np.zeros(1024, dtype=np.float32)
+        self._inicios = [0]
+        self._ids = []
+        self._df = np.zeros(dimensiones, dtype=np.int32)
+        self._normas = None
+    
+    def __len__(self):
+        return self.total
+    
+    def _vectorizar(self, texto):
+        """Columnas y frecuencias (1 + log tf) de los n-gramas de un texto."""
+        terminos = tokenizar(texto)
+        ngramas = terminos + [f"{a} {b}" for a, b in zip(terminos, terminos[1:])]
+        conteo = Counter(zlib.crc32(ngrama.encode("utf-8")) % self.dimensiones for ngrama in ngramas)
+        columnas = np.fromiter(conteo.keys(), dtype=np.int32, count=len(conteo))
+        frecuencias = np.fromiter((1 + math.log(tf) for tf in conteo.values()), dtype=np.float32, count=len(conteo))
+        return columnas, frecuencias
+    
+    def _reservar(self, extra):
+        necesario = self._nnz + extra
+        if necesario > len(self._columnas):
+            capacidad = max(necesario, 2 * len(self._columnas))
+            for nombre in ("_filas", "_columnas", "_frecuencias"):
+                actual = getattr(self, nombre)
+                ampliado = np.zeros(capacidad, dtype=actual.dtype)
+                ampliado[:self._nnz] = actual[:self._nnz]
+                setattr(self, nombre, ampliado)
+    
+    def agregar(self, doc_id, descripcion, resultado="", tema=None):
+        """Añadir un documento a partir de su descripción, su tema y el inicio de su resultado."""
+        columnas, frecuencias = self._vectorizar(f"{descripcion} {tema or ''} {resultado[:self.longitud_resultado]}")
+        self._reservar(len(columnas))
+        fin = self._nnz + len(columnas)
+        self._filas[self._nnz:fin] = self.total
+        self._columnas[self._nnz:fin] = columnas
+        self._frecuencias[self._nnz:fin] = frecuencias
+        self._df[columnas] += 1
+        self._nnz = fin
+        self._inicios.append(fin)
+        self._ids.append(doc_id)
+        self.total += 1
+        self._normas = None
+    
+    def _pesos(self):
+        """Pesos TF-IDF de todos los elementos de la matriz y normas de cada documento."""
+        idf = np.log((1 + self.total) / (1 + self._df)).astype(np.float32) + 1
+        columnas = self._columnas[:self._nnz]
+        pesos = self._frecuencias[:self._nnz] * idf[columnas]
+        if self._normas is None:
+            self._normas = np.sqrt(np.bincount(self._filas[:self._nnz], weights=pesos * pesos, minlength=self.total))
+        return idf, pesos
+    
+    def buscar(self, consulta, limite=3, diversidad=0.0):
+        """Devolver los documentos más parecidos a la consulta por coseno TF-IDF.
+        
+        Args:
+            consulta (str): Texto de la consulta
+            limite (int): Número máximo de documentos
+            diversidad (float): 0 ordena solo por relevancia; valores mayores (hasta 1)
+                penalizan los documentos parecidos a los ya elegidos (MMR)
+            
+        Returns:
+            list: (doc_id, similitud) de los documentos elegidos, en orden de elección
+        """
+        if not self.total:
+            return []
+        columnas_consulta, frecuencias_consulta = self._vectorizar(consulta)
+        if not len(columnas_consulta):
+            return []
+        
+        idf, pesos = self._pesos()
+        consulta_densa = np.zeros(self.dimensiones, dtype=np.float32)
+        consulta_densa[columnas_consulta] = frecuencias_consulta * idf[columnas_consulta]
+        consulta_densa /= np.linalg.norm(consulta_densa)
+        
+        productos = np.bincount(self._filas[:self._nnz], weights=pesos * consulta_densa[self._columnas[:self._nnz]],
+                                minlength=self.total)
+        similitudes = productos / np.maximum(self._normas, 1e-12)
+        
+        # Candidatos: los mejores por relevancia (más de los necesarios si se pide diversidad)
+        n_candidatos = min(self.total, limite * 5 if diversidad else limite)
+        candidatos = np.argpartition(-similitudes, n_candidatos - 1)[:n_candidatos]
+        candidatos = candidatos[np.argsort(-similitudes[candidatos])]
+        candidatos = [int(c) for c in candidatos if similitudes[c] > 0]
+        if not diversidad or len(candidatos) <= 1:
+            return [(self._ids[c], float(similitudes[c])) for c in candidatos[:limite]]
+        return self._diversificar(candidatos, similitudes, pesos, limite, diversidad)
+    
+    def _diversificar(self, candidatos, similitudes, pesos, limite, diversidad):
+        """Selección por relevancia marginal máxima entre los candidatos."""
+        # Matriz densa de los candidatos sobre las columnas que usan entre todos
+        tramos = [(self._inicios[c], self._inicios[c + 1]) for c in candidatos]
+        columnas, posiciones = np.unique(
+            np.concatenate([self._columnas[inicio:fin] for inicio, fin in tramos]), return_inverse=True
+        )
+        matriz = np.zeros((len(candidatos), len(columnas)), dtype=np.float32)
+        desplazamiento = 0
+        for fila, (inicio, fin) in enumerate(tramos):
+            matriz[fila, posiciones[desplazamiento:desplazamiento + fin - inicio]] = pesos[inicio:fin]
+            desplazamiento += fin - inicio
+        matriz /= np.maximum(np.linalg.norm(matriz, axis=1, keepdims=True), 1e-12)
+        parecidos = matriz @ matriz.T
+        
+        relevancia = similitudes[candidatos]
+        elegidos = [0]
+        while len(elegidos) < min(limite, len(candidatos)):
+            redundancia = parecidos[:, elegidos].max(axis=1)
+            puntuaciones = (1 - diversidad) * relevancia - diversidad * redundancia
+            puntuaciones[elegidos] = -np.inf
+            elegidos.append(int(np.argmax(puntuaciones)))
+        return [(self._ids[candidatos[i]], float(relevancia[i])) for i in elegidos]
\ No newline at end of file
@@ -0,0 +1,388 @@
+# pipeline.py
+import os
+import time
+import asyncio
+import logging
+
+from agents.base import Agent
+from agents.researcher import ResearcherAgent
+from agents.analyst import AnalystAgent
+from agents.communicator import CommunicatorAgent
+from agents.template_agent import TemplateAgent
+from workflow.task import Task
+from workflow.workflow import MultiAgentWorkflow
+from workflow.journal import DiarioEjecucion
+from utils.artefactos import AlmacenArtefactos
+from utils.text_processing import clean_email_content, normalize_text
+from utils.tracing import trazar
+from memory.agente_memory import AgenteMemoria
+from config.settings import (
+    ARTIFACT_CACHE_ENABLED, WORKFLOW_PIPELINED, WORKFLOW_DAG, WORKFLOW_DAG_MAX_PARALLEL, MEMORY_FEWSHOT_DIVERSITY
+)
+
+logger = logging.getLogger(__name__)
+
+
+async def _sin_notificar(texto):
+    pass
+
+
+def crear_memorias():
+    """Cargar la memoria persistente de cada agente del pipeline."""
+    return {
+        "investigador": AgenteMemoria("Investigador"),
+        "analista": AgenteMemoria("Analista"),
+        "comunicador": AgenteMemoria("Comunicador"),
+        "disenador": AgenteMemoria("Disenador")
+    }
+
+
+async def aprecargar_memorias(memorias):
+    """Abrir las memorias y construir sus índices en hilos, sin bloquear el event loop."""
+    await asyncio.gather(*[asyncio.to_thread(memoria.precargar) for memoria in memorias.values()])
+
+
+def crear_agentes(llm, memorias):
+    """Crear los agentes de una ejecución.
+    
+    Cada correo usa sus propias instancias porque refinar el objetivo modifica el agente;
+    las memorias y el cliente del LLM sí se comparten.
+    """
+    agentes = {
+        "investigador": ResearcherAgent(llm),
+        "analista": AnalystAgent(llm),
+        "comunicador": CommunicatorAgent(llm),
+        "disenador": TemplateAgent(llm)
+    }
+    for clave, agente in agentes.items():
+        agente.memoria = memorias[clave]
+    return agentes
+
+
+def _guardar_archivos(tema, cuerpo_email, html_email, directorio_salida):
+    """Escribir el texto y el HTML del correo y devolver sus rutas."""
+    os.makedirs(directorio_salida, exist_ok=True)
+    filename_text = os.path.join(directorio_salida, f"{tema.replace(' ', '_').lower()}_email.txt")
+    filename_html = os.path.join(directorio_salida, f"{tema.replace(' ', '_').lower()}_email.html")
+    
+    with open(filename_text, 'w', encoding='utf-8') as f:
+        f.write(cuerpo_email)
+    
+    with open(filename_html, 'w', encoding='utf-8') as f:
+        f.write(html_email)
+    
+    return filename_text, filename_html
+
+
+@trazar("correo")
+async def generar_correo(tema, llm, memorias, run_id=None, notificar=None, on_chunk=None,
+                         cancelacion=None, directorio_salida=".", almacen=None, regenerar=False):
+    """Generar el asunto, el texto y el HTML de un correo con el sistema multiagente.
+    
+    Args:
+        tema (str): Tema del correo
+        llm (DeepSeekAPI): Cliente del LLM compartido
+        memorias (dict): Memorias de los agentes (ver crear_memorias)
+        run_id (str, opcional): Identificador del diario de ejecución; por defecto depende del tema
+        notificar (callable, opcional): Corrutina que recibe los mensajes de progreso
+        on_chunk (callable, opcional): Recibe el correo parcial mientras se redacta
+        cancelacion (TokenCancelacion, opcional): Permite abortar la generación
+        directorio_salida (str): Carpeta donde se guardan los archivos .txt y .html
+        almacen (AlmacenArtefactos, opcional): Correos ya generados por tema normalizado;
+            por defecto el compartido cuando ARTIFACT_CACHE_ENABLED está activo
+        regenerar (bool): Ignorar el correo guardado y generarlo de nuevo
+    
+    Returns:
+        dict: asunto, cuerpo, html, filename_text, filename_html, duraciones por etapa
+            (segundos), desde_cache y el flujo de trabajo ejecutado (None si vino del almacén)
+    """
+    notificar = notificar or _sin_notificar
+    inicio = time.monotonic()
+    
+    # Un tema ya generado dentro del plazo del almacén se sirve sin ninguna llamada al LLM
+    clave_almacen = normalize_text(tema)
+    if almacen is None and ARTIFACT_CACHE_ENABLED:
+        almacen = _almacen_por_defecto()
+    if almacen is not None and not regenerar:
+        guardado = almacen.obtener(clave_almacen)
+        if guardado is not None:
+            await notificar("♻️ Se reutiliza el correo generado recientemente sobre este tema.")
+            filename_text, filename_html = _guardar_archivos(
+                tema, guardado["cuerpo"], guardado["html"], directorio_salida
+            )
+            return {
+                "asunto": guardado["asunto"],
+                "cuerpo": guardado["cuerpo"],
+                "html": guardado["html"],
+                "filename_text": filename_text,
+                "filename_html": filename_html,
+                "duraciones": {"total": time.monotonic() - inicio},
+                "desde_cache": True,
+                "flujo": None
+            }
+    
+    agentes = crear_agentes(llm, memorias)
+    duraciones = {}
+    
+    # Generar asunto
+    await notificar("Generando asunto y refinando objetivos de los agentes...")
+    
+    prompt_asunto = f"""
+    Genera un asunto de correo electrónico corto, profesional y atractivo para un correo sobre:
+    {tema}
+    
+    El asunto debe ser muy breve (máximo 8 palabras) y conciso, pero informativo.
+    Responde ÚNICAMENTE con el asunto, sin explicaciones ni texto adicional.
+    """
+    
+    # El asunto y los objetivos refinados no dependen entre sí: pedirlos en paralelo
+    asunto_email, _ = await asyncio.gather(
+        llm.agenerate(prompt_asunto, use_cache=True, profile="short"),
+        Agent.arefinar_objetivos(list(agentes.values()), tema)
+    )
+    asunto_email = asunto_email.strip()
+    
+    # Limpiar asunto
+    if len(asunto_email.split('\n')) > 1:
+        asunto_email = asunto_email.split('\n')[0]
+    
+    await notificar(f"Asunto generado: {asunto_email}")
+    
+    # Buscar tareas similares en memoria
+    tareas_similares = await agentes["investigador"].memoria.aobtener_tareas_exitosas_similares(
+        f"Investigación sobre {tema}", tema=tema, diversidad=MEMORY_FEWSHOT_DIVERSITY
+    )
+    
+    # Crear contexto de memoria
+    contexto_memoria_texto = ""
+    if tareas_similares:
+        await notificar(f"Se encontraron {len(tareas_similares)} tareas similares previas para aprender.")
+        ejemplos_lista = []
+        for i, tarea in enumerate(tareas_similares):
+            ejemplos_lista.append(f"Ejemplo {i+1}:\n{tarea['resultado'][:300]}...")
+        
+        ejemplos = "\n\n".join(ejemplos_lista)
+        contexto_de_memoria = f"Ejemplos de investigaciones exitosas en temas similares:\n{ejemplos}"
+        contexto_memoria_texto = "CONTEXTO DE MEMORIA:\n" + contexto_de_memoria
+    
+    # Crear tareas
+    descripcion_investigacion = f"""
+        Investiga el tema "{tema}" y recopila información relevante.
+        
+        INSTRUCCIONES:
+        1. Busca datos importantes sobre el tema
+        2. Incluye definiciones, historia y aplicaciones
+        3. Menciona 3-5 puntos interesantes
+        4. Organiza la información de forma clara
+        5. NO incluyas opiniones personales
+        6. NO menciones frases como "Como investigador..."
+        
+        {contexto_memoria_texto}
+        """
+    
+    tarea_investigacion = Task(
+        description=descripcion_investigacion,
+        agent=agentes["investigador"],
+        dependencias=[]
+    )
+    
+    descripcion_analisis = f"""
+        Analiza la siguiente información sobre "{tema}".
+        
+        INSTRUCCIONES:
+        1. Identifica los 3-4 aspectos más importantes del tema
+        2. Sintetiza la información de forma concisa
+        3. Destaca los datos más interesantes
+        4. Organiza el análisis de forma lógica
+        5. NO añadas información nueva
+        6. NO incluyas frases como "Como analista..."
+        
+        {{task_1}}
+        """
+    
+    tarea_analisis = Task(
+        description=descripcion_analisis,
+        agent=agentes["analista"],
+        dependencias=["task_1"],
+        max_tokens_contexto=3000,
+        incremental=True
+    )
+    
+    descripcion_comunicacion = f"""
+        Crea un correo electrónico profesional sobre "{tema}" con el asunto "{asunto_email}".
+        
+        INSTRUCCIONES:
+        1. Crea un correo electrónico profesional y bien estructurado
+        2. Comienza con "Estimado/a:"
+        3. Termina con "Atentamente, Equipo de Investigación"
+        4. Usa viñetas para listar puntos importantes (precedidos por - o •)
+        5. Separa cada párrafo con una línea en blanco
+        6. Asegúrate de organizar la información en secciones claras
+        7. Destaca 3-4 puntos clave sobre el tema
+        8. NO incluyas metadatos ni explicaciones del proceso
+        9. NO uses placeholders como [nombre]
+        
+        {{task_2}}
+        """
+    
+    tarea_comunicacion = Task(
+        description=descripcion_comunicacion,
+        agent=agentes["comunicador"],
+        on_chunk=on_chunk,
+        dependencias=["task_2"],
+        max_tokens_contexto=2000
+    )
+    
+    descripcion_template = f"""
+        Genera un template HTML personalizado para el correo sobre "{tema}".
+        Analiza el contenido y selecciona el formato visual más adecuado.
+        
+        INSTRUCCIONES:
+        1. Analiza el tipo de contenido (académico, técnico, corporativo, etc.)
+        2. Selecciona colores y estilos apropiados para el tema
+        3. Estructura el contenido para máxima legibilidad
+        4. Asegura que el diseño sea responsive y profesional
+        5. Destaca elementos clave del contenido
+        
+        {{task_3}}
+        """
+    
+    tarea_template = Task(
+        description=descripcion_template,
+        agent=agentes["disenador"],
+        dependencias=["task_3"],
+        max_tokens_contexto=1500
+    )
+    duraciones["preparacion"] = time.monotonic() - inicio
+    
+    # Diario de la ejecución: si una ejecución anterior con el mismo tema falló, se reanuda
+    diario = DiarioEjecucion(run_id or DiarioEjecucion.huella(tema.strip().lower()))
+    if diario.completadas():
+        await notificar("Reanudando una ejecución anterior: se reutilizan las etapas ya completadas.")
+    
+    # Crear flujo de trabajo
+    flujo_trabajo = MultiAgentWorkflow(
+        agents=list(agentes.values()),
+        tasks=[tarea_investigacion, tarea_analisis, tarea_comunicacion, tarea_template],
+        diario=diario,
+        token=cancelacion
+    )
+    
+    # Ejecutar flujo
+    if WORKFLOW_PIPELINED:
+        # El análisis empieza con los primeros párrafos de la investigación, sin retroalimentación
+        await notificar("Ejecutando flujo de trabajo en modo pipeline...")
+        resultados = await flujo_trabajo.aejecutar_pipeline()
+    elif WORKFLOW_DAG:
+        # Cada tarea empieza en cuanto terminan sus dependencias; las independientes en paralelo
+        await notificar("Ejecutando flujo de trabajo por dependencias con retroalimentación...")
+        resultados = await flujo_trabajo.aejecutar_dag(retroalimentacion=True, max_paralelo=WORKFLOW_DAG_MAX_PARALLEL)
+    else:
+        await notificar("Ejecutando flujo de trabajo con retroalimentación entre agentes...")
+        resultados = await flujo_trabajo.aejecutar_con_retroalimentacion()
+    for task_key, segundos in flujo_trabajo.duraciones.items():
+        duraciones[task_key] = segundos
+    
+    # Obtener contenido del correo
+    cuerpo_email = resultados.get("task_3", "No se pudo generar el contenido del correo.")
+    cuerpo_email = clean_email_content(cuerpo_email)
+    
+    # Obtener HTML
+    html_email = resultados.get("task_4", None)
+    
+    # Si no se generó HTML correctamente, usar método especializado
+    if not html_email or "<html" not in html_email.lower():
+        await notificar("Generando HTML personalizado para el correo...")
+        inicio_html = time.monotonic()
+        try:
+            html_email = await flujo_trabajo.aejecutar_tarea_personalizada(
+                3,  # Índice del agente diseñador (0-based)
+                tema,
+                cuerpo_email,
+                asunto_email,
+                method_name='aexecute_template_task'
+            )
+        except Exception as e:
+            logger.error(f"Error al generar HTML: {str(e)}")
+            # Crear HTML básico como respaldo
+            content_formatted = cuerpo_email.replace('\n\n', '</p><p>').replace('\n', '<br>')
+            html_email = f"""
+            <!DOCTYPE html>
+            <html><head><meta charset="UTF-8"><title>{asunto_email}</title>
+            <style>
+                body {{ font-family: Arial, sans-serif; margin: 0; padding: 20px; }}
+                .container {{ max-width: 600px; margin: 0 auto; }}
+                .header {{ border-bottom: 2px solid #3498db; padding-bottom: 10px; }}
+                .content {{ padding: 20px 0; }}
+                .footer {{ border-top: 1px solid #ddd; padding-top: 10px; font-size: 12px; }}
+            </style></head>
+            <body><div class="container">
+                <div class="header"><h2>{asunto_email}</h2></div>
+                <div class="content">{content_formatted}</div>
+                <div class="footer"><p>Correo generado por Sistema Multiagente</p></div>
+            </div></body></html>
+            """
+        duraciones["html"] = time.monotonic() - inicio_html
+    
+    # Guardar en memoria
+    agentes["investigador"].memoria.agregar_tarea(
+        tarea_investigacion.description, 
+        resultados.get("task_1", ""), 
+        9,
+        tema=tema
+    )
+    
+    agentes["analista"].memoria.agregar_tarea(
+        tarea_analisis.description, 
+        resultados.get("task_2", ""), 
+        9,
+        tema=tema
+    )
+    
+    agentes["comunicador"].memoria.agregar_tarea(
+        tarea_comunicacion.description, 
+        cuerpo_email, 
+        9,
+        tema=tema
+    )
+    
+    # Guardar muestra de HTML
+    html_sample = html_email[:500] + "..." if html_email and len(html_email) > 500 else html_email
+    
+    agentes["disenador"].memoria.agregar_tarea(
+        tarea_template.description,
+        html_sample,
+        9,
+        tema=tema
+    )
+    
+    # La ejecución terminó: ya no hay nada que reanudar
+    diario.descartar()
+    
+    # Guardar archivos
+    filename_text, filename_html = _guardar_archivos(tema, cuerpo_email, html_email, directorio_salida)
+    if almacen is not None:
+        almacen.guardar(clave_almacen, {"asunto": asunto_email, "cuerpo": cuerpo_email, "html": html_email})
+    
+    duraciones["total"] = time.monotonic() - inicio
+    
+    return {
+        "asunto": asunto_email,
+        "cuerpo": cuerpo_email,
+        "html": html_email,
+        "filename_text": filename_text,
+        "filename_html": filename_html,
+        "duraciones": duraciones,
+        "desde_cache": False,
+        "flujo": flujo_trabajo
+    }
+
+
+_almacen = None
+
+def _almacen_por_defecto():
+    """Devolver el almacén de artefactos del proceso configurado en settings."""
+    global _almacen
+    if _almacen is None:
+        _almacen = AlmacenArtefactos()
+    return _almacen
\ No newline at end of file
@@ -1,4 +1,4 @@
 from utils.email_utils import send_email
-from utils.text_processing import clean_email_content
+from utils.text_processing import clean_email_content, normalize_text
 
-__all__ = ['send_email', 'clean_email_content']
\ No newline at end of file
+__all__ = ['send_email', 'clean_email_content', 'normalize_text']
\ No newline at end of file
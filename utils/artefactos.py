@@ -0,0 +1,161 @@
+# utils/artefactos.py
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from config.settings import ARTIFACT_DIR, ARTIFACT_TTL, ARTIFACT_MAX_ENTRIES, ARTIFACT_MAX_BYTES
+
+
+class AlmacenArtefactos:
+    """Almacén direccionado por contenido para los resultados completos del pipeline.
+    
+    Cada artefacto (asunto, texto, HTML...) se guarda una sola vez en objetos/<hash>, y un
+    índice SQLite asocia cada clave (p. ej. el tema normalizado) a los hashes de sus
+    artefactos. Las entradas caducan tras `ttl` segundos y las menos usadas se eliminan
+    cuando se superan `max_entradas` o `max_bytes`.
+    """
+    
+    def __init__(self, directorio=ARTIFACT_DIR, ttl=ARTIFACT_TTL,
+                 max_entradas=ARTIFACT_MAX_ENTRIES, max_bytes=ARTIFACT_MAX_BYTES):
+        """Inicializar el almacén.
+        
+        Args:
+            directorio (str): Carpeta del índice y de los objetos
+            ttl (float): Segundos que una entrada es válida (0 sin caducidad)
+            max_entradas (int): Número máximo de entradas en el índice
+            max_bytes (int): Tamaño máximo del conjunto de objetos
+        """
+        self.directorio = directorio
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.aciertos = 0
+        self.fallos = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(directorio, "objetos"), exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(directorio, "indice.sqlite3"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entradas ("
+            "clave TEXT PRIMARY KEY, artefactos TEXT NOT NULL, "
+            "creado REAL NOT NULL, accedido REAL NOT NULL)"
+        )
+        self._db.execute("CREATE TABLE IF NOT EXISTS objetos (hash TEXT PRIMARY KEY, tamano INTEGER NOT NULL)")
+        self._db.commit()
+    
+    def _ruta_objeto(self, hash_contenido):
+        return os.path.join(self.directorio, "objetos", hash_contenido[:2], hash_contenido)
+    
+    def _guardar_objeto(self, contenido):
+        """Guardar un contenido (si no existía ya) y devolver su hash."""
+        datos = contenido.encode("utf-8")
+        hash_contenido = hashlib.sha256(datos).hexdigest()
+        ruta = self._ruta_objeto(hash_contenido)
+        if not os.path.exists(ruta):
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+            # Escritura atómica: un lector nunca ve un objeto a medias
+            descriptor, temporal = tempfile.mkstemp(dir=os.path.dirname(ruta))
+            with os.fdopen(descriptor, "wb") as f:
+                f.write(datos)
+            os.replace(temporal, ruta)
+        self._db.execute("INSERT OR REPLACE INTO objetos (hash, tamano) VALUES (?, ?)", (hash_contenido, len(datos)))
+        return hash_contenido
+    
+    def _leer_objeto(self, hash_contenido):
+        with open(self._ruta_objeto(hash_contenido), encoding="utf-8") as f:
+            return f.read()
+    
+    def _caducada(self, creado, ahora):
+        return bool(self.ttl) and ahora - creado > self.ttl
+    
+    def obtener(self, clave):
+        """Devolver {nombre: contenido} de la entrada, o None si no existe o caducó."""
+        ahora = time.time()
+        with self._lock:
+            fila = self._db.execute("SELECT artefactos, creado FROM entradas WHERE clave = ?", (clave,)).fetchone()
+            if fila is not None and not self._caducada(fila[1], ahora):
+                try:
+                    artefactos = {nombre: self._leer_objeto(h) for nombre, h in json.loads(fila[0]).items()}
+                except FileNotFoundError:
+                    artefactos = None
+                if artefactos is not None:
+                    self._db.execute("UPDATE entradas SET accedido = ? WHERE clave = ?", (ahora, clave))
+                    self._db.commit()
+                    self.aciertos += 1
+                    return artefactos
+            if fila is not None:
+                # Caducada o con objetos perdidos: no sirve
+                self._db.execute("DELETE FROM entradas WHERE clave = ?", (clave,))
+                self._recolectar()
+            self.fallos += 1
+            return None
+    
+    def guardar(self, clave, artefactos):
+        """Guardar los artefactos de una clave y aplicar los límites de tamaño.
+        
+        Args:
+            clave (str): Clave de la entrada
+            artefactos (dict): {nombre: contenido de texto}
+        """
+        ahora = time.time()
+        with self._lock:
+            hashes = {nombre: self._guardar_objeto(contenido) for nombre, contenido in artefactos.items()}
+            self._db.execute(
+                "INSERT OR REPLACE INTO entradas (clave, artefactos, creado, accedido) VALUES (?, ?, ?, ?)",
+                (clave, json.dumps(hashes), ahora, ahora)
+            )
+            self._aplicar_limites(ahora)
+    
+    def invalidar(self, clave):
+        """Eliminar la entrada de una clave."""
+        with self._lock:
+            self._db.execute("DELETE FROM entradas WHERE clave = ?", (clave,))
+            self._recolectar()
+    
+    def _aplicar_limites(self, ahora):
+        """Eliminar entradas caducadas y, por antigüedad de uso, las que excedan los límites."""
+        if self.ttl:
+            self._db.execute("DELETE FROM entradas WHERE creado < ?", (ahora - self.ttl,))
+        self._db.execute(
+            "DELETE FROM entradas WHERE clave IN ("
+            "SELECT clave FROM entradas ORDER BY accedido DESC LIMIT -1 OFFSET ?)",
+            (self.max_entradas,)
+        )
+        self._recolectar()
+        while self._bytes_totales() > self.max_bytes:
+            fila = self._db.execute("SELECT clave FROM entradas ORDER BY accedido ASC LIMIT 1").fetchone()
+            if fila is None:
+                break
+            self._db.execute("DELETE FROM entradas WHERE clave = ?", (fila[0],))
+            self._recolectar()
+    
+    def _bytes_totales(self):
+        return self._db.execute("SELECT COALESCE(SUM(tamano), 0) FROM objetos").fetchone()[0]
+    
+    def _recolectar(self):
+        """Borrar los objetos que ya no referencia ninguna entrada."""
+        referenciados = set()
+        for (artefactos,) in self._db.execute("SELECT artefactos FROM entradas"):
+            referenciados.update(json.loads(artefactos).values())
+        for (hash_contenido,) in self._db.execute("SELECT hash FROM objetos").fetchall():
+            if hash_contenido not in referenciados:
+                try:
+                    os.remove(self._ruta_objeto(hash_contenido))
+                except FileNotFoundError:
+                    pass
+                self._db.execute("DELETE FROM objetos WHERE hash = ?", (hash_contenido,))
+        self._db.commit()
+    
+    def estadisticas(self):
+        """Aciertos, fallos, entradas y bytes ocupados."""
+        with self._lock:
+            entradas = self._db.execute("SELECT COUNT(*) FROM entradas").fetchone()[0]
+            return {
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "entradas": entradas,
+                "bytes": self._bytes_totales()
+            }
\ No newline at end of file
@@ -4,7 +4,9 @@ import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from config.settings import EMAIL_SMTP_SERVER, EMAIL_SMTP_PORT, EMAIL_USERNAME, EMAIL_PASSWORD
+from utils.tracing import trazar, span_actual
 
+@trazar("smtp")
 def send_email(to: str, subject: str, body: str, is_html: bool = False,
                smtp_server: str = None, smtp_port: int = None, 
                username: str = None, password: str = None) -> str:
@@ -59,4 +61,6 @@ def send_email(to: str, subject: str, body: str, is_html: bool = False,
             server.sendmail(username, [to], msg.as_string())
         return "Correo enviado exitosamente."
     except Exception as e:
+        # El error se devuelve como texto; dejarlo también en la traza
+        span_actual().registrar(error_envio=f"{type(e).__name__}: {e}")
         return f"Error al enviar el correo: {str(e)}"
\ No newline at end of file
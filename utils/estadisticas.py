@@ -0,0 +1,7 @@
+# utils/estadisticas.py
+
+
+def percentil(ordenados, fraccion):
+    """Valor en la fracción (0-1) de una lista ya ordenada, por el rango más cercano."""
+    indice = min(len(ordenados) - 1, int(round(fraccion * (len(ordenados) - 1))))
+    return ordenados[indice]
\ No newline at end of file
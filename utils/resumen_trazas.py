@@ -0,0 +1,66 @@
+# utils/resumen_trazas.py
+import argparse
+import json
+from config.settings import TRACING_PATH
+from utils.estadisticas import percentil
+
+
+def resumir_trazas(ruta=TRACING_PATH, por_nombre=False):
+    """Agrupar los spans exportados y calcular latencias y tokens.
+    
+    Args:
+        ruta (str): Archivo JSONL de spans
+        por_nombre (bool): Agrupar por tipo y nombre en lugar de solo por tipo
+        
+    Returns:
+        dict: {grupo: {"spans", "errores", "p50_ms", "p95_ms", "total_ms", "prompt_tokens", "completion_tokens"}}
+    """
+    grupos = {}
+    with open(ruta, encoding="utf-8") as f:
+        for linea in f:
+            try:
+                registro = json.loads(linea)
+            except json.JSONDecodeError:
+                continue
+            clave = f"{registro['tipo']}:{registro['nombre']}" if por_nombre else registro["tipo"]
+            grupo = grupos.setdefault(clave, {"duraciones": [], "errores": 0, "prompt_tokens": 0, "completion_tokens": 0})
+            grupo["duraciones"].append(registro["duracion_ms"])
+            grupo["errores"] += 1 if registro.get("error") else 0
+            atributos = registro.get("atributos") or {}
+            grupo["prompt_tokens"] += atributos.get("prompt_tokens", 0)
+            grupo["completion_tokens"] += atributos.get("completion_tokens", 0)
+    
+    resumen = {}
+    for clave, grupo in grupos.items():
+        ordenados = sorted(grupo["duraciones"])
+        resumen[clave] = {
+            "spans": len(ordenados),
+            "errores": grupo["errores"],
+            "p50_ms": percentil(ordenados, 0.5),
+            "p95_ms": percentil(ordenados, 0.95),
+            "total_ms": sum(ordenados),
+            "prompt_tokens": grupo["prompt_tokens"],
+            "completion_tokens": grupo["completion_tokens"]
+        }
+    return resumen
+
+
+def main():
+    """CLI: python -m utils.resumen_trazas [ruta] [--por-nombre]"""
+    parser = argparse.ArgumentParser(description="Resumen de latencias y tokens por tipo de span")
+    parser.add_argument("ruta", nargs="?", default=TRACING_PATH, help="Archivo JSONL de trazas")
+    parser.add_argument("--por-nombre", action="store_true", help="Agrupar también por nombre del span")
+    args = parser.parse_args()
+    
+    resumen = resumir_trazas(args.ruta, args.por_nombre)
+    print(f"{'span':<45} {'n':>6} {'err':>4} {'p50 ms':>10} {'p95 ms':>10} {'total s':>9} {'tok in':>8} {'tok out':>8}")
+    for clave, datos in sorted(resumen.items(), key=lambda item: -item[1]["total_ms"]):
+        print(
+            f"{clave[:45]:<45} {datos['spans']:>6} {datos['errores']:>4} {datos['p50_ms']:>10.1f} "
+            f"{datos['p95_ms']:>10.1f} {datos['total_ms'] / 1000:>9.2f} "
+            f"{datos['prompt_tokens']:>8} {datos['completion_tokens']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -1,4 +1,5 @@
 import re
+import unicodedata
 
 def clean_email_content(email_body):
     """Clean email content to remove metadata or instructions.
@@ -58,4 +59,19 @@ def clean_email_content(email_body):
             if not "equipo de investigación" in cleaned_text.lower()[-150:]:
                 cleaned_text += "\n\nAtentamente,\nEquipo de Investigación"
     
-    return cleaned_text.strip()
\ No newline at end of file
+    return cleaned_text.strip()
+
+
+def normalize_text(text):
+    """Normalize text for matching: lowercase, no accents or punctuation, single spaces.
+    
+    Args:
+        text (str): Original text
+        
+    Returns:
+        str: Normalized text
+    """
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
\ No newline at end of file
@@ -0,0 +1,161 @@
+# utils/tracing.py
+import contextvars
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from config.settings import TRACING_ENABLED, TRACING_PATH
+
+# Span activo en el hilo o tarea asyncio actual
+_span_actual = contextvars.ContextVar("span_actual", default=None)
+
+
+class Span:
+    """Intervalo de trabajo con sus atributos (tokens, aciertos de caché, errores...)."""
+    
+    def __init__(self, tipo, nombre, padre=None, atributos=None):
+        self.tipo = tipo
+        self.nombre = nombre
+        self.trace_id = padre.trace_id if padre else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.padre_id = padre.span_id if padre else None
+        self.inicio = time.time()
+        self._inicio_monotonico = time.perf_counter()
+        self.duracion = None
+        self.atributos = dict(atributos or {})
+        self.error = None
+    
+    def registrar(self, **atributos):
+        """Añadir o actualizar atributos del span; los valores None se ignoran."""
+        self.atributos.update({clave: valor for clave, valor in atributos.items() if valor is not None})
+    
+    def sumar(self, **contadores):
+        """Acumular contadores numéricos (p. ej. tokens de varias respuestas)."""
+        for clave, valor in contadores.items():
+            if valor:
+                self.atributos[clave] = self.atributos.get(clave, 0) + valor
+    
+    def terminar(self, error=None):
+        self.duracion = time.perf_counter() - self._inicio_monotonico
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+    
+    def como_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "padre_id": self.padre_id,
+            "tipo": self.tipo,
+            "nombre": self.nombre,
+            "inicio": self.inicio,
+            "fin": self.inicio + (self.duracion or 0.0),
+            "duracion_ms": round((self.duracion or 0.0) * 1000, 3),
+            "atributos": self.atributos,
+            "error": self.error
+        }
+
+
+class _SpanNulo(Span):
+    """Span de relleno cuando no hay ninguno activo: acepta atributos y los descarta."""
+    
+    def __init__(self):
+        super().__init__("nulo", "nulo")
+    
+    def registrar(self, **atributos):
+        pass
+    
+    def sumar(self, **contadores):
+        pass
+
+
+_SPAN_NULO = _SpanNulo()
+
+
+class Trazador:
+    """Crea spans anidados y los exporta, uno por línea, a un archivo JSONL."""
+    
+    def __init__(self, ruta=TRACING_PATH, habilitado=TRACING_ENABLED):
+        """Inicializar el trazador.
+        
+        Args:
+            ruta (str): Archivo JSONL donde se añaden los spans terminados
+            habilitado (bool): Si es False los spans se crean pero no se exportan
+        """
+        self.ruta = ruta
+        self.habilitado = habilitado
+        self._lock = threading.Lock()
+        if habilitado:
+            directorio = os.path.dirname(ruta)
+            if directorio:
+                os.makedirs(directorio, exist_ok=True)
+    
+    @contextmanager
+    def span(self, tipo, nombre=None, **atributos):
+        """Abrir un span hijo del span activo; registra la excepción si la hay y lo exporta al cerrar."""
+        span_nuevo = Span(tipo, nombre or tipo, _span_actual.get(), atributos)
+        token = _span_actual.set(span_nuevo)
+        error = None
+        try:
+            yield span_nuevo
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            span_nuevo.terminar(error)
+            try:
+                _span_actual.reset(token)
+            except ValueError:
+                # Un generador cerrado desde otro contexto (p. ej. por el recolector)
+                pass
+            self._exportar(span_nuevo)
+    
+    def _exportar(self, span_terminado):
+        if not self.habilitado:
+            return
+        linea = json.dumps(span_terminado.como_dict(), ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            with open(self.ruta, "a", encoding="utf-8") as f:
+                f.write(linea)
+
+
+_trazador = None
+
+def obtener_trazador():
+    """Devolver el trazador del proceso configurado en settings."""
+    global _trazador
+    if _trazador is None:
+        _trazador = Trazador()
+    return _trazador
+
+
+def span(tipo, nombre=None, **atributos):
+    """Abrir un span con el trazador del proceso (usar con with)."""
+    return obtener_trazador().span(tipo, nombre, **atributos)
+
+
+def span_actual():
+    """Span activo; si no hay ninguno, uno nulo que ignora los atributos."""
+    return _span_actual.get() or _SPAN_NULO
+
+
+def trazar(tipo, nombre=None):
+    """Decorador que envuelve cada llamada (síncrona o asíncrona) en un span."""
+    def decorador(funcion):
+        nombre_span = nombre or funcion.__qualname__
+        
+        if inspect.iscoroutinefunction(funcion):
+            @functools.wraps(funcion)
+            async def envoltura(*args, **kwargs):
+                with span(tipo, nombre_span):
+                    return await funcion(*args, **kwargs)
+        else:
+            @functools.wraps(funcion)
+            def envoltura(*args, **kwargs):
+                with span(tipo, nombre_span):
+                    return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
\ No newline at end of file
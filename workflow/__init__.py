@@ -1,4 +1,9 @@
 from workflow.task import Task
 from workflow.workflow import MultiAgentWorkflow
+from workflow.context import EnsambladorContexto
+from workflow.journal import DiarioEjecucion
+from workflow.feedback import PoliticaRetroalimentacion
+from workflow.cancellation import TokenCancelacion, EjecucionCancelada, PlazoExcedido
 
-__all__ = ['Task', 'MultiAgentWorkflow']
\ No newline at end of file
+__all__ = ['Task', 'MultiAgentWorkflow', 'EnsambladorContexto', 'DiarioEjecucion', 'PoliticaRetroalimentacion',
+           'TokenCancelacion', 'EjecucionCancelada', 'PlazoExcedido']
\ No newline at end of file
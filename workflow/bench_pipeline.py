@@ -0,0 +1,97 @@
+# workflow/bench_pipeline.py
+import argparse
+import asyncio
+import re
+import time
+
+from agents.base import Agent
+from llm.backends import MockBackend
+from llm.deepseek import DeepSeekAPI
+from workflow.context import contar_tokens
+from workflow.task import Task
+from workflow.workflow import MultiAgentWorkflow
+from config.settings import WORKFLOW_SEGMENT_MIN_TOKENS
+
+# Tokens de la respuesta de la primera etapa y proporción salida/entrada de las siguientes
+TOKENS_INVESTIGACION = 800
+PROPORCION_SALIDA = 0.6
+TOKENS_PARRAFO = 60
+
+
+def _parrafos(tokens):
+    """Texto de unos `tokens` tokens en párrafos de TOKENS_PARRAFO tokens."""
+    frase = "Dato relevante con su explicación y un ejemplo concreto. "
+    parrafo = (frase * (TOKENS_PARRAFO * 4 // len(frase) + 1)).strip()
+    return "\n\n".join(parrafo for _ in range(max(1, tokens // TOKENS_PARRAFO)))
+
+
+def _responder(prompt):
+    """Respuesta de la primera etapa de tamaño fijo; las demás, proporcionales a su entrada."""
+    entrada = re.search(r"ENTRADA:(.*?)## |ENTRADA:(.*)", prompt, re.S)
+    if entrada is None:
+        return _parrafos(TOKENS_INVESTIGACION)
+    return _parrafos(int(contar_tokens(entrada.group(1) or entrada.group(2)) * PROPORCION_SALIDA))
+
+
+def _crear_flujo(llm, incremental):
+    agentes = [
+        Agent(nombre, nombre, "Producir una salida útil para la etapa siguiente", "Agente de prueba", llm)
+        for nombre in ("Investigador", "Analista", "Comunicador")
+    ]
+    tareas = [
+        Task("Investiga el tema y recopila información.", agentes[0], dependencias=[]),
+        Task("Analiza cada sección.\n\nENTRADA:\n{task_1}", agentes[1], dependencias=["task_1"],
+             max_tokens_contexto=100000, incremental=incremental),
+        Task("Redacta el correo.\n\nENTRADA:\n{task_2}", agentes[2], dependencias=["task_2"],
+             max_tokens_contexto=100000)
+    ]
+    return MultiAgentWorkflow(agentes, tareas)
+
+
+async def comparar(latencia, tokens_por_segundo, repeticiones, min_tokens_segmento=WORKFLOW_SEGMENT_MIN_TOKENS):
+    """Medir la duración del modo secuencial (arun) y del modo pipeline con el backend simulado.
+    
+    Args:
+        latencia (float): Latencia fija de cada llamada antes de generar, en segundos
+        tokens_por_segundo (float): Velocidad de generación simulada
+        repeticiones (int): Ejecuciones de cada modo
+        min_tokens_segmento (int): Tokens mínimos de cada segmento en modo pipeline
+        
+    Returns:
+        dict: Duración media en segundos de cada modo y la aceleración del pipeline
+    """
+    backend = MockBackend(latency="fixed", latency_mean=latencia, tokens_per_second=tokens_por_segundo,
+                          responder=_responder)
+    llm = DeepSeekAPI(backend=backend, cache=None, coalesce=False)
+    
+    duraciones = {"secuencial": [], "pipeline": []}
+    for _ in range(repeticiones):
+        inicio = time.monotonic()
+        await _crear_flujo(llm, incremental=False).arun()
+        duraciones["secuencial"].append(time.monotonic() - inicio)
+        
+        inicio = time.monotonic()
+        await _crear_flujo(llm, incremental=True).aejecutar_pipeline(min_tokens_segmento)
+        duraciones["pipeline"].append(time.monotonic() - inicio)
+    
+    medias = {modo: sum(valores) / len(valores) for modo, valores in duraciones.items()}
+    medias["aceleracion"] = medias["secuencial"] / medias["pipeline"]
+    return medias
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Comparar el modo secuencial con el modo pipeline")
+    parser.add_argument("--latencia", type=float, default=0.5, help="Latencia de cada llamada (s)")
+    parser.add_argument("--tokens-por-segundo", type=float, default=400, help="Velocidad de generación simulada")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--min-tokens-segmento", type=int, default=WORKFLOW_SEGMENT_MIN_TOKENS)
+    args = parser.parse_args()
+    
+    medias = asyncio.run(comparar(args.latencia, args.tokens_por_segundo, args.repeticiones, args.min_tokens_segmento))
+    print(f"\nSecuencial: {medias['secuencial']:.2f} s")
+    print(f"Pipeline:   {medias['pipeline']:.2f} s")
+    print(f"Aceleración: x{medias['aceleracion']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,99 @@
+# workflow/cancellation.py
+import asyncio
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+# Cada cuánto comprueba una espera síncrona si la ejecución se canceló (segundos)
+INTERVALO_COMPROBACION = 0.1
+
+
+class EjecucionCancelada(Exception):
+    """La ejecución se canceló antes de terminar."""
+
+
+class PlazoExcedido(Exception):
+    """Una tarea o la ejecución completa superó su plazo."""
+
+
+class TokenCancelacion:
+    """Señal compartida para abortar una ejecución en curso.
+    
+    cancelar() marca el token y cancela las corrutinas lanzadas con ejecutar(), de modo
+    que las peticiones asíncronas al LLM pendientes se abortan; las síncronas no pueden
+    interrumpirse y solo se deja de esperarlas (ver esperar()). Los flujos comprueban el
+    token antes de empezar cada etapa. Puede llamarse desde cualquier hilo.
+    """
+    
+    def __init__(self):
+        self._evento = threading.Event()
+        self._lock = threading.Lock()
+        self._tareas = set()
+    
+    @property
+    def cancelado(self):
+        return self._evento.is_set()
+    
+    def cancelar(self):
+        """Cancelar la ejecución y abortar las corrutinas vinculadas."""
+        self._evento.set()
+        with self._lock:
+            tareas = list(self._tareas)
+        for loop, tarea in tareas:
+            loop.call_soon_threadsafe(tarea.cancel)
+    
+    def comprobar(self):
+        """Lanzar EjecucionCancelada si el token se canceló."""
+        if self.cancelado:
+            raise EjecucionCancelada("La ejecución fue cancelada")
+    
+    def esperar(self, future, timeout=None, descripcion="La tarea"):
+        """Esperar el resultado de un concurrent.futures.Future respetando cancelación y plazo.
+        
+        El hilo que ejecuta el future no puede interrumpirse: si se cancela o vence el
+        plazo, se deja de esperar y su resultado se descarta.
+        """
+        limite = time.monotonic() + timeout if timeout else None
+        while True:
+            self.comprobar()
+            espera = INTERVALO_COMPROBACION
+            if limite is not None:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    raise PlazoExcedido(f"{descripcion} superó su plazo de {timeout:g} s")
+                espera = min(espera, restante)
+            try:
+                return future.result(timeout=espera)
+            except FutureTimeoutError:
+                continue
+            except Exception:
+                # El hilo pudo abandonar la llamada porque se canceló: se informa de eso
+                self.comprobar()
+                raise
+    
+    async def ejecutar(self, corrutina, timeout=None, descripcion="La tarea"):
+        """Ejecutar una corrutina que se aborta al cancelar el token o al vencer el plazo.
+        
+        Args:
+            corrutina: Corrutina a ejecutar
+            timeout (float, opcional): Plazo en segundos (None o 0 sin plazo)
+            descripcion (str): Qué se ejecuta, para los mensajes de error
+        """
+        if self.cancelado:
+            corrutina.close()
+            self.comprobar()
+        loop = asyncio.get_running_loop()
+        entrada = (loop, asyncio.ensure_future(corrutina))
+        with self._lock:
+            self._tareas.add(entrada)
+        try:
+            return await asyncio.wait_for(entrada[1], timeout or None)
+        except asyncio.TimeoutError:
+            raise PlazoExcedido(f"{descripcion} superó su plazo de {timeout:g} s") from None
+        except asyncio.CancelledError:
+            if self.cancelado:
+                raise EjecucionCancelada("La ejecución fue cancelada") from None
+            raise
+        finally:
+            with self._lock:
+                self._tareas.discard(entrada)
\ No newline at end of file
@@ -0,0 +1,183 @@
+# workflow/context.py
+import re
+
+# Aproximación de caracteres por token para texto en español
+CARACTERES_POR_TOKEN = 4
+
+# Presupuesto de tokens por defecto para el contexto de una tarea
+PRESUPUESTO_CONTEXTO_DEFECTO = 3000
+
+# Tokens de su propia respuesta que recibe una tarea incremental para continuarla
+PRESUPUESTO_CONTINUACION_DEFECTO = 400
+
+
+def contar_tokens(texto):
+    """Estimar el número de tokens de un texto."""
+    if not texto:
+        return 0
+    return max(1, len(texto) // CARACTERES_POR_TOKEN)
+
+
+def truncar_a_tokens(texto, max_tokens):
+    """Recortar un texto a un máximo de tokens respetando párrafos cuando es posible.
+
+    Args:
+        texto (str): Texto original
+        max_tokens (int): Máximo de tokens permitidos
+
+    Returns:
+        str: Texto recortado (o el original si ya cabe)
+    """
+    if contar_tokens(texto) <= max_tokens:
+        return texto
+    
+    max_caracteres = max_tokens * CARACTERES_POR_TOKEN
+    recorte = texto[:max_caracteres]
+    
+    # Cortar en el último final de párrafo o de frase para no dejar ideas a medias
+    corte = recorte.rfind("\n\n")
+    if corte < max_caracteres // 2:
+        corte = max(recorte.rfind(". "), recorte.rfind("\n"))
+    if corte >= max_caracteres // 2:
+        recorte = recorte[:corte + 1]
+    
+    return recorte.rstrip() + "\n[...]"
+
+
+def ultimos_tokens(texto, max_tokens):
+    """Conservar el final de un texto dentro de un máximo de tokens, empezando en un párrafo o frase.
+
+    Args:
+        texto (str): Texto original
+        max_tokens (int): Máximo de tokens permitidos
+
+    Returns:
+        str: Final del texto (o el original si ya cabe)
+    """
+    if contar_tokens(texto) <= max_tokens:
+        return texto
+    
+    max_caracteres = max_tokens * CARACTERES_POR_TOKEN
+    recorte = texto[-max_caracteres:]
+    
+    # Empezar en el primer comienzo de párrafo o de frase para no arrancar a media idea
+    inicio = recorte.find("\n\n")
+    if inicio < 0 or inicio > max_caracteres // 2:
+        inicio = recorte.find(". ")
+    if 0 <= inicio <= max_caracteres // 2:
+        recorte = recorte[inicio + 1:]
+    
+    return "[...]\n" + recorte.lstrip()
+
+
+class EnsambladorContexto:
+    """Construye la descripción y el contexto de cada tarea dentro de un presupuesto de tokens."""
+    
+    def __init__(self, estrategia="truncar", presupuesto_defecto=PRESUPUESTO_CONTEXTO_DEFECTO,
+                 presupuesto_continuacion=PRESUPUESTO_CONTINUACION_DEFECTO):
+        """Inicializar el ensamblador.
+
+        Args:
+            estrategia (str): "truncar" recorta las salidas demasiado largas;
+                "resumir" pide al LLM del agente un resumen que quepa en el presupuesto
+            presupuesto_defecto (int): Tokens de contexto para tareas sin presupuesto propio
+            presupuesto_continuacion (int): Tokens de su respuesta previa que recibe
+                cada llamada de una tarea incremental
+        """
+        if estrategia not in ("truncar", "resumir"):
+            raise ValueError(f"Estrategia de contexto desconocida: {estrategia}")
+        self.estrategia = estrategia
+        self.presupuesto_defecto = presupuesto_defecto
+        self.presupuesto_continuacion = presupuesto_continuacion
+    
+    def _entradas(self, task, resultados):
+        """Seleccionar los resultados previos que consume la tarea."""
+        if task.dependencias is None:
+            claves = list(resultados.keys())
+        else:
+            claves = []
+            for dependencia in task.dependencias:
+                claves.append(dependencia)
+                # La información adicional aportada por una tarea viaja con ella
+                adicional = f"info_adicional_{dependencia.split('_')[-1]}"
+                if adicional in resultados:
+                    claves.append(adicional)
+        return [(clave, resultados[clave]) for clave in claves if clave in resultados]
+    
+    def _presupuesto(self, task, entradas):
+        """Repartir el presupuesto de la tarea entre sus entradas."""
+        presupuesto = task.max_tokens_contexto or self.presupuesto_defecto
+        return max(1, presupuesto // max(1, len(entradas)))
+    
+    def continuacion(self, previo):
+        """Final de la respuesta previa de una tarea incremental que se le reenvía para continuarla.
+        
+        Basta con el final para enlazar la continuación; reenviar la respuesta completa
+        haría crecer cada llamada con el número de segmentos.
+        """
+        return ultimos_tokens(previo, self.presupuesto_continuacion)
+    
+    @staticmethod
+    def _prompt_resumen(texto, max_tokens):
+        return f"""
+        Resume el siguiente texto en un máximo de {max_tokens * 3 // 4} palabras.
+        Conserva los datos, cifras y puntos clave; no añadas información nueva.
+        Responde solo con el resumen.
+
+        {texto}
+        """
+    
+    def _componer(self, task, entradas):
+        """Sustituir placeholders y construir el bloque de contexto sin duplicar salidas."""
+        descripcion = task.description
+        contexto = ""
+        
+        for clave, valor in entradas:
+            placeholder = f"{{{clave}}}"
+            if placeholder in descripcion:
+                descripcion = descripcion.replace(placeholder, valor)
+            else:
+                contexto += f"\n\n{clave.upper()}:\n{valor}"
+        
+        # Los placeholders de tareas no consumidas no deben llegar al LLM
+        descripcion = re.sub(r"\{(task_\d+|info_adicional_\d+)\}", "", descripcion)
+        
+        return descripcion, contexto
+    
+    def ensamblar(self, task, resultados):
+        """Construir descripción y contexto de una tarea.
+
+        Args:
+            task (Task): Tarea a preparar
+            resultados (dict): Resultados previos por clave (task_N, info_adicional_N)
+
+        Returns:
+            tuple: (descripción con placeholders sustituidos, contexto adicional)
+        """
+        entradas = self._entradas(task, resultados)
+        max_tokens = self._presupuesto(task, entradas)
+        
+        ajustadas = []
+        for clave, valor in entradas:
+            if contar_tokens(valor) > max_tokens:
+                if self.estrategia == "resumir":
+                    valor = task.agent.llm.generate(self._prompt_resumen(valor, max_tokens), use_cache=True)
+                valor = truncar_a_tokens(valor, max_tokens)
+            ajustadas.append((clave, valor))
+        
+        return self._componer(task, ajustadas)
+    
+    async def aensamblar(self, task, resultados):
+        """Versión asíncrona de ensamblar."""
+        entradas = self._entradas(task, resultados)
+        max_tokens = self._presupuesto(task, entradas)
+        
+        ajustadas = []
+        for clave, valor in entradas:
+            if contar_tokens(valor) > max_tokens:
+                if self.estrategia == "resumir":
+                    valor = await task.agent.llm.agenerate(self._prompt_resumen(valor, max_tokens), use_cache=True)
+                valor = truncar_a_tokens(valor, max_tokens)
+            ajustadas.append((clave, valor))
+        
+        return self._componer(task, ajustadas)
@@ -0,0 +1,133 @@
+# workflow/feedback.py
+import re
+import threading
+
+from config.settings import FEEDBACK_LLM_BUDGET, FEEDBACK_MIN_TOKENS, FEEDBACK_SUFFICIENT_TOKENS
+from workflow.context import contar_tokens
+
+# Marcadores inequívocos de datos sin completar que el agente dejó en su resultado
+# (no "XX" ni "TODO" sueltos: aparecen en texto normal, como "siglo XX" o "TODO el país")
+PATRON_MARCADORES = re.compile(
+    r"\{(?:task|info_adicional)_\d+\}"
+    r"|\[(?i:insertar|incluir|añadir|dato|cifra|fuente|completar|pendiente)[^\]]*\]"
+    r"|\[X+\]|\bX{3,}\b|\bTODO:|(?i:lorem ipsum)"
+)
+
+# Encabezados o elementos de lista en markdown
+PATRON_ESTRUCTURA = re.compile(r"^\s*(?:#{1,6}\s|[-*•]\s|\d+[.)]\s)", re.MULTILINE)
+
+
+class PoliticaRetroalimentacion:
+    """Decide si un resultado necesita información adicional antes de gastar una llamada al LLM.
+    
+    Las heurísticas locales (longitud, estructura y marcadores sin completar) resuelven
+    los casos claros; solo los dudosos se consultan al agente, y como mucho
+    presupuesto_llm veces por ejecución. Cada decisión queda registrada en self.decisiones.
+    """
+    
+    def __init__(self, presupuesto_llm=FEEDBACK_LLM_BUDGET, min_tokens=FEEDBACK_MIN_TOKENS,
+                 tokens_suficientes=FEEDBACK_SUFFICIENT_TOKENS):
+        """Inicializar la política.
+        
+        Args:
+            presupuesto_llm (int): Verificaciones con el LLM permitidas por ejecución
+            min_tokens (int): Por debajo de esta longitud el resultado se considera incompleto
+            tokens_suficientes (int): A partir de esta longitud, un resultado estructurado
+                y sin marcadores se acepta sin consultar al LLM
+        """
+        self.presupuesto_llm = presupuesto_llm
+        self.min_tokens = min_tokens
+        self.tokens_suficientes = tokens_suficientes
+        self.llamadas_llm = 0
+        self.decisiones = []
+        self._lock = threading.Lock()
+    
+    def iniciar(self):
+        """Reiniciar el presupuesto y el registro al comenzar una ejecución."""
+        with self._lock:
+            self.llamadas_llm = 0
+            self.decisiones = []
+    
+    def evaluar_localmente(self, resultado):
+        """Aplicar las heurísticas locales.
+        
+        Returns:
+            tuple: (veredicto, petición, motivo); veredicto es "suficiente",
+                "insuficiente" o None cuando las heurísticas no bastan para decidir
+        """
+        tokens = contar_tokens(resultado)
+        if tokens < self.min_tokens:
+            peticion = "El resultado es demasiado breve; aporta más datos y detalles concretos sobre el tema."
+            return "insuficiente", peticion, f"demasiado breve (~{tokens} tokens)"
+        
+        parrafos = len([p for p in re.split(r"\n\s*\n", resultado) if p.strip()])
+        estructurado = parrafos >= 3 or bool(PATRON_ESTRUCTURA.search(resultado))
+        # Un marcador sin completar no basta para reejecutar: lo decide el agente
+        marcadores = sorted(set(PATRON_MARCADORES.findall(resultado)))
+        if marcadores:
+            return None, None, f"dudoso: marcadores sin completar ({', '.join(marcadores[:5])})"
+        
+        if tokens >= self.tokens_suficientes and estructurado:
+            return "suficiente", None, f"extenso y estructurado (~{tokens} tokens)"
+        
+        return None, None, "dudoso"
+    
+    def _reservar_llamada(self):
+        """Consumir una verificación del presupuesto; False si ya está agotado."""
+        with self._lock:
+            if self.llamadas_llm >= self.presupuesto_llm:
+                return False
+            self.llamadas_llm += 1
+            return True
+    
+    def _registrar(self, task_key, agente, origen, peticion, motivo):
+        """Registrar una decisión y devolver la petición (None si el resultado basta)."""
+        with self._lock:
+            self.decisiones.append({
+                "tarea": task_key,
+                "agente": agente.name,
+                "origen": origen,
+                "necesita_info": peticion is not None,
+                "motivo": motivo
+            })
+        veredicto = "pide más información" if peticion else "suficiente"
+        print(f"🧭 {task_key} ({agente.name}): {veredicto} [{origen}: {motivo}]")
+        return peticion
+    
+    def evaluar(self, agente, resultado, task_key=None):
+        """Devolver la petición de información adicional para resultado, o None si basta.
+        
+        Args:
+            agente (Agent): Agente que produjo el resultado
+            resultado (str): Resultado a evaluar
+            task_key (str, opcional): Clave de la tarea, para el registro
+        """
+        veredicto, peticion, motivo = self.evaluar_localmente(resultado)
+        if veredicto is not None:
+            return self._registrar(task_key, agente, "heuristica", peticion, motivo)
+        if not self._reservar_llamada():
+            return self._registrar(task_key, agente, "presupuesto", None, "verificaciones agotadas")
+        return self._registrar(task_key, agente, "llm", agente.necesita_mas_informacion(resultado), motivo)
+    
+    async def aevaluar(self, agente, resultado, task_key=None):
+        """Versión asíncrona de evaluar."""
+        veredicto, peticion, motivo = self.evaluar_localmente(resultado)
+        if veredicto is not None:
+            return self._registrar(task_key, agente, "heuristica", peticion, motivo)
+        if not self._reservar_llamada():
+            return self._registrar(task_key, agente, "presupuesto", None, "verificaciones agotadas")
+        return self._registrar(task_key, agente, "llm", await agente.anecesita_mas_informacion(resultado), motivo)
+    
+    def estadisticas(self):
+        """Resumen de las decisiones de la ejecución y de las llamadas al LLM ahorradas."""
+        with self._lock:
+            por_origen = {}
+            for decision in self.decisiones:
+                por_origen[decision["origen"]] = por_origen.get(decision["origen"], 0) + 1
+            return {
+                "decisiones": len(self.decisiones),
+                "por_origen": por_origen,
+                "llamadas_llm": self.llamadas_llm,
+                "llamadas_ahorradas": len(self.decisiones) - self.llamadas_llm,
+                "reejecuciones": sum(1 for decision in self.decisiones if decision["necesita_info"])
+            }
\ No newline at end of file
@@ -0,0 +1,80 @@
+# workflow/journal.py
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+from config.settings import WORKFLOW_JOURNAL_DIR
+
+
+class DiarioEjecucion:
+    """Diario persistente de una ejecución del flujo, identificado por su run_id.
+    
+    Cada resultado se añade como una línea JSON y se fuerza a disco antes de seguir,
+    así que tras un fallo o un reinicio del bot una nueva ejecución con el mismo
+    identificador solo repite las tareas que no llegaron a terminar.
+    """
+    
+    def __init__(self, run_id, directorio=WORKFLOW_JOURNAL_DIR):
+        """Abrir (o crear) el diario de una ejecución.
+        
+        Args:
+            run_id (str): Identificador de la ejecución
+            directorio (str): Carpeta donde se guardan los diarios
+        """
+        self.run_id = str(run_id)
+        nombre = re.sub(r"[^\w.-]", "_", self.run_id)
+        self.ruta = os.path.join(directorio, f"{nombre}.jsonl")
+        self._entradas = {}
+        self._lock = threading.Lock()
+        os.makedirs(directorio, exist_ok=True)
+        self._cargar()
+    
+    @staticmethod
+    def huella(texto):
+        """Huella corta de un texto para detectar si una tarea cambió entre ejecuciones."""
+        return hashlib.sha256(texto.encode("utf-8")).hexdigest()[:16]
+    
+    def _cargar(self):
+        """Leer las entradas registradas por ejecuciones anteriores."""
+        if not os.path.exists(self.ruta):
+            return
+        with open(self.ruta, encoding="utf-8") as f:
+            for linea in f:
+                try:
+                    entrada = json.loads(linea)
+                except json.JSONDecodeError:
+                    # Línea a medio escribir por una caída: se descarta y la tarea se repite
+                    continue
+                self._entradas[entrada["clave"]] = entrada
+    
+    def obtener(self, clave, huella=None):
+        """Devolver el valor registrado para clave, o None si no existe o su huella no coincide."""
+        entrada = self._entradas.get(clave)
+        if entrada is None or (huella is not None and entrada.get("huella") != huella):
+            return None
+        return entrada["valor"]
+    
+    def registrar(self, clave, valor, huella=None):
+        """Añadir un resultado al diario y asegurarlo en disco."""
+        entrada = {"clave": clave, "valor": valor, "huella": huella, "ts": time.time()}
+        linea = json.dumps(entrada, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self.ruta, "a", encoding="utf-8") as f:
+                f.write(linea)
+                f.flush()
+                os.fsync(f.fileno())
+            self._entradas[clave] = entrada
+    
+    def completadas(self):
+        """Claves con un resultado registrado."""
+        return set(self._entradas)
+    
+    def descartar(self):
+        """Borrar el diario cuando la ejecución terminó y ya no hace falta reanudarla."""
+        with self._lock:
+            self._entradas.clear()
+            if os.path.exists(self.ruta):
+                os.remove(self.ruta)
\ No newline at end of file
@@ -0,0 +1,82 @@
+# workflow/streaming.py
+import asyncio
+
+from config.settings import WORKFLOW_SEGMENT_MIN_TOKENS
+from workflow.context import contar_tokens
+
+
+class SalidaIncremental:
+    """Salida de una etapa en modo pipeline: segmentos publicados a medida que se completan.
+    
+    Varias etapas pueden consumirla a la vez; cada una recorre todos los segmentos
+    desde el principio.
+    """
+    
+    def __init__(self):
+        self.segmentos = []
+        self.resultado = None
+        self.terminada = False
+        self._condicion = asyncio.Condition()
+    
+    async def publicar(self, segmento):
+        """Añadir un segmento completo y despertar a los consumidores."""
+        async with self._condicion:
+            self.segmentos.append(segmento)
+            self._condicion.notify_all()
+    
+    async def cerrar(self, resultado):
+        """Marcar la etapa como terminada con su resultado completo."""
+        async with self._condicion:
+            self.resultado = resultado
+            self.terminada = True
+            self._condicion.notify_all()
+    
+    async def iterar(self):
+        """Recorrer los segmentos según llegan hasta que la etapa termine.
+        
+        Cada iteración entrega juntos todos los segmentos publicados desde la anterior,
+        de modo que un consumidor más lento que el productor hace menos llamadas, más grandes.
+        """
+        indice = 0
+        while True:
+            async with self._condicion:
+                await self._condicion.wait_for(lambda: len(self.segmentos) > indice or self.terminada)
+                nuevos = self.segmentos[indice:]
+                terminada = self.terminada
+            indice += len(nuevos)
+            if nuevos:
+                yield nuevos
+            if terminada and indice >= len(self.segmentos):
+                return
+    
+    async def completo(self):
+        """Esperar al resultado completo de la etapa."""
+        async with self._condicion:
+            await self._condicion.wait_for(lambda: self.terminada)
+            return self.resultado
+
+
+class Segmentador:
+    """Corta en párrafos completos el texto acumulado de una respuesta en streaming.
+    
+    Se usa como on_chunk: cada vez que el texto pendiente contiene párrafos terminados
+    que suman al menos min_tokens, los publica como un segmento en la salida.
+    """
+    
+    def __init__(self, salida, min_tokens=WORKFLOW_SEGMENT_MIN_TOKENS):
+        self.salida = salida
+        self.min_tokens = min_tokens
+        self.emitido = 0
+    
+    async def __call__(self, texto):
+        corte = texto.rfind("\n\n", self.emitido)
+        if corte > self.emitido and contar_tokens(texto[self.emitido:corte]) >= self.min_tokens:
+            await self.salida.publicar(texto[self.emitido:corte].strip())
+            self.emitido = corte + 2
+    
+    async def terminar(self, texto):
+        """Publicar lo que quede pendiente al terminar la respuesta."""
+        resto = texto[self.emitido:].strip()
+        if resto:
+            await self.salida.publicar(resto)
+        self.emitido = len(texto)
\ No newline at end of file
@@ -1,37 +1,71 @@
 import re
 
 class Task:
-    def __init__(self, description, agent):
+    def __init__(self, description, agent, on_chunk=None, dependencias=None, max_tokens_contexto=None,
+                 timeout=None, incremental=False):
         """Initialize a task with description and assigned agent.
         
         Args:
             description (str): Task description
             agent: Agent to perform the task
+            on_chunk (callable, optional): Receives the partial output while
+                the task streams (a coroutine function for aexecute)
+            dependencias (list, optional): Keys of upstream results this task
+                consumes (e.g. ["task_2"]); None consumes every previous result
+            max_tokens_contexto (int, optional): Token budget for upstream results
+            timeout (float, optional): Seconds the task may run inside a workflow;
+                defaults to the workflow's timeout_tarea
+            incremental (bool): In pipelined mode, process the upstream output
+                section by section as it streams instead of waiting for all of it
         """
         self.description = description
         self.agent = agent
+        self.on_chunk = on_chunk
+        self.dependencias = dependencias
+        self.max_tokens_contexto = max_tokens_contexto
+        self.timeout = timeout
+        self.incremental = incremental
         self.output = None
-
-    def execute(self, context=None):
+    
+    def execute(self, context=None, description=None, on_chunk=None):
         """Execute the task and store the result.
         
         Args:
             context (str, optional): Additional context
+            description (str, optional): Description with placeholders already
+                filled in; defaults to the raw description
+            on_chunk (callable, optional): Overrides the task's on_chunk for this call
             
         Returns:
             str: Task execution result
         """
-        self.output = self.agent.execute_task(self.description, context)
+        description = description or self.description
+        self.output = self.agent.execute_task(description, context, on_chunk=on_chunk or self.on_chunk)
         return self.output
+    
+    async def aexecute(self, context=None, description=None, on_chunk=None):
+        """Asynchronous counterpart of execute.
 
-    def decide_next_task(self, available_tasks, context):
-        """Decide which task should be executed next based on current context."""
+        Args:
+            context (str, optional): Additional context
+            description (str, optional): Description with placeholders already filled in
+            on_chunk (callable, optional): Overrides the task's on_chunk for this call
+
+        Returns:
+            str: Task execution result
+        """
+        description = description or self.description
+        self.output = await self.agent.aexecute_task(description, context, on_chunk=on_chunk or self.on_chunk)
+        return self.output
+    
+    def _build_decision_prompt(self, available_tasks, context):
+        """Build the prompt used to pick the next task."""
         task_options = "\n".join([
             f"{i + 1}. {task.description[:100]}..."
             for i, task in enumerate(available_tasks)
         ])
-
-        decision_prompt = f"""
+        
+        return f"""
         Based on your current results:
         {context}
         
@@ -40,8 +74,10 @@ class Task:
         
         Which task should be executed next? Respond with just the task number.
         """
-
-        response = self.agent.llm.generate(decision_prompt)
+    
+    @staticmethod
+    def _parse_task_number(response, available_tasks):
+        """Parse the task index chosen by the LLM."""
         try:
             # Extract the task number from the response
             task_num = int(re.search(r'\d+', response).group()) - 1
@@ -49,3 +85,15 @@ class Task:
         except:
             # Default to the first task if parsing fails
             return 0
+    
+    def decide_next_task(self, available_tasks, context):
+        """Decide which task should be executed next based on current context."""
+        decision_prompt = self._build_decision_prompt(available_tasks, context)
+        response = self.agent.llm.generate(decision_prompt, profile="classification", tag=self.agent.name)
+        return self._parse_task_number(response, available_tasks)
+    
+    async def adecide_next_task(self, available_tasks, context):
+        """Asynchronous counterpart of decide_next_task."""
+        decision_prompt = self._build_decision_prompt(available_tasks, context)
+        response = await self.agent.llm.agenerate(decision_prompt, profile="classification", tag=self.agent.name)
+        return self._parse_task_number(response, available_tasks)
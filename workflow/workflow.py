@@ -1,10 +1,54 @@
 # workflow/workflow.py
+import asyncio
+import contextvars
+import inspect
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from config.settings import WORKFLOW_TASK_TIMEOUT, WORKFLOW_RUN_TIMEOUT, WORKFLOW_SEGMENT_MIN_TOKENS
+from workflow.cancellation import TokenCancelacion, PlazoExcedido
+from workflow.context import EnsambladorContexto, contar_tokens, truncar_a_tokens
+from workflow.feedback import PoliticaRetroalimentacion
+from workflow.journal import DiarioEjecucion
+from workflow.streaming import SalidaIncremental, Segmentador
+from llm.resilience import abort_when
+from utils.tracing import trazar, span
+
+
 class MultiAgentWorkflow:
-    def __init__(self, agents=None, tasks=None):
-        """Inicializar un flujo de trabajo multiagente."""
+    def __init__(self, agents=None, tasks=None, ensamblador=None, diario=None, politica=None,
+                 token=None, timeout_tarea=WORKFLOW_TASK_TIMEOUT, timeout_ejecucion=WORKFLOW_RUN_TIMEOUT):
+        """Inicializar un flujo de trabajo multiagente.
+        
+        Args:
+            agents (list, opcional): Agentes participantes
+            tasks (list, opcional): Tareas a ejecutar en orden
+            ensamblador (EnsambladorContexto, opcional): Construye el contexto de
+                cada tarea dentro de su presupuesto de tokens
+            diario (DiarioEjecucion, opcional): Persiste cada resultado para que una
+                ejecución interrumpida se reanude sin repetir las tareas completadas
+            politica (PoliticaRetroalimentacion, opcional): Decide cuándo un resultado
+                necesita información adicional en los modos con retroalimentación
+            token (TokenCancelacion, opcional): Permite cancelar la ejecución desde fuera
+            timeout_tarea (float): Plazo en segundos de cada tarea sin timeout propio (0 sin plazo)
+            timeout_ejecucion (float): Plazo en segundos de la ejecución completa (0 sin plazo)
+        
+        Las ejecuciones lanzan EjecucionCancelada si se cancela el token y PlazoExcedido
+        si vence un plazo; ninguna etapa nueva empieza después.
+        """
         self.agents = agents or []
         self.tasks = tasks or []
         self.results = {}
+        self.ensamblador = ensamblador or EnsambladorContexto()
+        self.tokens_contexto = {}
+        self.duraciones = {}
+        self.diario = diario
+        self.politica = politica or PoliticaRetroalimentacion()
+        self.token = token or TokenCancelacion()
+        self.timeout_tarea = timeout_tarea
+        self.timeout_ejecucion = timeout_ejecucion
+        self._fin_ejecucion = None
     
     def add_agent(self, agent):
         """Añadir un agente al flujo de trabajo."""
@@ -14,80 +58,298 @@ class MultiAgentWorkflow:
         """Añadir una tarea al flujo de trabajo."""
         self.tasks.append(task)
     
+    def _registrar_tokens(self, task_key, task_description, task_context):
+        """Registrar los tokens de entrada estimados de una tarea."""
+        tokens = contar_tokens(task_description) + contar_tokens(task_context)
+        self.tokens_contexto[task_key] = tokens
+        print(f"📏 {task_key}: ~{tokens} tokens de entrada")
+    
+    def _huella_tarea(self, i, resultados):
+        """Huella de la tarea i: su definición y los resultados de las tareas de las que depende.
+        
+        Si cambia la tarea o cualquiera de sus entradas, su resultado guardado no se reutiliza.
+        Devuelve None si aún falta el resultado de alguna dependencia.
+        """
+        task = self.tasks[i]
+        partes = [task.agent.name, task.description]
+        dependencias = task.dependencias if task.dependencias is not None else [f"task_{j+1}" for j in range(i)]
+        for dependencia in dependencias:
+            if dependencia not in resultados:
+                return None
+            partes.append(f"{dependencia}={DiarioEjecucion.huella(resultados[dependencia])}")
+        return DiarioEjecucion.huella("\x00".join(partes))
+    
+    def _recuperar(self, i, context, clave_adicional=None):
+        """Restaurar del diario el resultado de la tarea i y la información adicional que pidió.
+        
+        La información adicional se guarda con la clave de la tarea que la proporcionó:
+        la anterior en los modos secuenciales, o la indicada en clave_adicional.
+        """
+        if self.diario is None:
+            return None
+        huella = self._huella_tarea(i, context)
+        if huella is None:
+            return None
+        result = self.diario.obtener(f"task_{i+1}", huella)
+        if result is None:
+            return None
+        clave_adicional = clave_adicional or f"info_adicional_{i}"
+        adicional = self.diario.obtener(clave_adicional, huella)
+        if adicional is not None:
+            context[clave_adicional] = adicional
+        print(f"⏭️ Tarea {i+1} recuperada del diario de ejecución {self.diario.run_id}")
+        return result
+    
+    def _guardar(self, clave, i, valor, resultados):
+        """Registrar en el diario un resultado producido por la tarea i a partir de resultados."""
+        if self.diario is not None:
+            huella = self._huella_tarea(i, resultados)
+            if huella is not None:
+                self.diario.registrar(clave, valor, huella)
+    
+    def _iniciar_plazo(self):
+        """Fijar el instante en que vence el plazo de la ejecución completa."""
+        self._fin_ejecucion = time.monotonic() + self.timeout_ejecucion if self.timeout_ejecucion else None
+    
+    def _plazo(self, task):
+        """Segundos disponibles para una tarea según su plazo y lo que le queda a la ejecución."""
+        plazos = [plazo for plazo in (task.timeout or self.timeout_tarea,) if plazo]
+        if self._fin_ejecucion is not None:
+            restante = self._fin_ejecucion - time.monotonic()
+            if restante <= 0:
+                raise PlazoExcedido(f"La ejecución superó su plazo de {self.timeout_ejecucion:g} s")
+            plazos.append(restante)
+        return min(plazos) if plazos else None
+    
+    def _registrar_duracion(self, task_key, inicio):
+        """Acumular el tiempo de ejecución de una tarea (incluidos sus reintentos)."""
+        self.duraciones[task_key] = self.duraciones.get(task_key, 0.0) + time.monotonic() - inicio
+    
+    def _ejecutar_acotado(self, task, task_key, funcion, *args, **kwargs):
+        """Ejecutar funcion por cuenta de una tarea respetando la cancelación y los plazos.
+        
+        Se usa para la tarea y para las llamadas al LLM de su retroalimentación. La
+        llamada corre en un hilo aparte para poder dejar de esperarla. Un hilo no puede
+        interrumpirse: si se cancela o vence el plazo, la petición al LLM en curso termina
+        en segundo plano, pero no se hacen reintentos ni peticiones nuevas y un streaming
+        deja de leerse en el siguiente fragmento.
+        """
+        self.token.comprobar()
+        plazo = self._plazo(task)
+        abandonada = threading.Event()
+        
+        def comprobar():
+            self.token.comprobar()
+            if abandonada.is_set():
+                raise PlazoExcedido(f"Se dejó de esperar la tarea {task_key}")
+        
+        def llamar():
+            with abort_when(comprobar):
+                return funcion(*args, **kwargs)
+        
+        executor = ThreadPoolExecutor(max_workers=1)
+        inicio = time.monotonic()
+        try:
+            future = executor.submit(contextvars.copy_context().run, llamar)
+            return self.token.esperar(future, plazo, f"La tarea {task_key}")
+        finally:
+            abandonada.set()
+            executor.shutdown(wait=False)
+            self._registrar_duracion(task_key, inicio)
+    
+    async def _aejecutar_acotado(self, task, task_key, funcion, *args, **kwargs):
+        """Versión asíncrona de _ejecutar_acotado; cancelar aborta la petición al LLM en curso."""
+        self.token.comprobar()
+        plazo = self._plazo(task)
+        inicio = time.monotonic()
+        try:
+            return await self.token.ejecutar(funcion(*args, **kwargs), plazo, f"La tarea {task_key}")
+        finally:
+            self._registrar_duracion(task_key, inicio)
+    
+    def _ejecutar_tarea(self, task, task_key, *args, **kwargs):
+        """Ejecutar una tarea respetando la cancelación y los plazos."""
+        with span("tarea", task.agent.name, tarea=task_key):
+            return self._ejecutar_acotado(task, task_key, task.execute, *args, **kwargs)
+    
+    async def _aejecutar_tarea(self, task, task_key, *args, **kwargs):
+        """Versión asíncrona de _ejecutar_tarea."""
+        with span("tarea", task.agent.name, tarea=task_key):
+            return await self._aejecutar_acotado(task, task_key, task.aexecute, *args, **kwargs)
+    
+    @trazar("ejecucion")
     def run(self):
         """Ejecutar todas las tareas en secuencia."""
         context = {}
         
         print("🚀 Iniciando flujo de trabajo multiagente...")
+        self._iniciar_plazo()
         
         for i, task in enumerate(self.tasks):
             print(f"\nTarea {i+1}/{len(self.tasks)}: {task.description[:50]}...")
+            task_key = f"task_{i+1}"
             
-            # Reemplazar placeholders de tareas anteriores
-            task_description = task.description
-            task_context = ""
-            
-            for key, value in context.items():
-                placeholder = f"{{{key}}}"
-                if placeholder in task_description:
-                    task_description = task_description.replace(placeholder, value)
-                task_context += f"\n\n{key.upper()}:\n{value}"
-            
-            # Ejecutar la tarea
-            result = task.execute(task_context)
+            result = self._recuperar(i, context)
+            if result is None:
+                task_description, task_context = self.ensamblador.ensamblar(task, context)
+                self._registrar_tokens(task_key, task_description, task_context)
+                
+                # Ejecutar la tarea
+                result = self._ejecutar_tarea(task, task_key, task_context, description=task_description)
+                self._guardar(task_key, i, result, context)
+            context[task_key] = result
+            self.results[task_key] = result
+        
+        print("\n✨ Flujo de trabajo completado.")
+        return self.results
+    
+    @trazar("ejecucion")
+    async def arun(self):
+        """Ejecutar todas las tareas en secuencia sin bloquear el event loop."""
+        context = {}
+        
+        print("🚀 Iniciando flujo de trabajo multiagente...")
+        self._iniciar_plazo()
+        
+        for i, task in enumerate(self.tasks):
+            print(f"\nTarea {i+1}/{len(self.tasks)}: {task.description[:50]}...")
             task_key = f"task_{i+1}"
+            
+            result = self._recuperar(i, context)
+            if result is None:
+                task_description, task_context = await self.ensamblador.aensamblar(task, context)
+                self._registrar_tokens(task_key, task_description, task_context)
+                
+                # Ejecutar la tarea
+                result = await self._aejecutar_tarea(task, task_key, task_context, description=task_description)
+                self._guardar(task_key, i, result, context)
             context[task_key] = result
             self.results[task_key] = result
         
         print("\n✨ Flujo de trabajo completado.")
         return self.results
     
+    @trazar("ejecucion")
     def ejecutar_con_retroalimentacion(self):
         """Ejecutar tareas con bucles de retroalimentación entre agentes."""
         context = {}
         
         print("🚀 Iniciando flujo de trabajo multiagente con retroalimentación...")
+        self._iniciar_plazo()
+        self.politica.iniciar()
         
         i = 0
         while i < len(self.tasks):
             task = self.tasks[i]
             print(f"\nTarea {i+1}/{len(self.tasks)}: {task.description[:50]}...")
+            task_key = f"task_{i+1}"
             
-            # Reemplazar placeholders de tareas anteriores
-            task_description = task.description
-            task_context = ""
+            # Las tareas que ya terminaron en una ejecución anterior no se repiten
+            result = self._recuperar(i, context)
+            if result is not None:
+                context[task_key] = result
+                self.results[task_key] = result
+                i += 1
+                continue
             
-            for key, value in context.items():
-                placeholder = f"{{{key}}}"
-                if placeholder in task_description:
-                    task_description = task_description.replace(placeholder, value)
-                task_context += f"\n\n{key.upper()}:\n{value}"
+            task_description, task_context = self.ensamblador.ensamblar(task, context)
+            self._registrar_tokens(task_key, task_description, task_context)
             
             # Ejecutar la tarea
-            result = task.execute(task_context)
+            result = self._ejecutar_tarea(task, task_key, task_context, description=task_description)
             
-            # Verificar si el agente necesita más información
-            needs_more_info = task.agent.necesita_mas_informacion(result)
+            # Verificar si el agente necesita más información (la primera tarea no tiene a quién pedirla)
+            needs_more_info = self._ejecutar_acotado(task, task_key, self.politica.evaluar, task.agent, result, task_key) if i > 0 else None
             
-            if needs_more_info and i > 0:
+            if needs_more_info:
                 # Obtener información adicional del agente anterior
                 print(f"⚠️ {task.agent.name} solicita información adicional...")
                 previous_agent = self.tasks[i-1].agent
-                additional_info = previous_agent.solicitar_informacion_adicional(
-                    needs_more_info, 
-                    context[f"task_{i}"]
+                additional_info = self._ejecutar_acotado(
+                    task, task_key, previous_agent.solicitar_informacion_adicional,
+                    needs_more_info,
+                    truncar_a_tokens(context[f"task_{i}"], self.ensamblador.presupuesto_defecto)
                 )
                 
                 # Actualizar contexto con información adicional
                 context[f"info_adicional_{i}"] = additional_info
+                self._guardar(f"info_adicional_{i}", i, additional_info, context)
                 print(f"✅ {previous_agent.name} ha proporcionado información adicional.")
                 
                 # Volver a ejecutar la tarea actual con información adicional
                 print(f"🔄 {task.agent.name} reintenta la tarea con nueva información...")
-                result = task.execute(task_context + f"\n\nINFORMACIÓN ADICIONAL:\n{additional_info}")
+                result = self._ejecutar_tarea(
+                    task, task_key,
+                    task_context + f"\n\nINFORMACIÓN ADICIONAL:\n{additional_info}",
+                    description=task_description
+                )
             
             # Si no se necesita información adicional, continuar normalmente
+            self._guardar(task_key, i, result, context)
+            context[task_key] = result
+            self.results[task_key] = result
+            i += 1
+        
+        print("\n✨ Flujo de trabajo con retroalimentación completado.")
+        return self.results
+    
+    @trazar("ejecucion")
+    async def aejecutar_con_retroalimentacion(self):
+        """Versión asíncrona de ejecutar_con_retroalimentacion."""
+        context = {}
+        
+        print("🚀 Iniciando flujo de trabajo multiagente con retroalimentación...")
+        self._iniciar_plazo()
+        self.politica.iniciar()
+        
+        i = 0
+        while i < len(self.tasks):
+            task = self.tasks[i]
+            print(f"\nTarea {i+1}/{len(self.tasks)}: {task.description[:50]}...")
             task_key = f"task_{i+1}"
+            
+            # Las tareas que ya terminaron en una ejecución anterior no se repiten
+            result = self._recuperar(i, context)
+            if result is not None:
+                context[task_key] = result
+                self.results[task_key] = result
+                i += 1
+                continue
+            
+            task_description, task_context = await self.ensamblador.aensamblar(task, context)
+            self._registrar_tokens(task_key, task_description, task_context)
+            
+            # Ejecutar la tarea
+            result = await self._aejecutar_tarea(task, task_key, task_context, description=task_description)
+            
+            # Verificar si el agente necesita más información (la primera tarea no tiene a quién pedirla)
+            needs_more_info = await self._aejecutar_acotado(task, task_key, self.politica.aevaluar, task.agent, result, task_key) if i > 0 else None
+            
+            if needs_more_info:
+                # Obtener información adicional del agente anterior
+                print(f"⚠️ {task.agent.name} solicita información adicional...")
+                previous_agent = self.tasks[i-1].agent
+                additional_info = await self._aejecutar_acotado(
+                    task, task_key, previous_agent.asolicitar_informacion_adicional,
+                    needs_more_info,
+                    truncar_a_tokens(context[f"task_{i}"], self.ensamblador.presupuesto_defecto)
+                )
+                
+                # Actualizar contexto con información adicional
+                context[f"info_adicional_{i}"] = additional_info
+                self._guardar(f"info_adicional_{i}", i, additional_info, context)
+                print(f"✅ {previous_agent.name} ha proporcionado información adicional.")
+                
+                # Volver a ejecutar la tarea actual con información adicional
+                print(f"🔄 {task.agent.name} reintenta la tarea con nueva información...")
+                result = await self._aejecutar_tarea(
+                    task, task_key,
+                    task_context + f"\n\nINFORMACIÓN ADICIONAL:\n{additional_info}",
+                    description=task_description
+                )
+            
+            # Si no se necesita información adicional, continuar normalmente
+            self._guardar(task_key, i, result, context)
             context[task_key] = result
             self.results[task_key] = result
             i += 1
@@ -95,11 +357,354 @@ class MultiAgentWorkflow:
         print("\n✨ Flujo de trabajo con retroalimentación completado.")
         return self.results
     
-    def ejecutar_tarea_personalizada(self, task_index, *args, **kwargs):
-        """Ejecuta una tarea personalizada específica con argumentos adicionales."""
+    def _grafo_dependencias(self):
+        """Resolver las dependencias de cada tarea y validar que formen un DAG.
+        
+        Las tareas sin dependencias declaradas (None) dependen de todas las anteriores,
+        lo que reproduce el orden secuencial clásico.
+        
+        Returns:
+            list: Claves de las tareas de las que depende cada tarea
+        """
+        claves = [f"task_{i+1}" for i in range(len(self.tasks))]
+        grafo = []
+        for i, task in enumerate(self.tasks):
+            if task.dependencias is None:
+                dependencias = claves[:i]
+            else:
+                dependencias = list(task.dependencias)
+                for dependencia in dependencias:
+                    if dependencia not in claves:
+                        raise ValueError(f"La tarea {claves[i]} depende de {dependencia}, que no existe")
+            grafo.append(dependencias)
+        
+        # Detectar ciclos (algoritmo de Kahn)
+        pendientes = {claves[i]: set(deps) for i, deps in enumerate(grafo)}
+        resueltas = set()
+        while pendientes:
+            listas = [clave for clave, deps in pendientes.items() if deps <= resueltas]
+            if not listas:
+                raise ValueError(f"Dependencias circulares entre las tareas: {sorted(pendientes)}")
+            for clave in listas:
+                resueltas.add(clave)
+                del pendientes[clave]
+        return grafo
+    
+    @staticmethod
+    def _entradas_de(dependencias, resultados):
+        """Resultados (y su información adicional) visibles para una tarea."""
+        entradas = {}
+        for dependencia in dependencias:
+            entradas[dependencia] = resultados[dependencia]
+            adicional = f"info_adicional_{dependencia.split('_')[-1]}"
+            if adicional in resultados:
+                entradas[adicional] = resultados[adicional]
+        return entradas
+    
+    def _ordenar_resultados(self, resultados):
+        """Devolver los resultados en el orden de las tareas, sin depender del orden de llegada."""
+        for i in range(len(self.tasks)):
+            task_key = f"task_{i+1}"
+            self.results[task_key] = resultados[task_key]
+        return self.results
+    
+    @staticmethod
+    def _clave_adicional(dependencias):
+        """Clave de la información adicional que una tarea del DAG pide a su última dependencia."""
+        if not dependencias:
+            return None
+        return f"info_adicional_{dependencias[-1].split('_')[-1]}"
+    
+    def _completar_nodo(self, i, dependencias, resultados, result, adicional):
+        """Guardar en resultados y en el diario lo que produjo una tarea del DAG."""
+        if adicional is not None:
+            clave = self._clave_adicional(dependencias)
+            resultados[clave] = adicional
+            self._guardar(clave, i, adicional, resultados)
+        resultados[f"task_{i+1}"] = result
+        self._guardar(f"task_{i+1}", i, result, resultados)
+    
+    def _recuperar_dag(self, grafo, resultados, pendientes):
+        """Restaurar del diario las tareas cuyas dependencias ya están en resultados.
+        
+        Una tarea solo se recupera si sus entradas coinciden con las de la ejecución
+        anterior, así que se avanza por el grafo hasta que ninguna más se puede restaurar.
+        """
+        recuperada = True
+        while recuperada:
+            recuperada = False
+            for i in sorted(pendientes):
+                if not all(dep in resultados for dep in grafo[i]):
+                    continue
+                result = self._recuperar(i, resultados, self._clave_adicional(grafo[i]))
+                if result is not None:
+                    resultados[f"task_{i+1}"] = result
+                    pendientes.discard(i)
+                    recuperada = True
+    
+    def _ejecutar_nodo(self, i, dependencias, resultados, retroalimentacion):
+        """Ejecutar una tarea del DAG a partir de los resultados de sus dependencias.
+        
+        Returns:
+            tuple: Resultado de la tarea e información adicional que pidió (o None)
+        """
+        task = self.tasks[i]
+        task_key = f"task_{i+1}"
+        print(f"\nTarea {i+1}/{len(self.tasks)}: {task.description[:50]}...")
+        
+        additional_info = None
+        entradas = self._entradas_de(dependencias, resultados)
+        task_description, task_context = self.ensamblador.ensamblar(task, entradas)
+        self._registrar_tokens(task_key, task_description, task_context)
+        result = self._ejecutar_tarea(task, task_key, task_context, description=task_description)
+        
+        if retroalimentacion and dependencias:
+            needs_more_info = self._ejecutar_acotado(task, task_key, self.politica.evaluar, task.agent, result, task_key)
+            if needs_more_info:
+                # Pedir la información a la última tarea de la que depende
+                previous_key = dependencias[-1]
+                previous_agent = self.tasks[int(previous_key.split('_')[-1]) - 1].agent
+                print(f"⚠️ {task.agent.name} solicita información adicional a {previous_agent.name}...")
+                additional_info = self._ejecutar_acotado(
+                    task, task_key, previous_agent.solicitar_informacion_adicional,
+                    needs_more_info,
+                    truncar_a_tokens(resultados[previous_key], self.ensamblador.presupuesto_defecto)
+                )
+                print(f"🔄 {task.agent.name} reintenta la tarea con nueva información...")
+                result = self._ejecutar_tarea(
+                    task, task_key,
+                    task_context + f"\n\nINFORMACIÓN ADICIONAL:\n{additional_info}",
+                    description=task_description
+                )
+        
+        return result, additional_info
+    
+    async def _aejecutar_nodo(self, i, dependencias, resultados, retroalimentacion):
+        """Versión asíncrona de _ejecutar_nodo."""
+        task = self.tasks[i]
+        task_key = f"task_{i+1}"
+        print(f"\nTarea {i+1}/{len(self.tasks)}: {task.description[:50]}...")
+        
+        additional_info = None
+        entradas = self._entradas_de(dependencias, resultados)
+        task_description, task_context = await self.ensamblador.aensamblar(task, entradas)
+        self._registrar_tokens(task_key, task_description, task_context)
+        result = await self._aejecutar_tarea(task, task_key, task_context, description=task_description)
+        
+        if retroalimentacion and dependencias:
+            needs_more_info = await self._aejecutar_acotado(task, task_key, self.politica.aevaluar, task.agent, result, task_key)
+            if needs_more_info:
+                # Pedir la información a la última tarea de la que depende
+                previous_key = dependencias[-1]
+                previous_agent = self.tasks[int(previous_key.split('_')[-1]) - 1].agent
+                print(f"⚠️ {task.agent.name} solicita información adicional a {previous_agent.name}...")
+                additional_info = await self._aejecutar_acotado(
+                    task, task_key, previous_agent.asolicitar_informacion_adicional,
+                    needs_more_info,
+                    truncar_a_tokens(resultados[previous_key], self.ensamblador.presupuesto_defecto)
+                )
+                print(f"🔄 {task.agent.name} reintenta la tarea con nueva información...")
+                result = await self._aejecutar_tarea(
+                    task, task_key,
+                    task_context + f"\n\nINFORMACIÓN ADICIONAL:\n{additional_info}",
+                    description=task_description
+                )
+        
+        return result, additional_info
+    
+    @trazar("ejecucion")
+    def ejecutar_dag(self, retroalimentacion=False, max_paralelo=4):
+        """Ejecutar las tareas según sus dependencias, en paralelo cuando son independientes.
+        
+        Args:
+            retroalimentacion (bool): Verificar cada resultado y pedir información
+                adicional a la dependencia cuando haga falta
+            max_paralelo (int): Número máximo de tareas simultáneas
+            
+        Returns:
+            dict: Resultados por clave de tarea, en el orden de las tareas
+        """
+        grafo = self._grafo_dependencias()
+        resultados = {}
+        pendientes = set(range(len(self.tasks)))
+        en_curso = {}
+        
+        self._recuperar_dag(grafo, resultados, pendientes)
+        
+        print("🚀 Iniciando flujo de trabajo multiagente en paralelo...")
+        self._iniciar_plazo()
+        self.politica.iniciar()
+        
+        with ThreadPoolExecutor(max_workers=max_paralelo) as executor:
+            while pendientes or en_curso:
+                # Lanzar en orden de índice las tareas cuyas dependencias ya terminaron
+                for i in sorted(pendientes):
+                    if len(en_curso) >= max_paralelo:
+                        break
+                    if all(dep in resultados for dep in grafo[i]):
+                        pendientes.discard(i)
+                        future = executor.submit(contextvars.copy_context().run, self._ejecutar_nodo, i, grafo[i], dict(resultados), retroalimentacion)
+                        en_curso[future] = i
+                
+                terminadas, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+                for future in terminadas:
+                    i = en_curso.pop(future)
+                    self._completar_nodo(i, grafo[i], resultados, *future.result())
+        
+        print("\n✨ Flujo de trabajo en paralelo completado.")
+        return self._ordenar_resultados(resultados)
+    
+    @trazar("ejecucion")
+    async def aejecutar_dag(self, retroalimentacion=False, max_paralelo=4):
+        """Versión asíncrona de ejecutar_dag; las tareas independientes comparten el event loop."""
+        grafo = self._grafo_dependencias()
+        resultados = {}
+        pendientes = set(range(len(self.tasks)))
+        en_curso = {}
+        
+        self._recuperar_dag(grafo, resultados, pendientes)
+        
+        print("🚀 Iniciando flujo de trabajo multiagente en paralelo...")
+        self._iniciar_plazo()
+        self.politica.iniciar()
+        
+        try:
+            while pendientes or en_curso:
+                # Lanzar en orden de índice las tareas cuyas dependencias ya terminaron
+                for i in sorted(pendientes):
+                    if len(en_curso) >= max_paralelo:
+                        break
+                    if all(dep in resultados for dep in grafo[i]):
+                        pendientes.discard(i)
+                        tarea = asyncio.ensure_future(
+                            self._aejecutar_nodo(i, grafo[i], dict(resultados), retroalimentacion)
+                        )
+                        en_curso[tarea] = i
+                
+                terminadas, _ = await asyncio.wait(en_curso, return_when=asyncio.FIRST_COMPLETED)
+                for tarea in terminadas:
+                    i = en_curso.pop(tarea)
+                    self._completar_nodo(i, grafo[i], resultados, *tarea.result())
+        finally:
+            # Si una tarea falla, no dejar las demás ejecutándose en segundo plano
+            for tarea in en_curso:
+                tarea.cancel()
+        
+        print("\n✨ Flujo de trabajo en paralelo completado.")
+        return self._ordenar_resultados(resultados)
+    
+    async def _aejecutar_segmento(self, task, task_key, entradas, salida, min_tokens, previo=None):
+        """Ejecutar una tarea sobre unas entradas publicando su salida por segmentos.
+        
+        En una etapa incremental, previo es lo que la tarea ya respondió sobre las partes
+        anteriores ("" en la primera): su final (EnsambladorContexto.continuacion) va en el
+        prompt para que cada llamada continúe la misma respuesta en lugar de empezar otra.
+        """
+        task_description, task_context = await self.ensamblador.aensamblar(task, entradas)
+        if previo == "":
+            task_context += (
+                "\n\nLA INFORMACIÓN LLEGA POR PARTES: esta es la primera. Escribe solo el comienzo "
+                "de tu respuesta; recibirás el resto de la información para continuarla."
+            )
+        elif previo:
+            task_context += (
+                "\n\nTU RESPUESTA HASTA AHORA (sobre las partes anteriores de la información; "
+                f"si es larga, solo su final):\n{self.ensamblador.continuacion(previo)}"
+                "\n\nContinúa esa misma respuesta incorporando la nueva información. Escribe solo "
+                "la continuación: no repitas lo anterior, no vuelvas a saludar ni a introducir el tema."
+            )
+        self._registrar_tokens(task_key, task_description, task_context)
+        segmentador = Segmentador(salida, min_tokens)
+        
+        async def on_chunk(texto):
+            await segmentador(texto)
+            if task.on_chunk:
+                await task.on_chunk(f"{previo}\n\n{texto}" if previo else texto)
+        
+        result = await self._aejecutar_tarea(task, task_key, task_context, description=task_description, on_chunk=on_chunk)
+        await segmentador.terminar(result)
+        return result
+    
+    async def _aejecutar_etapa(self, i, dependencias, salidas, min_tokens, recuperadas):
+        """Ejecutar una etapa del modo pipeline en cuanto sus entradas lo permiten.
+        
+        recuperadas son los resultados restaurados del diario antes de empezar: una etapa
+        que no está ahí se ejecuta sin esperar a saber cómo terminan sus dependencias.
+        """
+        task = self.tasks[i]
+        task_key = f"task_{i+1}"
+        salida = salidas[task_key]
+        
+        if task_key in recuperadas:
+            result = recuperadas[task_key]
+            await salida.publicar(result)
+            await salida.cerrar(result)
+            return result
+        if task.incremental and len(dependencias) == 1:
+            # Procesar los segmentos de la etapa anterior en cuanto están completos
+            print(f"\nTarea {i+1}/{len(self.tasks)} (incremental): {task.description[:50]}...")
+            partes = []
+            async for segmentos in salidas[dependencias[0]].iterar():
+                parte = await self._aejecutar_segmento(
+                    task, task_key, {dependencias[0]: "\n\n".join(segmentos)}, salida, min_tokens, "\n\n".join(partes)
+                )
+                partes.append(parte.strip())
+            result = "\n\n".join(parte for parte in partes if parte)
+            task.output = result
+        else:
+            entradas = {dependencia: await salidas[dependencia].completo() for dependencia in dependencias}
+            print(f"\nTarea {i+1}/{len(self.tasks)}: {task.description[:50]}...")
+            result = await self._aejecutar_segmento(task, task_key, entradas, salida, min_tokens)
+        
+        entradas = {dependencia: await salidas[dependencia].completo() for dependencia in dependencias}
+        self._guardar(task_key, i, result, entradas)
+        await salida.cerrar(result)
+        return result
+    
+    @trazar("ejecucion")
+    async def aejecutar_pipeline(self, min_tokens_segmento=WORKFLOW_SEGMENT_MIN_TOKENS):
+        """Ejecutar las tareas solapando etapas: cada una emite su salida por párrafos en streaming.
+        
+        Las tareas marcadas como incremental con una sola dependencia empiezan a trabajar
+        con los primeros segmentos completos de esa dependencia; cada llamada recibe lo que
+        la tarea ya respondió y lo continúa. El resto espera a que sus dependencias terminen,
+        como en ejecutar_dag. Este modo no aplica retroalimentación.
+        
+        Args:
+            min_tokens_segmento (int): Tokens mínimos de cada segmento que pasa a la etapa siguiente
+            
+        Returns:
+            dict: Resultados por clave de tarea, en el orden de las tareas
+        """
+        grafo = self._grafo_dependencias()
+        salidas = {f"task_{i+1}": SalidaIncremental() for i in range(len(self.tasks))}
+        # Solo se reutilizan las etapas cuyas dependencias también se recuperan: si una
+        # dependencia se vuelve a generar, su resultado (y la huella) cambia
+        recuperadas = {}
+        self._recuperar_dag(grafo, recuperadas, set(range(len(self.tasks))))
+        
+        print("🚀 Iniciando flujo de trabajo multiagente en modo pipeline...")
+        self._iniciar_plazo()
+        
+        etapas = [
+            asyncio.ensure_future(self._aejecutar_etapa(i, grafo[i], salidas, min_tokens_segmento, recuperadas))
+            for i in range(len(self.tasks))
+        ]
+        try:
+            resultados = await asyncio.gather(*etapas)
+        finally:
+            # Si una etapa falla, las que esperan sus segmentos no deben quedarse colgadas
+            for etapa in etapas:
+                etapa.cancel()
+        
+        print("\n✨ Flujo de trabajo en modo pipeline completado.")
+        return self._ordenar_resultados({f"task_{i+1}": result for i, result in enumerate(resultados)})
+    
+    def _obtener_metodo_personalizado(self, task_index, kwargs):
+        """Obtener el método de agente que ejecutará una tarea personalizada."""
         if task_index < 0 or task_index >= len(self.tasks):
             raise ValueError(f"Índice de tarea {task_index} fuera de rango")
-            
+        
         task = self.tasks[task_index]
         agent = task.agent
         
@@ -108,6 +713,17 @@ class MultiAgentWorkflow:
         if not hasattr(agent, method_name):
             raise AttributeError(f"El agente {agent.name} no tiene el método {method_name}")
         
-        # Obtener y ejecutar el método
-        method = getattr(agent, method_name)
-        return method(*args, **kwargs)
\ No newline at end of file
+        return getattr(agent, method_name)
+    
+    def ejecutar_tarea_personalizada(self, task_index, *args, **kwargs):
+        """Ejecuta una tarea personalizada específica con argumentos adicionales."""
+        method = self._obtener_metodo_personalizado(task_index, kwargs)
+        return method(*args, **kwargs)
+    
+    async def aejecutar_tarea_personalizada(self, task_index, *args, **kwargs):
+        """Versión asíncrona de ejecutar_tarea_personalizada; espera el método si es una corrutina."""
+        method = self._obtener_metodo_personalizado(task_index, kwargs)
+        result = method(*args, **kwargs)
+        if inspect.isawaitable(result):
+            result = await result
+        return result